@@ -1,6 +1,7 @@
 import sys
 import os
-import json
+from core.user_directory import UserDirectory
+from core import credentials
 
 def resource_path(relative_path):
     try:
@@ -14,48 +15,49 @@ def resource_path(relative_path):
 USERS_FILE = resource_path(os.path.join("core", "users.json"))
 current_user = None
 
+# Index user di memori; users.json hanya dibaca ulang kalau mtime/size berubah
+_directory = UserDirectory(USERS_FILE)
+
 
 # ================= USER FILE HANDLER =================
 def load_users():
-    if not os.path.exists(USERS_FILE):
-        with open(USERS_FILE, "w", encoding="utf-8") as f:
-            json.dump({}, f)
-
-    try:
-        with open(USERS_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except json.JSONDecodeError:
-        # Reset file jika corrupt
-        with open(USERS_FILE, "w", encoding="utf-8") as f:
-            json.dump({}, f)
-        return {}
+    return _directory.all()
 
 
 def save_users(users):
-    with open(USERS_FILE, "w", encoding="utf-8") as f:
-        json.dump(users, f, indent=2)
+    # tulis ulang penuh (jarang dipakai); perubahan biasa lewat journal
+    _directory.replace_all(users)
+
+
+def lookup_stats():
+    """Latency/reload counters of the in-memory user directory."""
+    return _directory.stats()
 
 
 # ================= AUTH FUNCTION =================
 def register(username: str, password: str):
-    users = load_users()
-    if username in users:
+    if _directory.exists(username):
         return False, "user_exists"   # gunakan key agar bisa diterjemahkan di LangManager
 
-    users[username] = {
-        "password": password,
+    # cek ulang + tulis di bawah file lock: dua proses tidak bisa mendaftarkan username yang sama
+    created = _directory.create(username, {
+        "password": credentials.hash_password(password),
         "is_premium": False
-    }
-    save_users(users)
+    })
+    if not created:
+        return False, "user_exists"
     return True, "register_success"
 
 
 def login(username: str, password: str):
     global current_user
-    users = load_users()
-    user = users.get(username)
+    user = _directory.get(username)
+    ok, rehash = credentials.verify_password(password, user.get("password")) if user else (False, False)
 
-    if user and user["password"] == password:
+    if ok:
+        if rehash:
+            # migrasi otomatis: plaintext / work factor lama -> hash baru
+            _directory.update(username, {"password": credentials.rehash(password)})
         current_user = {
             "username": username,
             "is_premium": user.get("is_premium", False)
@@ -66,6 +68,32 @@ def login(username: str, password: str):
     return False, "login_failed"
 
 
+def _run_async(fn, args, on_done, dispatch):
+    future = credentials.submit(fn, *args)
+    if on_done:
+        dispatch = dispatch or (lambda cb: cb())
+
+        def _done(f):
+            try:
+                result = f.result()
+            except Exception as e:
+                print(f"[ERROR] Gagal memproses login: {e}")
+                result = (False, "login_failed")
+            dispatch(lambda: on_done(*result))
+
+        future.add_done_callback(_done)
+    return future
+
+
+def login_async(username: str, password: str, on_done=None, dispatch=None):
+    """login() on the credential thread pool; on_done(ok, msg_key) is delivered via dispatch."""
+    return _run_async(login, (username, password), on_done, dispatch)
+
+
+def register_async(username: str, password: str, on_done=None, dispatch=None):
+    return _run_async(register, (username, password), on_done, dispatch)
+
+
 def logout():
     global current_user
     if current_user:
@@ -86,10 +114,8 @@ def get_current_user():
 def upgrade_to_premium():
     global current_user
     if current_user:
-        users = load_users()
         username = current_user["username"]
-        users[username]["is_premium"] = True
-        save_users(users)
+        _directory.update(username, {"is_premium": True})
         current_user["is_premium"] = True
         print(f"[PREMIUM] Pengguna '{username}' di-upgrade ke premium.")
         return True, "upgrade_success"
@@ -7,10 +7,11 @@ from kivymd.uix.dialog import MDDialog
 from kivymd.uix.card import MDCard
 from kivy.uix.image import Image
 from kivy.animation import Animation
+from kivy.clock import Clock
 from kivy.utils import get_color_from_hex
 import os
 
-from core.auth import login, register
+from core.auth import login_async, register_async
 from core.lang_manager import LangManager
 
 
@@ -141,11 +142,14 @@ class AuthScreen(MDScreen):
             self.show_dialog(self.lang.translate("error_fill_fields"))
             return
 
-        if self.mode == "login":
-            success, msg_key = login(user, pwd)
-        else:
-            success, msg_key = register(user, pwd)
+        # hashing password jalan di thread pool; hasil kembali lewat Clock
+        action = login_async if self.mode == "login" else register_async
+        self.btn_action.disabled = True
+        action(user, pwd, on_done=self._on_action_done,
+               dispatch=lambda fn: Clock.schedule_once(lambda dt: fn(), 0))
 
+    def _on_action_done(self, success, msg_key):
+        self.btn_action.disabled = False
         self.show_dialog(self.lang.translate(msg_key))
 
         if success and self.mode == "login" and self.manager:
@@ -0,0 +1,149 @@
+"""
+Month-end PDF statements for many users at once.
+
+    python -m core.batch_reports --period 2024-05 --workers 4
+    python -m core.batch_reports --period 2024-05 --users alice bob
+    python -m core.batch_reports --period 2024 --vector
+
+Reports are rendered in a process pool (spawned workers, each with its own
+matplotlib Agg backend). Every finished report is appended to
+<out_dir>/<period>/manifest.jsonl; a rerun after a crash skips users that
+already have an "ok" entry.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+MANIFEST_NAME = "manifest.jsonl"
+
+
+def _init_worker():
+    # backend non-interaktif per proses, sebelum pyplot di-import
+    import matplotlib
+    matplotlib.use("Agg")
+
+
+def _render_one(username, period, out_dir, vector=False):
+    """Runs in a worker process; returns a manifest record."""
+    from core.pdf_report import PDFReport
+    from core.report_engine import NoTransactionsError
+    from core.excel_exporter import read_only_aggregates, user_transaction_file
+
+    path = os.path.join(out_dir, f"report_{username}_{period}.pdf")
+    tmp_path = path + ".tmp"
+    start = time.perf_counter()
+    try:
+        # read-only: ledger user bisa sedang dibuka aplikasinya
+        aggregates = read_only_aggregates(user_transaction_file(username))
+        if aggregates is None:
+            raise NoTransactionsError("Ledger user tidak ditemukan")
+        PDFReport().generate_report(tmp_path, username=username, period=period, vector=vector,
+                                    aggregates=aggregates)
+        os.replace(tmp_path, path)
+        status, error = "ok", None
+    except NoTransactionsError as e:
+        # tidak ada transaksi di periode ini; tidak perlu dicoba ulang
+        status, error = "skipped", str(e)
+    except Exception as e:
+        status, error = "error", f"{type(e).__name__}: {e}"
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return {
+        "user": username,
+        "period": period,
+        "status": status,
+        "error": error,
+        "path": path if status == "ok" else None,
+        "seconds": round(time.perf_counter() - start, 3),
+        "pid": os.getpid(),
+    }
+
+
+def read_manifest(path):
+    done = {}
+    if not os.path.exists(path):
+        return done
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # baris terakhir terpotong saat crash
+            done[record["user"]] = record
+    return done
+
+
+def _append_manifest(path, record):
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def all_usernames():
+    from core.auth import load_users
+    return sorted(load_users())
+
+
+def run_batch(usernames=None, period=None, out_dir="reports", workers=None, retry_errors=True, vector=False):
+    """Generate reports for `usernames` (default: all users); returns the summary dict."""
+    period = period or datetime.now().strftime("%Y-%m")
+    usernames = list(usernames) if usernames else all_usernames()
+    period_dir = os.path.join(out_dir, period)
+    os.makedirs(period_dir, exist_ok=True)
+    manifest_path = os.path.join(period_dir, MANIFEST_NAME)
+
+    finished = read_manifest(manifest_path)
+    skip = {"ok", "skipped"} if retry_errors else {"ok", "skipped", "error"}
+    todo = [u for u in usernames if finished.get(u, {}).get("status") not in skip]
+    print(f"[BATCH] {len(usernames)} user, {len(usernames) - len(todo)} sudah selesai, {len(todo)} diproses")
+
+    counts = {"ok": 0, "skipped": 0, "error": 0}
+    render_seconds = 0.0
+    start = time.perf_counter()
+    if todo:
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), mp_context=context,
+                                 initializer=_init_worker) as pool:
+            futures = {pool.submit(_render_one, u, period, period_dir, vector): u for u in todo}
+            for future in as_completed(futures):
+                try:
+                    record = future.result()
+                except Exception as e:  # worker mati (mis. kehabisan memori)
+                    record = {"user": futures[future], "period": period, "status": "error",
+                              "error": f"{type(e).__name__}: {e}", "path": None, "seconds": 0.0}
+                _append_manifest(manifest_path, record)
+                counts[record["status"]] += 1
+                render_seconds += record["seconds"]
+                print(f"[BATCH] {record['user']}: {record['status']} ({record['seconds']}s)"
+                      + (f" - {record['error']}" if record["error"] else ""))
+
+    elapsed = time.perf_counter() - start
+    summary = dict(
+        counts,
+        total=len(todo),
+        elapsed_s=round(elapsed, 2),
+        reports_per_s=round(len(todo) / elapsed, 2) if todo and elapsed else 0.0,
+        avg_report_s=round(render_seconds / len(todo), 3) if todo else 0.0,
+    )
+    print(f"[BATCH] selesai: {summary}")
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Batch laporan PDF bulanan")
+    parser.add_argument("--period", help="YYYY-MM, YYYY, YYYY-Qn atau YYYY-Www (default: bulan ini)")
+    parser.add_argument("--users", nargs="*", help="default: semua user di users.json")
+    parser.add_argument("--out-dir", default="reports")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--no-retry-errors", action="store_true", help="jangan ulangi user yang error")
+    parser.add_argument("--vector", action="store_true", help="grafik vektor + font TTF (file lebih kecil)")
+    args = parser.parse_args()
+
+    run_batch(args.users, args.period, args.out_dir, args.workers, retry_errors=not args.no_retry_errors,
+              vector=args.vector)
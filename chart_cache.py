@@ -0,0 +1,122 @@
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+# semua cache turunan (grafik, laporan, font) di bawah satu folder yang bisa diatur
+CACHE_ROOT = os.environ.get("FINANCE_CACHE_DIR", "cache")
+DEFAULT_DISK_DIR = os.path.join(CACHE_ROOT, "chart_cache")
+
+
+def chart_key(kind, spec):
+    """
+    Digest of everything that affects the rendered image: the aggregated
+    series plus theme, language, currency and size carried in `spec`.
+    """
+    payload = json.dumps({"kind": kind, "spec": spec}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ChartCache:
+    """
+    LRU cache of rendered chart PNGs bounded by total bytes, with optional
+    on-disk persistence so a restart or screen reopen is still a hit.
+    """
+
+    suffix = ".png"
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, disk_dir=None, max_disk_bytes=None):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.max_disk_bytes = max_disk_bytes if max_disk_bytes is not None else 4 * max_bytes
+        self._items = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, key + self.suffix)
+
+    def get(self, key):
+        with self._lock:
+            data = self._items.get(key)
+            if data is not None:
+                self._items.move_to_end(key)
+                self.stats["hits"] += 1
+                return data
+        if self.disk_dir and os.path.exists(self._disk_path(key)):
+            try:
+                with open(self._disk_path(key), "rb") as f:
+                    data = f.read()
+                os.utime(self._disk_path(key))
+            except OSError:
+                data = None
+            if data:
+                self._put_memory(key, data)
+                self.stats["disk_hits"] += 1
+                return data
+        self.stats["misses"] += 1
+        return None
+
+    def put(self, key, data):
+        self._put_memory(key, data)
+        if self.disk_dir:
+            tmp_path = self._disk_path(key) + ".tmp"
+            try:
+                with open(tmp_path, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, self._disk_path(key))
+                self._prune_disk()
+            except OSError as e:
+                print(f"[ERROR] Gagal menyimpan cache grafik: {e}")
+
+    def _prune_disk(self):
+        # file yang paling lama tidak dipakai dihapus dulu
+        entries = []
+        for name in os.listdir(self.disk_dir):
+            if name.endswith(self.suffix):
+                st = os.stat(os.path.join(self.disk_dir, name))
+                entries.append((st.st_mtime, st.st_size, name))
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_disk_bytes:
+                break
+            os.remove(os.path.join(self.disk_dir, name))
+            total -= size
+
+    def _put_memory(self, key, data):
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old)
+            self._items[key] = data
+            self._bytes += len(data)
+            while self._bytes > self.max_bytes and self._items:
+                _, evicted = self._items.popitem(last=False)
+                self._bytes -= len(evicted)
+                self.stats["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+
+    def size_bytes(self):
+        return self._bytes
+
+
+_default_cache = None
+
+
+def get_default_cache():
+    """Process-wide cache shared by the home chart and ChartScreen."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ChartCache(disk_dir=DEFAULT_DISK_DIR)
+    return _default_cache
@@ -2,12 +2,8 @@ from kivy.uix.screenmanager import Screen
 from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.button import Button
 from kivy.uix.label import Label
-from kivy.uix.image import Image
-import io
-import matplotlib.pyplot as plt
-from kivy.core.image import Image as CoreImage
-from core.excel_exporter import read_transactions
-import pandas as pd
+from core.excel_exporter import get_aggregates
+from core.kivy_chart import CategoryPieChart
 
 class ChartScreen(Screen):
     def __init__(self, **kwargs):
@@ -23,21 +19,15 @@ class ChartScreen(Screen):
         self.manager.current = 'home'
 
     def draw_chart(self):
-        data = read_transactions()
-        if 'Category' in data.columns and not data.empty:
-            data['Amount'] = pd.to_numeric(data['Amount'], errors='coerce')
-            grouped = data.groupby('Category')['Amount'].sum()
-
-            fig, ax = plt.subplots()
-            ax.pie(grouped, labels=grouped.index, autopct='%1.1f%%')
-            ax.set_title("Pengeluaran berdasarkan kategori")
-
-            buf = io.BytesIO()
-            fig.savefig(buf, format='png')
-            buf.seek(0)
-            img = CoreImage(buf, ext='png')
-            chart_image = Image(texture=img.texture)
-            self.layout.add_widget(chart_image)
-            plt.close(fig)
+        try:
+            by_category = get_aggregates().category_totals()
+        except Exception:
+            by_category = {}
+        expenses = {cat: b["expense"] for cat, b in sorted(by_category.items()) if b["expense"] > 0}
+        if expenses:
+            chart = CategoryPieChart()
+            chart.set_data(list(expenses.keys()), list(expenses.values()),
+                           title="Pengeluaran berdasarkan kategori")
+            self.layout.add_widget(chart)
         else:
             self.layout.add_widget(Label(text="No data or 'Category' not found"))
@@ -0,0 +1,185 @@
+import io
+import threading
+from core.chart_cache import chart_key
+
+
+def render_category_chart(spec):
+    """
+    Render the income/expense-per-category bar chart to PNG bytes.
+
+    Uses matplotlib's object API (Figure + Agg canvas) instead of pyplot so it
+    is safe to call from a worker thread. `spec` keys: categories, income,
+    expense, dark, label_income, label_expense, ylabel, title.
+    """
+    import numpy as np
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    fig = Figure(figsize=(7.6, 4.2))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(111)
+
+    if spec["dark"]:
+        fig.patch.set_facecolor("#0b1720")
+        ax.set_facecolor("#0b1720")
+        text_color = "#ecf0f1"
+        grid_color = "#355169"
+    else:
+        fig.patch.set_facecolor("#f3f8ff")
+        ax.set_facecolor("#f3f8ff")
+        text_color = "#2c3e50"
+        grid_color = "#c9d9ee"
+
+    categories = spec["categories"]
+    x = np.arange(len(categories))
+    width = 0.36
+
+    inc_color = "#4cd964"
+    exp_color = "#ff6b6b"
+
+    ax.bar(x - width/2, spec["income"], width, label=spec["label_income"], color=inc_color)
+    ax.bar(x + width/2, spec["expense"], width, label=spec["label_expense"], color=exp_color)
+
+    ax.set_xticks(x)
+    ax.set_xticklabels(categories, rotation=35, ha='right', fontsize=9, color=text_color)
+    ax.set_ylabel(spec["ylabel"], color=text_color)
+    ax.set_title(spec["title"], color=text_color)
+    ax.tick_params(axis='y', colors=text_color)
+    ax.grid(axis='y', linestyle='--', linewidth=0.6, alpha=0.6, color=grid_color)
+    for spine in ax.spines.values():
+        spine.set_color(text_color)
+        spine.set_alpha(0.35)
+    leg = ax.legend()
+    for txt in leg.get_texts():
+        txt.set_color(text_color)
+    leg.get_frame().set_facecolor(fig.get_facecolor())
+    fig.tight_layout()
+
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png', dpi=170, bbox_inches='tight')
+    return buf.getvalue()
+
+
+def render_category_pie(spec):
+    """Pie chart of `values` per `categories` to PNG bytes; keys: categories, values, title."""
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    fig = Figure()
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(111)
+    ax.pie(spec["values"], labels=spec["categories"], autopct='%1.1f%%')
+    ax.set_title(spec["title"])
+
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png')
+    return buf.getvalue()
+
+
+RENDERERS = {
+    "bar": render_category_chart,
+    "pie": render_category_pie,
+}
+
+
+def render_chart(kind, spec, cache=None):
+    """Synchronous render through the cache (used where no worker is running)."""
+    key = chart_key(kind, spec)
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+    data = RENDERERS[kind](spec)
+    if cache is not None:
+        cache.put(key, data)
+    return data
+
+
+class ChartRenderWorker:
+    """
+    Renders charts on a background thread.
+
+    submit() only records the latest request, so a burst of refreshes
+    collapses into a single render. A result is delivered only if no newer
+    request arrived while it was rendering; stale renders are dropped.
+    `on_done(png_bytes)` runs on the worker thread, so UI code should hop
+    back to the main thread (Kivy: Clock.schedule_once).
+
+    With a ChartCache, a request whose digest is already cached is answered
+    immediately on the caller's thread without touching matplotlib.
+    """
+
+    def __init__(self, render=None, cache=None):
+        self._render = render
+        self.cache = cache
+        self._cond = threading.Condition()
+        self._pending = None
+        self._generation = 0
+        self._stopped = False
+        self.stats = {"submitted": 0, "rendered": 0, "coalesced": 0, "stale": 0, "errors": 0}
+        self._thread = threading.Thread(target=self._run, name="chart-render", daemon=True)
+        self._thread.start()
+
+    def submit(self, spec, on_done, on_error=None, kind="bar"):
+        key = chart_key(kind, spec)
+        cached = self.cache.get(key) if self.cache is not None else None
+        with self._cond:
+            self._generation += 1
+            self.stats["submitted"] += 1
+            if cached is not None:
+                # cache hit: anything pending/in flight is now stale
+                self._pending = None
+            else:
+                if self._pending is not None:
+                    self.stats["coalesced"] += 1
+                self._pending = (self._generation, kind, key, spec, on_done, on_error)
+                self._cond.notify()
+            generation = self._generation
+        if cached is not None:
+            on_done(cached)
+        return generation
+
+    def cancel(self):
+        """Drop any pending request and mark in-flight renders stale."""
+        with self._cond:
+            self._generation += 1
+            self._pending = None
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._pending = None
+            self._cond.notify()
+
+    def _is_current(self, generation):
+        with self._cond:
+            return generation == self._generation
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._pending is None and not self._stopped:
+                    self._cond.wait()
+                if self._stopped:
+                    return
+                generation, kind, key, spec, on_done, on_error = self._pending
+                self._pending = None
+
+            try:
+                if self._render is not None:
+                    result = self._render(spec)
+                else:
+                    result = RENDERERS[kind](spec)
+                if self.cache is not None:
+                    self.cache.put(key, result)
+            except Exception as e:
+                self.stats["errors"] += 1
+                if on_error and self._is_current(generation):
+                    on_error(e)
+                continue
+
+            if self._is_current(generation):
+                self.stats["rendered"] += 1
+                on_done(result)
+            else:
+                self.stats["stale"] += 1
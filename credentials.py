@@ -0,0 +1,236 @@
+"""
+Password hashing for user accounts.
+
+Stored formats:
+    scrypt$<n>$<r>$<p>$<salt b64>$<hash b64>
+    pbkdf2_sha256$<iterations>$<salt b64>$<hash b64>
+Anything else is treated as a legacy plaintext password; verify_password()
+reports it as needing a rehash so login can migrate it transparently.
+
+Benchmark the cost settings on this machine with:
+    python -m core.credentials
+"""
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+SCHEME = os.environ.get("FINANCE_PASSWORD_SCHEME", "scrypt")
+
+# Work factor; naikkan kalau server masih sanggup (lihat benchmark di bawah)
+SCRYPT_PARAMS = {"n": 2 ** 14, "r": 8, "p": 1}
+PBKDF2_ITERATIONS = 600_000
+
+SALT_BYTES = 16
+HASH_BYTES = 32
+
+# hashlib melepas GIL saat hashing, jadi thread pool benar-benar paralel
+_executor = ThreadPoolExecutor(max_workers=os.cpu_count() or 2, thread_name_prefix="credentials")
+
+
+def configure(scheme=None, n=None, r=None, p=None, iterations=None):
+    """Change the scheme/work factor for new hashes (existing hashes get upgraded on next login)."""
+    global SCHEME, PBKDF2_ITERATIONS
+    if scheme:
+        if scheme not in ("scrypt", "pbkdf2_sha256"):
+            raise ValueError(f"Skema tidak dikenal: {scheme}")
+        SCHEME = scheme
+    for key, value in (("n", n), ("r", r), ("p", p)):
+        if value is not None:
+            SCRYPT_PARAMS[key] = value
+    if iterations is not None:
+        PBKDF2_ITERATIONS = iterations
+    _cache.clear()
+
+
+def _b64(data):
+    return base64.b64encode(data).decode("ascii")
+
+
+def _scrypt(password, salt, n, r, p):
+    return hashlib.scrypt(password.encode("utf-8"), salt=salt, n=n, r=r, p=p,
+                          maxmem=128 * r * n * 2 + 1024 * 1024, dklen=HASH_BYTES)
+
+
+def _pbkdf2(password, salt, iterations):
+    return hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, iterations, dklen=HASH_BYTES)
+
+
+# ================= HASH / VERIFY =================
+def hash_password(password, scheme=None):
+    scheme = scheme or SCHEME
+    salt = secrets.token_bytes(SALT_BYTES)
+    if scheme == "scrypt":
+        n, r, p = SCRYPT_PARAMS["n"], SCRYPT_PARAMS["r"], SCRYPT_PARAMS["p"]
+        return f"scrypt${n}${r}${p}${_b64(salt)}${_b64(_scrypt(password, salt, n, r, p))}"
+    if scheme == "pbkdf2_sha256":
+        iterations = PBKDF2_ITERATIONS
+        return f"pbkdf2_sha256${iterations}${_b64(salt)}${_b64(_pbkdf2(password, salt, iterations))}"
+    raise ValueError(f"Skema tidak dikenal: {scheme}")
+
+
+def is_hashed(stored):
+    return isinstance(stored, str) and stored.split("$", 1)[0] in ("scrypt", "pbkdf2_sha256")
+
+
+def needs_rehash(stored):
+    """True for plaintext and for hashes made with another scheme/work factor."""
+    if not is_hashed(stored):
+        return True
+    parts = stored.split("$")
+    if parts[0] != SCHEME:
+        return True
+    if parts[0] == "scrypt":
+        return [int(x) for x in parts[1:4]] != [SCRYPT_PARAMS["n"], SCRYPT_PARAMS["r"], SCRYPT_PARAMS["p"]]
+    return int(parts[1]) != PBKDF2_ITERATIONS
+
+
+def _verify_uncached(password, stored):
+    if not is_hashed(stored):
+        # password lama masih plaintext
+        return hmac.compare_digest(str(stored).encode("utf-8"), password.encode("utf-8"))
+    parts = stored.split("$")
+    try:
+        if parts[0] == "scrypt":
+            n, r, p = (int(x) for x in parts[1:4])
+            salt, expected = base64.b64decode(parts[4]), base64.b64decode(parts[5])
+            actual = _scrypt(password, salt, n, r, p)
+        else:
+            iterations = int(parts[1])
+            salt, expected = base64.b64decode(parts[2]), base64.b64decode(parts[3])
+            actual = _pbkdf2(password, salt, iterations)
+    except (ValueError, IndexError) as e:
+        print(f"[ERROR] Hash password rusak: {e}")
+        return False
+    return hmac.compare_digest(actual, expected)
+
+
+def verify_password(password, stored):
+    """Returns (ok, needs_rehash). Successful checks are cached briefly (see VerificationCache)."""
+    if stored is None:
+        return False, False
+    ok = _cache.check(password, stored)
+    if ok is None:
+        ok = _verify_uncached(password, stored)
+        if ok:
+            _cache.remember(password, stored)
+    return ok, ok and needs_rehash(stored)
+
+
+def rehash(password):
+    """New hash at the current work factor, pre-seeded in the verification cache."""
+    stored = hash_password(password)
+    _cache.remember(password, stored)
+    return stored
+
+
+def verify_password_async(password, stored):
+    """verify_password on the credential thread pool; returns a Future of (ok, needs_rehash)."""
+    return _executor.submit(verify_password, password, stored)
+
+
+def submit(fn, *args):
+    """Run any (hashing) function on the credential thread pool."""
+    return _executor.submit(fn, *args)
+
+
+# ================= VERIFICATION CACHE =================
+class VerificationCache:
+    """
+    Remembers recent successful (password, stored hash) pairs so repeated
+    logins of the same user skip the KDF. Entries are keyed by an HMAC with
+    a per-process random key, so neither passwords nor reusable digests are
+    kept in memory. Bounded LRU with a TTL; a changed hash never matches.
+    """
+
+    def __init__(self, max_entries=1024, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._key = secrets.token_bytes(32)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0}
+
+    def _digest(self, password, stored):
+        return hmac.new(self._key, f"{stored}\x00{password}".encode("utf-8"), hashlib.sha256).digest()
+
+    def check(self, password, stored):
+        """True on a fresh hit, None if unknown (must run the KDF)."""
+        digest = self._digest(password, stored)
+        with self._lock:
+            expires = self._entries.get(digest)
+            if expires is not None and expires > time.monotonic():
+                self._entries.move_to_end(digest)
+                self.stats["hits"] += 1
+                return True
+            if expires is not None:
+                del self._entries[digest]
+            self.stats["misses"] += 1
+            return None
+
+    def remember(self, password, stored):
+        digest = self._digest(password, stored)
+        with self._lock:
+            self._entries[digest] = time.monotonic() + self.ttl
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_cache = VerificationCache()
+
+
+def cache_stats():
+    return dict(_cache.stats)
+
+
+# ================= BENCHMARK =================
+def benchmark(settings=None, seconds=2.0, threads=None):
+    """Print verifications/sec per cost setting, single thread and on the pool."""
+    threads = threads or os.cpu_count() or 2
+    settings = settings or [
+        ("scrypt", {"n": 2 ** 13}),
+        ("scrypt", {"n": 2 ** 14}),
+        ("scrypt", {"n": 2 ** 15}),
+        ("pbkdf2_sha256", {"iterations": 210_000}),
+        ("pbkdf2_sha256", {"iterations": 600_000}),
+    ]
+    saved = (SCHEME, dict(SCRYPT_PARAMS), PBKDF2_ITERATIONS)
+    results = []
+    try:
+        for scheme, params in settings:
+            configure(scheme, **params)
+            stored = hash_password("benchmark-password")
+
+            count, start = 0, time.perf_counter()
+            while time.perf_counter() - start < seconds:
+                _verify_uncached("benchmark-password", stored)
+                count += 1
+            single = count / (time.perf_counter() - start)
+
+            batch = max(threads * 4, int(single * seconds))
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=threads) as pool:
+                list(pool.map(lambda _: _verify_uncached("benchmark-password", stored), range(batch)))
+            parallel = batch / (time.perf_counter() - start)
+
+            label = f"{scheme} " + " ".join(f"{k}={v}" for k, v in params.items())
+            print(f"[BENCH] {label:32} {1000 / single:8.1f} ms/login  "
+                  f"{single:7.1f} login/s (1 thread)  {parallel:7.1f} login/s ({threads} thread)")
+            results.append((label, single, parallel))
+    finally:
+        configure(saved[0], iterations=saved[2], **saved[1])
+    return results
+
+
+if __name__ == "__main__":
+    benchmark()
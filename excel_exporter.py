@@ -1,17 +1,211 @@
 import pandas as pd
 import os
+import atexit
+import threading
 from datetime import datetime
 from core.auth import get_current_user
+from core.ledger_log import LedgerLog
+from core.ledger_sqlite import SQLiteLedger
+from core.ledger_aggregates import LedgerAggregates
+from core.ledger_outbox import ChangeOutbox
+from core.ledger_snapshot import rows_to_frame
+
+COLUMNS = ["Amount", "Note", "Category", "Date", "Id"]
+
+# Backend penyimpanan: "log" (append-only file per user) atau "sqlite"
+LEDGER_BACKEND = os.environ.get("FINANCE_LEDGER_BACKEND", "log")
+SQLITE_DB_NAME = "ledger.db"
+
+# Satu ledger per file supaya lock & file handle dipakai bersama
+_ledgers = {}
+_ledgers_lock = threading.Lock()
+
+# Cache DataFrame hasil parse per ledger: base_path -> (key, DataFrame)
+_frame_cache = {}
+_write_versions = {}
+_cache_stats = {"hits": 0, "misses": 0}
+
+# Agregat berjalan per ledger (stat card, chart, laporan PDF)
+_aggregates = {}
+
+# Perubahan lokal yang belum dikirim ke server sync
+_outboxes = {}
+
+
+def set_backend(name):
+    global LEDGER_BACKEND
+    if name not in ("log", "sqlite"):
+        raise ValueError(f"Backend '{name}' tidak dikenal")
+    with _ledgers_lock:
+        LEDGER_BACKEND = name
+        _ledgers.clear()
+        _frame_cache.clear()
+        for aggregates in _aggregates.values():
+            aggregates.close()
+        _aggregates.clear()
+
 
 def get_user_transaction_file():
     user = get_current_user()
     if not user:
         raise Exception("Tidak ada user yang login.")
-    username = user["username"]
+    return user_transaction_file(user["username"])
+
+
+def user_transaction_file(username):
+    """Ledger path for any user (batch jobs/server), independent of the login."""
     os.makedirs("transactions", exist_ok=True)
     return f"transactions/user_{username}.xlsx"
 
-def save_to_excel(data, file_path=None):
+
+def _empty_frame():
+    return pd.DataFrame(columns=COLUMNS)
+
+
+def _get_ledger(file_path):
+    """
+    Return the ledger (append-only log or SQLite, see LEDGER_BACKEND) that backs `file_path`.
+    The XLSX path is kept as the public identifier; on first use an existing
+    XLSX is migrated into the log and is no longer written on every change.
+    """
+    base_path = _base_path(file_path)
+    with _ledgers_lock:
+        ledger = _ledgers.get(base_path)
+        if ledger is None:
+            if LEDGER_BACKEND == "sqlite":
+                ledger = _open_sqlite_ledger(base_path)
+            else:
+                ledger = LedgerLog(base_path)
+            if not ledger.exists() and os.path.exists(file_path):
+                _migrate_from_excel(ledger, file_path)
+            _ledgers[base_path] = ledger
+        return ledger
+
+
+def _open_sqlite_ledger(base_path):
+    db_path = os.path.join(os.path.dirname(base_path) or ".", SQLITE_DB_NAME)
+    ledger = SQLiteLedger(db_path, os.path.basename(base_path))
+    # pindahkan isi log lama (kalau ada) sekali saja
+    log = LedgerLog(base_path)
+    if not ledger.exists() and log.exists():
+        ledger.write_initial_snapshot(log.read_rows())
+        print(f"[LEDGER] Log {base_path} dimigrasi ke SQLite")
+    log.close()
+    return ledger
+
+
+def _base_path(file_path):
+    return os.path.splitext(file_path)[0]
+
+
+def invalidate_cache(file_path=None):
+    """Drop the cached DataFrame for one ledger (or all of them)."""
+    with _ledgers_lock:
+        if file_path is None:
+            _frame_cache.clear()
+            return
+        base_path = _base_path(file_path)
+        _write_versions[base_path] = _write_versions.get(base_path, 0) + 1
+        _frame_cache.pop(base_path, None)
+
+
+def cache_stats():
+    return dict(_cache_stats, entries=len(_frame_cache))
+
+
+def reset_cache_stats():
+    _cache_stats["hits"] = 0
+    _cache_stats["misses"] = 0
+
+
+def get_aggregates(file_path=None):
+    """
+    Incrementally maintained totals (overall, per category, per day/month)
+    for the user's ledger; see core.ledger_aggregates.LedgerAggregates.
+    """
+    if not file_path:
+        file_path = get_user_transaction_file()
+    base_path = _base_path(file_path)
+    ledger = _get_ledger(file_path)
+    with _ledgers_lock:
+        aggregates = _aggregates.get(base_path)
+        if aggregates is None:
+            aggregates = LedgerAggregates(base_path).load(ledger)
+            _aggregates[base_path] = aggregates
+        return aggregates
+
+
+def read_only_aggregates(file_path):
+    """
+    Aggregates of any user's ledger for batch jobs, without writing anything
+    (no XLSX migration, compaction or aggregate files): the user's app may
+    have the same ledger open. None if the user has no ledger at all.
+    """
+    base_path = _base_path(file_path)
+    if LEDGER_BACKEND == "sqlite":
+        db_path = os.path.join(os.path.dirname(base_path) or ".", SQLITE_DB_NAME)
+        ledger = SQLiteLedger(db_path, os.path.basename(base_path)) if os.path.exists(db_path) else None
+    else:
+        ledger = LedgerLog(base_path, read_only=True)
+    try:
+        if ledger is not None and ledger.exists():
+            return LedgerAggregates(base_path, read_only=True).load(ledger)
+    finally:
+        if ledger is not None:
+            ledger.close()
+    if os.path.exists(file_path):
+        # XLSX lama yang belum dimigrasi: dibaca saja, tidak dipindahkan
+        rows = _read_legacy_rows(file_path)
+        return LedgerAggregates.from_rows(rows) if rows is not None else None
+    return None
+
+
+@atexit.register
+def close_aggregates():
+    """Fold every aggregate journal into its snapshot (also runs at exit)."""
+    with _ledgers_lock:
+        for aggregates in _aggregates.values():
+            try:
+                aggregates.close()
+            except Exception as e:
+                print(f"[ERROR] Gagal menyimpan agregat: {e}")
+
+
+def get_outbox(file_path=None):
+    """Pending local changes for delta sync; see core.ledger_outbox.ChangeOutbox."""
+    if not file_path:
+        file_path = get_user_transaction_file()
+    base_path = _base_path(file_path)
+    with _ledgers_lock:
+        outbox = _outboxes.get(base_path)
+        if outbox is None:
+            outbox = _outboxes[base_path] = ChangeOutbox(base_path)
+        return outbox
+
+
+def _read_legacy_rows(file_path):
+    try:
+        legacy = pd.read_excel(file_path)
+    except Exception as e:
+        print(f"[ERROR] Gagal membaca file lama: {e}")
+        return None
+    return legacy.astype(object).where(legacy.notna(), None).to_dict("records")
+
+
+def _migrate_from_excel(ledger, file_path):
+    rows = _read_legacy_rows(file_path)
+    if rows is None:
+        return
+    ledger.write_initial_snapshot(rows)
+    print(f"[LEDGER] {len(rows)} transaksi dimigrasi dari {file_path}")
+
+
+def save_to_excel(data, file_path=None, record=True):
+    """
+    Append transactions to the user's ledger (O(1) per row); each row gets a
+    persistent "Id". record=False is used when applying changes pulled from
+    the sync server, so they are not pushed back.
+    """
     if not file_path:
         file_path = get_user_transaction_file()
 
@@ -19,57 +213,146 @@ def save_to_excel(data, file_path=None):
         if "Date" not in d or not d["Date"]:
             d["Date"] = datetime.now().strftime('%Y-%m-%d')
 
-    df = pd.DataFrame(data)
+    try:
+        aggregates = get_aggregates(file_path)
+        _get_ledger(file_path).append(data)
+        aggregates.on_insert(data)
+        if record:
+            get_outbox(file_path).record_upserts(data)
+    except Exception as e:
+        print(f"[ERROR] Gagal menyimpan data: {e}")
+    finally:
+        invalidate_cache(file_path)
 
-    if os.path.exists(file_path):
+
+def read_transactions(file_path=None):
+    if not file_path:
         try:
-            existing = pd.read_excel(file_path)
+            file_path = get_user_transaction_file()
         except Exception as e:
-            print(f"[ERROR] Gagal membaca file lama: {e}")
-            existing = pd.DataFrame()
-        df = pd.concat([existing, df], ignore_index=True)
+            print(f"[ERROR] {e}")
+            return _empty_frame()
 
     try:
-        df.to_excel(file_path, index=False)
+        base_path = _base_path(file_path)
+        ledger = _get_ledger(file_path)
+        key = (_write_versions.get(base_path, 0), ledger.version_key())
+        cached = _frame_cache.get(base_path)
+        if cached is not None and cached[0] == key:
+            _cache_stats["hits"] += 1
+            df = cached[1]
+        else:
+            _cache_stats["misses"] += 1
+            if hasattr(ledger, "read_frame"):
+                # columnar snapshot (memory-mapped Arrow) + log tail
+                df = ledger.read_frame()
+            else:
+                df = _to_frame(ledger.read_rows())
+            _frame_cache[base_path] = (key, df)
     except Exception as e:
-        print(f"[ERROR] Gagal menyimpan data: {e}")
+        print(f"[ERROR] Gagal membaca transaksi: {e}")
+        return _empty_frame()
 
-def read_transactions(file_path=None):
+    # deep copy: caller boleh menulis (.loc, inplace=True, ...) tanpa merusak
+    # DataFrame di cache. Biayanya satu salinan memori (~beberapa ms per
+    # 100rb baris), tetap jauh lebih murah dari parse ulang ledger.
+    return df.copy()
+
+
+def _to_frame(rows):
+    if not rows:
+        return _empty_frame()
+    return rows_to_frame(rows)
+
+
+def query_transactions(start=None, end=None, category=None, file_path=None):
+    """
+    Transactions with start <= Date < end (dates or 'YYYY-MM-DD' strings) and an
+    optional category. The SQLite backend pushes the filter down to its indexes.
+    """
     if not file_path:
         try:
             file_path = get_user_transaction_file()
         except Exception as e:
             print(f"[ERROR] {e}")
-            return pd.DataFrame(columns=["Amount", "Note", "Category", "Date"])
+            return _empty_frame()
 
-    if os.path.exists(file_path):
+    start = pd.Timestamp(start).strftime('%Y-%m-%d') if start is not None else None
+    end = pd.Timestamp(end).strftime('%Y-%m-%d') if end is not None else None
+
+    ledger = _get_ledger(file_path)
+    if hasattr(ledger, "query_rows"):
         try:
-            df = pd.read_excel(file_path)
-            if 'Date' not in df.columns:
-                df['Date'] = pd.NaT
-            else:
-                df['Date'] = pd.to_datetime(df['Date'], errors='coerce')
-            return df
+            return _to_frame(ledger.query_rows(start=start, end=end, category=category))
         except Exception as e:
             print(f"[ERROR] Gagal membaca transaksi: {e}")
-            return pd.DataFrame(columns=["Amount", "Note", "Category", "Date"])
-    else:
-        return pd.DataFrame(columns=["Amount", "Note", "Category", "Date"])
+            return _empty_frame()
+
+    df = read_transactions(file_path)
+    if df.empty:
+        return df
+    mask = pd.Series(True, index=df.index)
+    if start is not None:
+        mask &= df['Date'] >= pd.Timestamp(start)
+    if end is not None:
+        mask &= df['Date'] < pd.Timestamp(end)
+    if category is not None:
+        mask &= df['Category'] == category
+    return df[mask].reset_index(drop=True)
+
 
 def delete_transaction_by_index(index, file_path=None):
     if not file_path:
         file_path = get_user_transaction_file()
 
-    if not os.path.exists(file_path):
+    try:
+        ledger = _get_ledger(file_path)
+        if not ledger.exists():
+            return False
+        if index < 0 or index >= ledger.count():
+            return False
+        aggregates = get_aggregates(file_path)
+        row = ledger.delete_index(index)
+        if row is None:
+            return False
+        aggregates.on_delete(row)
+        if row.get("Id"):
+            get_outbox(file_path).record_delete(row["Id"])
+        return True
+    except Exception as e:
+        print(f"[ERROR] Gagal menghapus transaksi: {e}")
         return False
+    finally:
+        invalidate_cache(file_path)
+
+
+def delete_transaction_by_id(tx_id, file_path=None, record=True):
+    if not file_path:
+        file_path = get_user_transaction_file()
 
     try:
-        df = pd.read_excel(file_path)
-        if index < 0 or index >= len(df):
+        aggregates = get_aggregates(file_path)
+        row = _get_ledger(file_path).delete_id(tx_id)
+        if row is None:
             return False
-        df = df.drop(index).reset_index(drop=True)
-        df.to_excel(file_path, index=False)
+        aggregates.on_delete(row)
+        if record:
+            get_outbox(file_path).record_delete(tx_id)
         return True
     except Exception as e:
         print(f"[ERROR] Gagal menghapus transaksi: {e}")
         return False
+    finally:
+        invalidate_cache(file_path)
+
+
+def export_to_excel(output_path=None, file_path=None):
+    """Write the current ledger out as an XLSX file (export only, not the primary store)."""
+    if not file_path:
+        file_path = get_user_transaction_file()
+    if not output_path:
+        output_path = file_path
+
+    df = read_transactions(file_path)
+    df.to_excel(output_path, index=False)
+    return output_path
@@ -1,9 +1,7 @@
 from functools import partial
 from datetime import datetime
 import io
-import matplotlib.pyplot as plt
 import pandas as pd
-import numpy as np
 
 from kivy.clock import Clock
 from kivy.core.image import Image as CoreImage
@@ -22,14 +20,21 @@ from kivymd.uix.textfield import MDTextField
 from kivymd.uix.button import MDRaisedButton, MDFlatButton, MDIconButton
 from kivymd.uix.dialog import MDDialog
 from kivymd.uix.card import MDCard
-from kivymd.uix.list import MDList, OneLineAvatarIconListItem, IconRightWidget
 from kivymd.uix.menu import MDDropdownMenu
 
 from core.auth import is_premium, logout
-from core.excel_exporter import save_to_excel, read_transactions, delete_transaction_by_index
-from core.pdf_report import PDFReport
-from core.midtrans_payment import pay_with_midtrans
+from core.excel_exporter import save_to_excel, read_transactions, delete_transaction_by_id, get_aggregates
+from core.report_cache import get_report_cache
+from core.midtrans_payment import pay_with_midtrans_async
 from core.lang_manager import LangManager
+from core.chart_worker import ChartRenderWorker
+from core.kivy_chart import CategoryBarChart
+from core.transaction_list import TransactionRecycleView
+from core.chart_cache import get_default_cache
+
+# "native": Kivy canvas chart (no matplotlib in the UI)
+# "matplotlib": PNG rendered by the background worker, cached by digest
+CHART_RENDERER = "native"
 
 
 FALLBACK = {
@@ -313,10 +318,9 @@ class HomeScreen(MDScreen):
             height=28,
         )
         self.list_card = MDCard(padding=12, elevation=8, radius=[14], size_hint=(1, None), height=340)
-        self.scroll_list = ScrollView(scroll_type=['bars', 'content'], bar_width=10)
-        self.transaction_list = MDList()
-        self.scroll_list.add_widget(self.transaction_list)
-        self.list_card.add_widget(self.scroll_list)
+        # virtualized: only visible rows get widgets, older pages load on scroll
+        self.transaction_list = TransactionRecycleView(delete_callback=self._on_delete_pressed)
+        self.list_card.add_widget(self.transaction_list)
         self.main_layout.add_widget(self.history_label)
         self.main_layout.add_widget(self.list_card)
 
@@ -328,7 +332,12 @@ class HomeScreen(MDScreen):
             size_hint_y=None,
             height=28
         )
-        self.chart_image = Image(size_hint_y=None, height=340)
+        if CHART_RENDERER == "native":
+            self.chart_image = CategoryBarChart(size_hint_y=None, height=340)
+            self.chart_worker = None
+        else:
+            self.chart_image = Image(size_hint_y=None, height=340)
+            self.chart_worker = ChartRenderWorker(cache=get_default_cache())
         self.main_layout.add_widget(self.chart_label)
         self.main_layout.add_widget(self.chart_image)
 
@@ -506,16 +515,19 @@ class HomeScreen(MDScreen):
             self._stat_card_widgets.append((lbl_title, lbl_value))
             Animation(opacity=1, d=0.28, t="out_quad").start(card)
 
+    def _get_aggregates(self):
+        try:
+            return get_aggregates()
+        except Exception:
+            return None
+
     def _refresh_stat_cards(self):
-        data = read_transactions()
-        total_expense = 0.0
-        total_income = 0.0
-        count_tx = 0
-        if isinstance(data, pd.DataFrame) and not data.empty:
-            data['Amount'] = pd.to_numeric(data['Amount'], errors='coerce').fillna(0)
-            total_income = data.loc[data['Amount'] >= 0, 'Amount'].sum()
-            total_expense = -data.loc[data['Amount'] < 0, 'Amount'].sum()
-            count_tx = len(data)
+        # running totals, no re-scan of the ledger
+        aggregates = self._get_aggregates()
+        totals = aggregates.totals() if aggregates else {"income": 0.0, "expense": 0.0, "count": 0}
+        total_income = totals["income"]
+        total_expense = totals["expense"]
+        count_tx = totals["count"]
         balance = total_income - total_expense
 
         def fmt(n):
@@ -651,53 +663,16 @@ class HomeScreen(MDScreen):
         except Exception as e:
             self.show_dialog(self.t("error"), str(e))
 
-    def delete_transaction(self, df_index=None, signature=None):
+    def delete_transaction(self, tx_id):
         """
-        Use core.excel_exporter.delete_transaction_by_index() for index-based deletes.
-        If index not usable (e.g. indexes shifted), attempt to find the row by signature:
-        signature = (Date, Category, Note, Amount)
+        Delete by the transaction's persistent Id (see core.excel_exporter),
+        so duplicates with identical Date/Category/Note/Amount are never confused.
         """
         try:
-            data = read_transactions()
-            if not isinstance(data, pd.DataFrame) or data.empty:
-                self.show_dialog(self.t("error"), self.t("no_transactions"))
+            if not tx_id or not delete_transaction_by_id(tx_id):
+                self.show_dialog(self.t("error"), self.t("cannot_delete") if "cannot_delete" in FALLBACK["en"] else "Cannot delete.")
                 return
 
-            # direct index deletion if valid
-            if df_index is not None and df_index in data.index:
-                ok = delete_transaction_by_index(int(df_index))
-                if not ok:
-                    self.show_dialog(self.t("error"), self.t("cannot_delete") if "cannot_delete" in FALLBACK["en"] else "Cannot delete.")
-                    return
-            else:
-                # fallback: search for first matching signature and delete
-                if signature is None:
-                    self.show_dialog(self.t("error"), self.t("cannot_delete") if "cannot_delete" in FALLBACK["en"] else "Cannot delete.")
-                    return
-                date_s, cat_s, note_s, amt_s = signature
-                data['Amount'] = pd.to_numeric(data['Amount'], errors='coerce').fillna(0)
-                found_index = None
-                for i, row in data.iterrows():
-                    row_amt = float(row.get('Amount', 0) or 0)
-                    # string compare date/category/note
-                    row_date = str(row.get('Date', ''))
-                    row_cat = str(row.get('Category', ''))
-                    row_note = str(row.get('Note', ''))
-                    try:
-                        amt_match = abs(row_amt - float(amt_s)) < 1e-6
-                    except Exception:
-                        amt_match = (str(row_amt) == str(amt_s))
-                    if row_date == str(date_s) and row_cat == str(cat_s) and row_note == str(note_s) and amt_match:
-                        found_index = i
-                        break
-                if found_index is None:
-                    self.show_dialog(self.t("error"), self.t("cannot_delete") if "cannot_delete" in FALLBACK["en"] else "Cannot delete.")
-                    return
-                ok = delete_transaction_by_index(int(found_index))
-                if not ok:
-                    self.show_dialog(self.t("error"), self.t("cannot_delete") if "cannot_delete" in FALLBACK["en"] else "Cannot delete.")
-                    return
-
             # success
             self.show_dialog(self.t("success"), self.t("transaction_deleted") if "transaction_deleted" in FALLBACK["en"] else "Transaction deleted.")
             self.load_transactions()
@@ -708,39 +683,20 @@ class HomeScreen(MDScreen):
 
     def load_transactions(self):
         """
-        Populate the list. For delete safety we pass a signature tuple to _on_delete_pressed:
-        (Date, Category, Note, Amount) so the delete function can still find the row even if
-        indices or append behavior changed.
+        Populate the list. Each row carries the transaction's persistent Id for deletes.
         """
-        self.transaction_list.clear_widgets()
         data = read_transactions()
-        if not isinstance(data, pd.DataFrame) or data.empty:
-            self.transaction_list.add_widget(OneLineAvatarIconListItem(text=self.t("no_transactions")))
-            return
-
-        # ensure numeric and safe formatting
-        data['Amount'] = pd.to_numeric(data['Amount'], errors='coerce').fillna(0)
-
-        for idx, row in data.iterrows():
-            date_str = row.get('Date', "?")
-            nominal = abs(float(row.get('Amount', 0) or 0))
-            tipe_text = self.t("pemasukan") if row.get('Amount', 0) >= 0 else self.t("pengeluaran")
-            cat = row.get('Category', "")
-            note = row.get('Note', "")
-            item_text = f"{date_str} | {tipe_text.capitalize()} | {cat} | {self.currency} {nominal:,.2f} | {note}"
-
-            item = OneLineAvatarIconListItem(text=item_text)
-
-            # build signature to help deletion if indices differ later
-            signature = (str(date_str), str(cat), str(note), float(row.get('Amount', 0) or 0))
-
-            # delete icon with binding index + signature
-            delete_icon = IconRightWidget(icon="trash-can-outline",
-                                          on_release=partial(self._on_delete_pressed, idx, signature))
-            item.add_widget(delete_icon)
-            self.transaction_list.add_widget(item)
+        if not isinstance(data, pd.DataFrame):
+            data = None
+        self.transaction_list.set_transactions(
+            data,
+            self.t("no_transactions"),
+            label_income=self.t("pemasukan").capitalize(),
+            label_expense=self.t("pengeluaran").capitalize(),
+            currency=self.currency,
+        )
 
-    def _on_delete_pressed(self, df_index, signature, instance):
+    def _on_delete_pressed(self, tx_id, instance):
         # confirm dialog before delete
         if self.dialog:
             try:
@@ -753,7 +709,7 @@ class HomeScreen(MDScreen):
             text=self.t("confirm_delete_text"),
             buttons=[
                 MDFlatButton(text=self.t("cancel"), on_release=lambda x: self.dialog.dismiss()),
-                MDFlatButton(text=self.t("delete"), on_release=lambda x: (self.dialog.dismiss(), self.delete_transaction(df_index, signature)))
+                MDFlatButton(text=self.t("delete"), on_release=lambda x: (self.dialog.dismiss(), self.delete_transaction(tx_id)))
             ]
         )
         self.dialog.open()
@@ -762,68 +718,55 @@ class HomeScreen(MDScreen):
     # Chart
     # -------------------------
     def update_chart(self):
-        data = read_transactions()
-        if not isinstance(data, pd.DataFrame) or data.empty:
+        aggregates = self._get_aggregates()
+        by_category = aggregates.category_totals() if aggregates else {}
+        categories = sorted(by_category)
+        if CHART_RENDERER == "native":
+            # drawn straight on the canvas; existing bars are resized in place
+            self.chart_image.set_data(
+                categories,
+                [by_category[c]["income"] for c in categories],
+                [by_category[c]["expense"] for c in categories],
+                dark=self.is_dark_theme,
+                title=self.t("total_per_category"),
+                label_income=self.t("pemasukan").capitalize(),
+                label_expense=self.t("pengeluaran").capitalize(),
+                ylabel=f"{self.t('jumlah')} ({self.currency})",
+            )
+            return
+        if not by_category:
+            # newer (empty) data: drop any render still in flight
+            self.chart_worker.cancel()
             self.chart_image.texture = None
             return
-        try:
-            data['Amount'] = pd.to_numeric(data['Amount'], errors='coerce').fillna(0)
-            grouped = data.groupby('Category')['Amount'].agg([
-                ('income', lambda s: s[s >= 0].sum()),
-                ('expense', lambda s: -s[s < 0].sum())
-            ])
-            if grouped.empty:
-                self.chart_image.texture = None
-                return
+        spec = {
+            "categories": categories,
+            "income": [by_category[c]["income"] for c in categories],
+            "expense": [by_category[c]["expense"] for c in categories],
+            "dark": self.is_dark_theme,
+            "label_income": self.t("pemasukan").capitalize(),
+            "label_expense": self.t("pengeluaran").capitalize(),
+            "ylabel": f"{self.t('jumlah')} ({self.currency})",
+            "title": self.t("total_per_category"),
+            # explicit cache-key parts (labels above already depend on them)
+            "lang": self.current_lang_code,
+            "currency": self.currency,
+            "size": [7.6, 4.2, 170],
+        }
+        # cache hit returns at once; otherwise rendered off the UI thread and
+        # bursts of refreshes collapse into one render
+        self.chart_worker.submit(spec, self._on_chart_rendered, self._on_chart_failed)
+
+    def _on_chart_rendered(self, png_bytes):
+        Clock.schedule_once(lambda dt: self._apply_chart_png(png_bytes), 0)
 
-            categories = grouped.index.tolist()
-            income_vals = grouped['income'].fillna(0).values
-            expense_vals = grouped['expense'].fillna(0).values
-
-            fig, ax = plt.subplots(figsize=(7.6, 4.2))
-
-            if self.is_dark_theme:
-                fig.patch.set_facecolor("#0b1720")
-                ax.set_facecolor("#0b1720")
-                text_color = "#ecf0f1"
-                grid_color = "#355169"
-            else:
-                fig.patch.set_facecolor("#f3f8ff")
-                ax.set_facecolor("#f3f8ff")
-                text_color = "#2c3e50"
-                grid_color = "#c9d9ee"
-
-            x = np.arange(len(categories))
-            width = 0.36
-
-            inc_color = "#4cd964"
-            exp_color = "#ff6b6b"
-
-            ax.bar(x - width/2, income_vals, width, label=self.t("pemasukan").capitalize(), color=inc_color)
-            ax.bar(x + width/2, expense_vals, width, label=self.t("pengeluaran").capitalize(), color=exp_color)
-
-            ax.set_xticks(x)
-            ax.set_xticklabels(categories, rotation=35, ha='right', fontsize=9, color=text_color)
-            ax.set_ylabel(f"{self.t('jumlah')} ({self.currency})", color=text_color)
-            ax.set_title(self.t("total_per_category"), color=text_color)
-            ax.tick_params(axis='y', colors=text_color)
-            ax.grid(axis='y', linestyle='--', linewidth=0.6, alpha=0.6, color=grid_color)
-            for spine in ax.spines.values():
-                spine.set_color(text_color)
-                spine.set_alpha(0.35)
-            leg = ax.legend()
-            for txt in leg.get_texts():
-                txt.set_color(text_color)
-            leg.get_frame().set_facecolor(fig.get_facecolor())
-            plt.tight_layout()
-
-            buf = io.BytesIO()
-            fig.savefig(buf, format='png', dpi=170, bbox_inches='tight')
-            buf.seek(0)
-            plt.close(fig)
-
-            im = CoreImage(buf, ext='png')
-            Clock.schedule_once(lambda dt: self.chart_image.setter('texture')(self.chart_image, im.texture), 0)
+    def _on_chart_failed(self, error):
+        Clock.schedule_once(lambda dt: self.chart_image.setter('texture')(self.chart_image, None), 0)
+
+    def _apply_chart_png(self, png_bytes):
+        try:
+            im = CoreImage(io.BytesIO(png_bytes), ext='png')
+            self.chart_image.texture = im.texture
         except Exception:
             self.chart_image.texture = None
 
@@ -835,7 +778,9 @@ class HomeScreen(MDScreen):
             self.show_dialog(self.t("premium_only"), self.t("premium_feature_only"))
             return
         try:
-            PDFReport().generate_report()
+            # fpdf/matplotlib baru dimuat saat laporan pertama dibuat
+            from core.pdf_report import PDFReport
+            PDFReport().generate_report(cache=get_report_cache(), lang=self.current_lang_code)
             self.show_dialog(self.t("success"), self.t("pdf_generated"))
         except Exception as e:
             self.show_dialog(self.t("error"), str(e))
@@ -863,7 +808,12 @@ class HomeScreen(MDScreen):
                 self.dialog.dismiss()
             except Exception:
                 pass
-        pay_with_midtrans(plan)
+        # request ke Midtrans jalan di worker; hasil dikirim balik lewat Clock
+        pay_with_midtrans_async(
+            plan,
+            on_error=lambda e: self.show_dialog(self.t("error"), str(e)),
+            dispatch=lambda fn: Clock.schedule_once(lambda dt: fn(), 0),
+        )
 
     def do_logout(self, instance):
         logout()
@@ -0,0 +1,275 @@
+import math
+
+from kivy.uix.widget import Widget
+from kivy.graphics import Color, Rectangle, Mesh, Line, InstructionGroup
+from kivy.core.text import Label as CoreLabel
+from kivy.utils import get_color_from_hex
+
+INCOME_COLOR = get_color_from_hex("#4cd964")
+EXPENSE_COLOR = get_color_from_hex("#ff6b6b")
+PIE_COLORS = [get_color_from_hex(c) for c in (
+    "#1f77b4", "#ff7f0e", "#2ca02c", "#d62728", "#9467bd",
+    "#8c564b", "#e377c2", "#7f7f7f", "#bcbd22", "#17becf",
+)]
+THEMES = {
+    False: {"bg": get_color_from_hex("#f3f8ff"), "text": get_color_from_hex("#2c3e50"), "grid": get_color_from_hex("#c9d9ee")},
+    True: {"bg": get_color_from_hex("#0b1720"), "text": get_color_from_hex("#ecf0f1"), "grid": get_color_from_hex("#355169")},
+}
+
+_label_textures = {}
+
+
+def _text_texture(text, font_size=12):
+    """Rendered text texture, cached so redraws don't re-rasterize labels."""
+    key = (text, font_size)
+    texture = _label_textures.get(key)
+    if texture is None:
+        label = CoreLabel(text=str(text), font_size=font_size)
+        label.refresh()
+        texture = label.texture
+        if len(_label_textures) > 512:
+            _label_textures.clear()
+        _label_textures[key] = texture
+    return texture
+
+
+class _ChartBase(Widget):
+    """
+    Common plumbing: one InstructionGroup for static parts (background,
+    grid, labels) and one for data shapes. Data shapes are updated in place
+    when the number of series items is unchanged.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.dark = False
+        self.title = ""
+        self._frame = InstructionGroup()
+        self._shapes = InstructionGroup()
+        self._overlay = InstructionGroup()
+        self.canvas.add(self._frame)
+        self.canvas.add(self._shapes)
+        self.canvas.add(self._overlay)
+        self.bind(pos=self._redraw, size=self._redraw)
+
+    def _draw_text(self, group, text, x, y, color, font_size=12, anchor="left"):
+        texture = _text_texture(text, font_size)
+        w, h = texture.size
+        if anchor == "center":
+            x -= w / 2
+        elif anchor == "right":
+            x -= w
+        group.add(Color(*color))
+        group.add(Rectangle(texture=texture, pos=(x, y), size=(w, h)))
+        return w, h
+
+    def _draw_background(self, theme):
+        self._frame.clear()
+        self._frame.add(Color(*theme["bg"]))
+        self._frame.add(Rectangle(pos=self.pos, size=self.size))
+        if self.title:
+            self._draw_text(self._frame, self.title, self.center_x, self.top - 22, theme["text"], 14, "center")
+
+    def _redraw(self, *args):
+        raise NotImplementedError
+
+
+class CategoryBarChart(_ChartBase):
+    """Grouped income/expense bars per category, drawn with Kivy canvas instructions."""
+
+    PAD_LEFT = 64
+    PAD_RIGHT = 12
+    PAD_TOP = 34
+    PAD_BOTTOM = 28
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.categories = []
+        self.income = []
+        self.expense = []
+        self.label_income = ""
+        self.label_expense = ""
+        self.ylabel = ""
+        self._bars = []  # [(Rectangle income, Rectangle expense)]
+
+    def set_data(self, categories, income, expense, dark=False, title="",
+                 label_income="", label_expense="", ylabel=""):
+        labels_changed = (
+            list(categories) != self.categories or dark != self.dark or title != self.title
+            or label_income != self.label_income or label_expense != self.label_expense
+            or ylabel != self.ylabel
+        )
+        self.categories = list(categories)
+        self.income = [float(v) for v in income]
+        self.expense = [float(v) for v in expense]
+        self.dark = dark
+        self.title = title
+        self.label_income = label_income
+        self.label_expense = label_expense
+        self.ylabel = ylabel
+        if labels_changed:
+            self._redraw()
+        else:
+            # only values moved: resize existing rectangles + axis labels
+            self._draw_axes(THEMES[self.dark])
+            self._layout_bars()
+
+    def clear_data(self):
+        self.set_data([], [], [], dark=self.dark, title=self.title)
+
+    def _plot_area(self):
+        x0 = self.x + self.PAD_LEFT
+        y0 = self.y + self.PAD_BOTTOM
+        w = max(self.width - self.PAD_LEFT - self.PAD_RIGHT, 1)
+        h = max(self.height - self.PAD_TOP - self.PAD_BOTTOM, 1)
+        return x0, y0, w, h
+
+    def _max_value(self):
+        return max(self.income + self.expense + [0.0]) or 1.0
+
+    def _redraw(self, *args):
+        theme = THEMES[self.dark]
+        self._draw_background(theme)
+        self._build_bars()
+        self._draw_axes(theme)
+        self._layout_bars()
+
+    def _build_bars(self):
+        if len(self._bars) == len(self.categories):
+            return
+        self._shapes.clear()
+        self._bars = []
+        for _ in self.categories:
+            self._shapes.add(Color(*INCOME_COLOR))
+            inc = Rectangle()
+            self._shapes.add(inc)
+            self._shapes.add(Color(*EXPENSE_COLOR))
+            exp = Rectangle()
+            self._shapes.add(exp)
+            self._bars.append((inc, exp))
+
+    def _draw_axes(self, theme):
+        self._overlay.clear()
+        x0, y0, w, h = self._plot_area()
+        max_val = self._max_value()
+
+        # grid + y tick labels
+        for i in range(5):
+            gy = y0 + h * i / 4
+            self._overlay.add(Color(*theme["grid"]))
+            self._overlay.add(Line(points=[x0, gy, x0 + w, gy], width=1, dash_length=4, dash_offset=3))
+            self._draw_text(self._overlay, f"{max_val * i / 4:,.0f}", x0 - 6, gy - 7, theme["text"], 10, "right")
+
+        # category labels (skip some when they would overlap)
+        n = len(self.categories)
+        if n:
+            slot = w / n
+            step = max(1, int(math.ceil(60 / slot)))
+            for i in range(0, n, step):
+                self._draw_text(self._overlay, self.categories[i], x0 + slot * (i + 0.5), y0 - 20,
+                                theme["text"], 10, "center")
+
+        # legend
+        lx = x0 + w - 170
+        ly = self.top - self.PAD_TOP + 8
+        for color, text in ((INCOME_COLOR, self.label_income), (EXPENSE_COLOR, self.label_expense)):
+            if not text:
+                continue
+            self._overlay.add(Color(*color))
+            self._overlay.add(Rectangle(pos=(lx, ly + 2), size=(10, 10)))
+            tw, _ = self._draw_text(self._overlay, text, lx + 14, ly, theme["text"], 10)
+            lx += tw + 28
+        if self.ylabel:
+            self._draw_text(self._overlay, self.ylabel, self.x + 4, self.top - self.PAD_TOP + 8, theme["text"], 10)
+
+    def _layout_bars(self):
+        x0, y0, w, h = self._plot_area()
+        n = len(self.categories)
+        if not n:
+            return
+        max_val = self._max_value()
+        slot = w / n
+        bar_w = slot * 0.36
+        for i, (inc, exp) in enumerate(self._bars):
+            cx = x0 + slot * (i + 0.5)
+            inc.pos = (cx - bar_w, y0)
+            inc.size = (bar_w, h * self.income[i] / max_val)
+            exp.pos = (cx, y0)
+            exp.size = (bar_w, h * self.expense[i] / max_val)
+
+
+class CategoryPieChart(_ChartBase):
+    """Pie chart of positive values per category using triangle-fan Meshes."""
+
+    SEGMENTS_PER_TURN = 96
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.categories = []
+        self.values = []
+        self._slices = []  # [(Color, Mesh)]
+
+    def set_data(self, categories, values, dark=False, title=""):
+        relabel = list(categories) != self.categories or dark != self.dark or title != self.title
+        self.categories = list(categories)
+        self.values = [max(float(v), 0.0) for v in values]
+        self.dark = dark
+        self.title = title
+        if relabel:
+            self._redraw()
+        else:
+            self._layout_slices()
+
+    def _geometry(self):
+        legend_w = min(180, self.width * 0.35)
+        radius = max(min(self.width - legend_w, self.height - 40) / 2 - 8, 1)
+        cx = self.x + (self.width - legend_w) / 2
+        cy = self.y + (self.height - 30) / 2
+        return cx, cy, radius, legend_w
+
+    def _redraw(self, *args):
+        theme = THEMES[self.dark]
+        self._draw_background(theme)
+        if len(self._slices) != len(self.categories):
+            self._shapes.clear()
+            self._slices = []
+            for i in range(len(self.categories)):
+                color = Color(*PIE_COLORS[i % len(PIE_COLORS)])
+                mesh = Mesh(mode="triangle_fan")
+                self._shapes.add(color)
+                self._shapes.add(mesh)
+                self._slices.append((color, mesh))
+        self._layout_slices()
+
+    def _layout_slices(self):
+        theme = THEMES[self.dark]
+        self._overlay.clear()
+        cx, cy, radius, legend_w = self._geometry()
+        total = sum(self.values) or 1.0
+        angle = math.pi / 2
+        for i, (_, mesh) in enumerate(self._slices):
+            sweep = 2 * math.pi * self.values[i] / total
+            steps = max(2, int(self.SEGMENTS_PER_TURN * sweep / (2 * math.pi)) + 1)
+            vertices = [cx, cy, 0, 0]
+            for s in range(steps + 1):
+                a = angle - sweep * s / steps
+                vertices += [cx + radius * math.cos(a), cy + radius * math.sin(a), 0, 0]
+            mesh.vertices = vertices
+            mesh.indices = list(range(steps + 2))
+            if self.values[i] > 0:
+                mid = angle - sweep / 2
+                pct = 100 * self.values[i] / total
+                if pct >= 3:
+                    self._draw_text(self._overlay, f"{pct:.1f}%",
+                                    cx + radius * 0.62 * math.cos(mid), cy + radius * 0.62 * math.sin(mid) - 7,
+                                    (1, 1, 1, 1), 10, "center")
+            angle -= sweep
+
+        # legend
+        lx = self.right - legend_w + 8
+        ly = self.top - 50
+        for i, cat in enumerate(self.categories):
+            self._overlay.add(Color(*PIE_COLORS[i % len(PIE_COLORS)]))
+            self._overlay.add(Rectangle(pos=(lx, ly + 2), size=(10, 10)))
+            self._draw_text(self._overlay, cat, lx + 14, ly, theme["text"], 10)
+            ly -= 18
@@ -0,0 +1,294 @@
+import os
+import json
+import threading
+from datetime import date, timedelta
+
+DEFAULT_CATEGORY = "Lainnya"
+# baris journal sebelum dilipat ke snapshot <base>.agg.json
+JOURNAL_FOLD = 500
+FORMAT_VERSION = 2
+
+
+def _bucket():
+    return {"income": 0.0, "expense": 0.0, "count": 0}
+
+
+def _to_amount(value):
+    try:
+        amount = float(value)
+    except (TypeError, ValueError):
+        return 0.0
+    return 0.0 if amount != amount else amount  # NaN -> 0
+
+
+def _to_day(value):
+    """'YYYY-MM-DD' from a date string/Timestamp, or None if it can't be parsed."""
+    if value is None:
+        return None
+    text = str(value)[:10]
+    try:
+        date.fromisoformat(text)
+    except ValueError:
+        return None
+    return text
+
+
+class LedgerAggregates:
+    """
+    Running totals for one user's ledger, maintained incrementally:
+    overall, per category, per day, per month, per (month, category) and
+    per (day, category). Each bucket is {"income", "expense", "count"}
+    where expense is the positive sum of negative amounts.
+
+    Persisted next to the ledger as a snapshot (<base>.agg.json) plus a
+    delta journal (<base>.agg.log): a write appends one small NDJSON line
+    with the rows' sign/amount/category/date and the ledger position
+    after the write. The journal is folded into the snapshot every
+    JOURNAL_FOLD lines and on close(). On load the snapshot and journal
+    are replayed and checked against the ledger (row count and
+    position); a file left behind by a crash is rebuilt from the raw
+    rows. With base_path=None (see from_rows) the totals live in memory only;
+    read_only=True uses the persisted files but never writes them.
+    """
+
+    def __init__(self, base_path, read_only=False):
+        self.path = base_path + ".agg.json" if base_path else None
+        self.journal_path = base_path + ".agg.log" if base_path else None
+        self.read_only = read_only
+        self._lock = threading.Lock()
+        self._ledger = None
+        self._journal = None
+        self._journal_lines = 0
+        self._position = None
+        self.data = self._empty()
+
+    @classmethod
+    def from_rows(cls, rows):
+        """In-memory totals over `rows` (e.g. one report period read from SQLite)."""
+        aggregates = cls(None)
+        for row in rows:
+            aggregates._apply(aggregates.data, row, 1)
+        return aggregates
+
+    @classmethod
+    def from_rollup(cls, records):
+        """In-memory totals from (day, category) buckets, e.g. SQLiteLedger.daily_rollup()."""
+        aggregates = cls(None)
+        data = aggregates.data
+        for record in records:
+            category = record.get("category") or DEFAULT_CATEGORY
+            day = _to_day(record.get("day"))
+            bucket = {"income": record["income"] or 0.0, "expense": record["expense"] or 0.0,
+                      "count": record["count"]}
+            targets = [data["totals"], data["by_category"].setdefault(category, _bucket())]
+            if day:
+                month = day[:7]
+                targets += [
+                    data["by_day"].setdefault(day, _bucket()),
+                    data["by_month"].setdefault(month, _bucket()),
+                    data["by_month_category"].setdefault(month, {}).setdefault(category, _bucket()),
+                    data["by_day_category"].setdefault(day, {}).setdefault(category, _bucket()),
+                ]
+            for target in targets:
+                for field, value in bucket.items():
+                    target[field] += value
+        return aggregates
+
+    @staticmethod
+    def _empty():
+        return {
+            "totals": _bucket(),
+            "by_category": {},
+            "by_day": {},
+            "by_month": {},
+            "by_month_category": {},
+            "by_day_category": {},
+        }
+
+    # ================= LOAD / SAVE =================
+    def load(self, ledger):
+        with self._lock:
+            self._ledger = ledger
+            data, position = self._read_persisted()
+            if (data is None or data["totals"]["count"] != ledger.count()
+                    or not ledger.position_matches(position)):
+                data = self._empty()
+                for row in ledger.read_rows():
+                    self._apply(data, row, 1)
+                self.data = data
+                self._fold()
+            else:
+                self.data = data
+                self._position = position
+        return self
+
+    def _read_persisted(self):
+        """(data, ledger position) from snapshot + journal, or (None, None)."""
+        if self.path is None or not os.path.exists(self.path):
+            return None, None
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                snapshot = json.load(f)
+        except ValueError:
+            return None, None
+        if snapshot.get("format") != FORMAT_VERSION:
+            return None, None  # format lama (tanpa posisi ledger): bangun ulang
+        data, position = snapshot["data"], snapshot["position"]
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        break  # baris terakhir terpotong: posisi tidak akan cocok
+                    for row in entry["rows"]:
+                        self._apply(data, row, entry["sign"])
+                    position = entry["position"]
+                    self._journal_lines += 1
+        return data, position
+
+    def _fold(self):
+        """Write the full snapshot and empty the journal (caller holds the lock)."""
+        if self.path is None or self.read_only:
+            return
+        if self._ledger is not None:
+            self._position = self._ledger.position()
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"format": FORMAT_VERSION, "position": self._position, "data": self.data}, f)
+        os.replace(tmp_path, self.path)
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        if os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+        self._journal_lines = 0
+
+    def _record(self, rows, sign):
+        """Append one delta to the journal (caller holds the lock); O(rows), not O(history)."""
+        if self.path is None or self.read_only:
+            return
+        if self._ledger is not None:
+            self._position = self._ledger.position()
+        entry = {
+            "sign": sign,
+            "rows": [{key: row.get(key) for key in ("Amount", "Category", "Date")} for row in rows],
+            "position": self._position,
+        }
+        if self._journal is None:
+            self._journal = open(self.journal_path, "a", encoding="utf-8")
+        # tanpa fsync: journal yang terpotong saat crash terdeteksi lewat posisi ledger
+        self._journal.write(json.dumps(entry, default=str) + "\n")
+        self._journal.flush()
+        self._journal_lines += 1
+        if self._journal_lines >= JOURNAL_FOLD:
+            self._fold()
+
+    def close(self):
+        """Fold the journal into the snapshot."""
+        with self._lock:
+            if self._journal is not None or self._journal_lines:
+                self._fold()
+
+    # ================= INCREMENTAL UPDATE =================
+    @staticmethod
+    def _add(bucket, amount, sign):
+        if amount >= 0:
+            bucket["income"] += sign * amount
+        else:
+            bucket["expense"] += sign * -amount
+        bucket["count"] += sign
+
+    def _apply(self, data, row, sign):
+        amount = _to_amount(row.get("Amount"))
+        category = row.get("Category") or DEFAULT_CATEGORY
+        if not isinstance(category, str):
+            category = DEFAULT_CATEGORY if category != category else str(category)
+        day = _to_day(row.get("Date"))
+
+        self._add(data["totals"], amount, sign)
+        self._add(data["by_category"].setdefault(category, _bucket()), amount, sign)
+        if day:
+            month = day[:7]
+            self._add(data["by_day"].setdefault(day, _bucket()), amount, sign)
+            self._add(data["by_month"].setdefault(month, _bucket()), amount, sign)
+            self._add(data["by_month_category"].setdefault(month, {}).setdefault(category, _bucket()), amount, sign)
+            self._add(data["by_day_category"].setdefault(day, {}).setdefault(category, _bucket()), amount, sign)
+
+        if sign < 0:
+            self._prune(data, category, day)
+
+    @staticmethod
+    def _prune(data, category, day):
+        # buang bucket yang sudah kosong supaya file tidak terus membesar
+        if data["by_category"].get(category, {}).get("count") == 0:
+            del data["by_category"][category]
+        if day:
+            month = day[:7]
+            for table, key in (("by_day", day), ("by_month", month)):
+                if data[table].get(key, {}).get("count") == 0:
+                    del data[table][key]
+            for table, key in (("by_month_category", month), ("by_day_category", day)):
+                inner = data[table].get(key, {})
+                if inner.get(category, {}).get("count") == 0:
+                    del inner[category]
+                if key in data[table] and not inner:
+                    del data[table][key]
+
+    def on_insert(self, rows):
+        with self._lock:
+            for row in rows:
+                self._apply(self.data, row, 1)
+            self._record(rows, 1)
+
+    def on_delete(self, row):
+        with self._lock:
+            self._apply(self.data, row, -1)
+            self._record([row], -1)
+
+    # ================= QUERIES =================
+    def totals(self):
+        return dict(self.data["totals"])
+
+    def category_totals(self, month=None):
+        """{category: bucket} overall, or for one 'YYYY-MM' month."""
+        if month is None:
+            source = self.data["by_category"]
+        else:
+            source = self.data["by_month_category"].get(month, {})
+        return {cat: dict(b) for cat, b in source.items()}
+
+    def month_totals(self, month):
+        return dict(self.data["by_month"].get(month, _bucket()))
+
+    def daily_totals(self, start, end):
+        """{'YYYY-MM-DD': bucket} for start <= day < end (dates or ISO strings)."""
+        start = date.fromisoformat(str(start)[:10])
+        end = date.fromisoformat(str(end)[:10])
+        result = {}
+        day = start
+        while day < end:
+            key = day.isoformat()
+            if key in self.data["by_day"]:
+                result[key] = dict(self.data["by_day"][key])
+            day += timedelta(days=1)
+        return result
+
+    def rollup_records(self, table, keys):
+        """
+        Flat (key, category, income, expense, count) tuples for `keys` of one
+        rollup table: 'by_day'/'by_month' (category is None) or
+        'by_day_category'/'by_month_category'. Missing keys are skipped.
+        """
+        source = self.data[table]
+        records = []
+        for key in keys:
+            entry = source.get(key)
+            if not entry:
+                continue
+            if table.endswith("_category"):
+                for category, b in entry.items():
+                    records.append((key, category, b["income"], b["expense"], b["count"]))
+            else:
+                records.append((key, None, entry["income"], entry["expense"], entry["count"]))
+        return records
@@ -0,0 +1,331 @@
+import os
+import json
+import glob
+import uuid
+import threading
+import pandas as pd
+from collections import OrderedDict
+from core.ledger_snapshot import Snapshot, rows_to_frame
+
+# Jumlah record di segmen aktif sebelum compaction dijalankan di background
+COMPACT_THRESHOLD = 2000
+
+
+class LedgerLog:
+    """
+    Append-only transaction log for one user.
+
+    Layout on disk (base = "transactions/user_<name>"):
+      <base>.log.<gen>   newline-delimited JSON records, fsync'd on append
+      <base>.feather     compacted rows as a columnar Arrow snapshot (see
+                         core.ledger_snapshot; NDJSON <base>.snapshot without
+                         pyarrow). It records a generation g: every segment
+                         with generation <= g is already included
+
+    Records: {"op": "add", "row": {...}} and {"op": "del", "id": ...}. Every row
+    carries a persistent "Id"; a delete is a tombstone record that the next
+    compaction drops together with the row. Legacy {"op": "del", "index": i}
+    records are still understood.
+
+    read_only=True opens the files of a ledger another process may be
+    writing (batch jobs): nothing is removed, compacted or appended.
+    """
+
+    def __init__(self, base_path, read_only=False):
+        self.base_path = base_path
+        self.read_only = read_only
+        self.snapshot = Snapshot(base_path)
+        self._lock = threading.Lock()
+        self._compacting = False
+        self._fh = None
+        self._active_records = 0
+        self._state = None  # OrderedDict Id -> row, dimuat saat pertama dibaca
+        self._assigned_ids = False
+        self._frame_memo = None
+        self._snapshot_gen = self.snapshot.read_gen()
+        segments = self._segments()
+        self._active_gen = max(segments) if segments else self._snapshot_gen + 1
+        if self._active_gen <= self._snapshot_gen:
+            self._active_gen = self._snapshot_gen + 1
+        if not read_only:
+            self._drop_compacted_segments()
+
+    # ================= PATH HELPERS =================
+    def _segment_path(self, gen):
+        return f"{self.base_path}.log.{gen}"
+
+    def _segments(self):
+        gens = []
+        for path in glob.glob(glob.escape(self.base_path) + ".log.*"):
+            suffix = path.rsplit(".", 1)[-1]
+            if suffix.isdigit():
+                gens.append(int(suffix))
+        return sorted(gens)
+
+    def exists(self):
+        return self.snapshot.exists() or bool(self._segments())
+
+    def version_key(self):
+        """(path, mtime_ns, size) of every backing file; changes whenever the ledger does."""
+        key = []
+        for path in self.snapshot.paths + [self._segment_path(g) for g in self._segments()]:
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            key.append((path, st.st_mtime_ns, st.st_size))
+        return tuple(key)
+
+    def position(self):
+        """Durable write position: snapshot generation + byte size of every live segment."""
+        with self._lock:
+            if self._fh is not None:
+                self._fh.flush()
+            segments = {}
+            for gen in self._segments():
+                if gen > self._snapshot_gen:
+                    try:
+                        segments[str(gen)] = os.path.getsize(self._segment_path(gen))
+                    except OSError:
+                        pass
+            return {"gen": self._snapshot_gen, "segments": segments}
+
+    def position_matches(self, recorded):
+        """
+        True if nothing was appended since `recorded` (an earlier position()).
+        Segments folded into the snapshot since then are not compared:
+        compaction moves rows, it does not change them.
+        """
+        current = self.position()
+        live = {gen: size for gen, size in (recorded or {}).get("segments", {}).items()
+                if int(gen) > current["gen"]}
+        return live == current["segments"]
+
+    # ================= SNAPSHOT =================
+    def _read_snapshot_rows(self):
+        rows = OrderedDict()
+        for row in self.snapshot.read_rows():
+            self._put(rows, row)
+        return rows
+
+    def _check_writable(self):
+        if self.read_only:
+            raise PermissionError(f"Ledger {self.base_path} dibuka read-only")
+
+    def write_initial_snapshot(self, rows):
+        """Seed an empty ledger (e.g. migrating from a legacy XLSX file)."""
+        self._check_writable()
+        state = OrderedDict()
+        for row in rows:
+            self._put(state, dict(row))
+        with self._lock:
+            tmp_path, final_path = self.snapshot.write_tmp(list(state.values()), self._snapshot_gen)
+            self.snapshot.commit(tmp_path, final_path)
+            self._state = None
+
+    def _drop_compacted_segments(self):
+        for gen in self._segments():
+            if gen <= self._snapshot_gen:
+                try:
+                    os.remove(self._segment_path(gen))
+                except OSError:
+                    pass
+
+    # ================= APPEND =================
+    def _append_records(self, records):
+        self._check_writable()
+        with self._lock:
+            if self._fh is None:
+                self._fh = open(self._segment_path(self._active_gen), "a", encoding="utf-8")
+            for record in records:
+                self._fh.write(json.dumps(record, default=str) + "\n")
+            self._fh.flush()
+            os.fsync(self._fh.fileno())
+            self._active_records += len(records)
+            should_compact = self._active_records >= COMPACT_THRESHOLD and not self._compacting
+        if should_compact:
+            self.compact_async()
+
+    def append(self, rows):
+        for row in rows:
+            if not row.get("Id"):
+                row["Id"] = uuid.uuid4().hex
+        self._append_records([{"op": "add", "row": row} for row in rows])
+        if self._state is not None:
+            for row in rows:
+                self._state[row["Id"]] = row
+
+    def delete_id(self, tx_id):
+        """Tombstone one row by Id. Returns the deleted row, or None if unknown."""
+        state = self._load_state()
+        row = state.get(tx_id)
+        if row is None:
+            return None
+        self._append_records([{"op": "del", "id": tx_id}])
+        state.pop(tx_id, None)
+        return row
+
+    def delete_index(self, index):
+        state = self._load_state()
+        if not 0 <= index < len(state):
+            return None
+        return self.delete_id(list(state.keys())[index])
+
+    # ================= REPLAY =================
+    def _put(self, rows, row):
+        if not row.get("Id"):
+            # baris lama tanpa Id; Id-nya baru permanen setelah compaction
+            row["Id"] = uuid.uuid4().hex
+            self._assigned_ids = True
+        rows[row["Id"]] = row
+
+    def _apply(self, rows, record):
+        op = record.get("op")
+        if op == "add":
+            self._put(rows, record["row"])
+        elif op == "del":
+            if "id" in record:
+                rows.pop(record["id"], None)
+            else:
+                index = record.get("index", -1)
+                if 0 <= index < len(rows):
+                    del rows[list(rows.keys())[index]]
+
+    def _replay(self, rows, max_gen=None):
+        for gen in self._segments():
+            if gen <= self._snapshot_gen or (max_gen is not None and gen > max_gen):
+                continue
+            with open(self._segment_path(gen), "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # baris terakhir bisa terpotong kalau proses mati saat menulis
+                        continue
+                    self._apply(rows, record)
+        return rows
+
+    def _load_state(self):
+        if self._state is not None:
+            return self._state
+        with self._lock:
+            if self._fh is not None:
+                self._fh.flush()
+            self._assigned_ids = False
+            state = self._replay(self._read_snapshot_rows())
+        if self._assigned_ids and not self.read_only:
+            # persist Id baru dulu supaya delete by Id tetap stabil
+            self.compact()
+            with self._lock:
+                state = self._replay(self._read_snapshot_rows())
+        self._state = state
+        return state
+
+    def read_rows(self):
+        return list(self._load_state().values())
+
+    def read_frame(self):
+        """
+        Typed DataFrame of the live rows. Before any mutation needs the row
+        index, this is the memory-mapped snapshot plus the (short) log tail
+        applied as DataFrame operations -- no per-row JSON decoding.
+        """
+        key = self.version_key()
+        if self._frame_memo is not None and self._frame_memo[0] == key:
+            return self._frame_memo[1]
+        frame = None if self._state is not None else self._frame_from_snapshot()
+        if frame is None:
+            frame = rows_to_frame(self.read_rows())
+        self._frame_memo = (key, frame)
+        return frame
+
+    def _frame_from_snapshot(self):
+        with self._lock:
+            if self._fh is not None:
+                self._fh.flush()
+            base = self.snapshot.read_frame()
+            if base['Id'].isna().any():
+                return None
+            added = OrderedDict()
+            deleted = set()
+            for gen in self._segments():
+                if gen <= self._snapshot_gen:
+                    continue
+                with open(self._segment_path(gen), "r", encoding="utf-8") as f:
+                    for line in f:
+                        line = line.strip()
+                        if not line:
+                            continue
+                        try:
+                            record = json.loads(line)
+                        except ValueError:
+                            continue
+                        op = record.get("op")
+                        if op == "add" and record["row"].get("Id"):
+                            added[record["row"]["Id"]] = record["row"]
+                        elif op == "del" and "id" in record:
+                            if added.pop(record["id"], None) is None:
+                                deleted.add(record["id"])
+                        else:
+                            # rekaman lama tanpa Id: pakai jalur replay penuh
+                            return None
+        if base.empty and not added:
+            return rows_to_frame([])
+        if deleted:
+            base = base[~base['Id'].isin(deleted)]
+        replaced = base['Id'].isin(added)
+        if replaced.any():
+            # "add" dengan Id yang sudah ada menimpa barisnya di tempat, sama seperti replay
+            base = base.copy()
+            updates = rows_to_frame([added.pop(tx_id) for tx_id in base.loc[replaced, 'Id']])
+            for col in base.columns.intersection(updates.columns):
+                base.loc[replaced, col] = updates[col].to_numpy()
+        if added:
+            base = pd.concat([base, rows_to_frame(list(added.values()))], ignore_index=True)
+        return base.reset_index(drop=True)
+
+    def get(self, tx_id):
+        return self._load_state().get(tx_id)
+
+    def count(self):
+        if self._state is None:
+            return len(self.read_frame())
+        return len(self._state)
+
+    # ================= COMPACTION =================
+    def compact(self):
+        """Fold all sealed segments into the snapshot; appends keep going meanwhile."""
+        with self._lock:
+            if self._compacting or self.read_only:
+                return
+            self._compacting = True
+            sealed_gen = self._active_gen
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
+            self._active_gen += 1
+            self._active_records = 0
+        try:
+            rows = self._replay(self._read_snapshot_rows(), max_gen=sealed_gen)
+            tmp_path, final_path = self.snapshot.write_tmp(list(rows.values()), sealed_gen)
+            # swap snapshot + generation atomically w.r.t. readers
+            with self._lock:
+                self.snapshot.commit(tmp_path, final_path)
+                self._snapshot_gen = sealed_gen
+                self._drop_compacted_segments()
+        except Exception as e:
+            print(f"[ERROR] Gagal compaction ledger: {e}")
+        finally:
+            self._compacting = False
+
+    def compact_async(self):
+        threading.Thread(target=self.compact, daemon=True).start()
+
+    def close(self):
+        with self._lock:
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
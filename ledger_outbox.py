@@ -0,0 +1,95 @@
+import os
+import json
+import threading
+
+
+class ChangeOutbox:
+    """
+    Local changes not yet pushed to the sync server, for one ledger.
+
+    Only active once the ledger has been synced (<base>.sync.json exists),
+    so users who never sync pay nothing. Records are appended as NDJSON to
+    <base>.outbox: {"op": "upsert", "row": {...}} or {"op": "delete", "Id": ...}.
+    The sync state (last pulled server seq) lives in <base>.sync.json.
+    """
+
+    def __init__(self, base_path):
+        self.path = base_path + ".outbox"
+        self.state_path = base_path + ".sync.json"
+        self._lock = threading.Lock()
+
+    # ================= STATE =================
+    def enabled(self):
+        return os.path.exists(self.state_path)
+
+    def read_state(self):
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {"since": 0}
+
+    def write_state(self, state):
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.state_path)
+
+    # ================= RECORD =================
+    def record_upserts(self, rows):
+        if self.enabled():
+            self._append([{"op": "upsert", "row": row} for row in rows])
+
+    def record_delete(self, tx_id):
+        if self.enabled():
+            self._append([{"op": "delete", "Id": tx_id}])
+
+    def _append(self, records):
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, default=str) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    # ================= DRAIN =================
+    def pending(self):
+        """(changes, size): pending changes in push format and the byte size read."""
+        changes = []
+        if not os.path.exists(self.path):
+            return changes, 0
+        with open(self.path, "rb") as f:
+            data = f.read()
+        size = data.rfind(b"\n") + 1  # baris terakhir yang belum lengkap diabaikan
+        for line in data[:size].splitlines():
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get("op") == "delete":
+                changes.append({"Id": record["Id"], "deleted": True})
+            else:
+                changes.append(dict(record["row"], deleted=False))
+        return changes, size
+
+    def ack(self, size):
+        """Drop the first `size` bytes (already pushed); keeps records appended meanwhile."""
+        with self._lock:
+            self._truncate_head(size)
+
+    def _truncate_head(self, size):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as f:
+            f.seek(size)
+            rest = f.read()
+        if not rest:
+            os.remove(self.path)
+            return
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(rest)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,130 @@
+import os
+import json
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:  # tanpa pyarrow snapshot tetap NDJSON
+    pa = None
+    feather = None
+
+COLUMNS = ["Amount", "Note", "Category", "Date", "Id"]
+GEN_KEY = b"ledger_gen"
+
+
+def has_arrow():
+    return feather is not None
+
+
+def rows_to_frame(rows):
+    """Row dicts -> DataFrame with typed columns (float64 Amount, datetime64 Date, object Category)."""
+    df = pd.DataFrame(rows)
+    for col in COLUMNS:
+        if col not in df.columns:
+            df[col] = None
+    df['Amount'] = pd.to_numeric(df['Amount'], errors='coerce').astype("float64")
+    df['Date'] = pd.to_datetime(df['Date'], errors='coerce')
+    df['Category'] = df['Category'].astype(object)
+    df['Note'] = df['Note'].astype(object)
+    df['Id'] = df['Id'].astype(object)
+    return df
+
+
+def frame_to_rows(df):
+    if df.empty:
+        return []
+    plain = df.astype(object).where(df.notna(), None)
+    return plain.to_dict("records")
+
+
+class Snapshot:
+    """
+    Compacted ledger state for one user. Stored as an uncompressed Arrow IPC
+    (Feather v2) file so it can be memory-mapped, with the log generation in
+    the schema metadata. Falls back to NDJSON when pyarrow is missing, and
+    still reads an NDJSON snapshot left by older versions.
+    """
+
+    def __init__(self, base_path):
+        self.arrow_path = base_path + ".feather"
+        self.json_path = base_path + ".snapshot"
+
+    @property
+    def paths(self):
+        return [self.arrow_path, self.json_path]
+
+    def exists(self):
+        return any(os.path.exists(p) for p in self.paths)
+
+    def _use_arrow_file(self):
+        return has_arrow() and os.path.exists(self.arrow_path)
+
+    # ================= READ =================
+    def read_gen(self):
+        try:
+            if self._use_arrow_file():
+                with pa.memory_map(self.arrow_path) as source:
+                    metadata = pa.ipc.open_file(source).schema.metadata or {}
+                return int(metadata.get(GEN_KEY, b"0"))
+            if os.path.exists(self.json_path):
+                with open(self.json_path, "r", encoding="utf-8") as f:
+                    return int(json.loads(f.readline()).get("gen", 0))
+        except (ValueError, AttributeError, OSError):
+            pass
+        return 0
+
+    def read_frame(self):
+        if self._use_arrow_file():
+            table = feather.read_table(self.arrow_path, memory_map=True)
+            df = table.to_pandas()
+            # di file Category disimpan sebagai dictionary; keluarannya tetap
+            # object seperti backend lain (fillna('Lainnya') dsb. harus jalan)
+            df['Category'] = df['Category'].astype(object)
+            return df
+        return rows_to_frame(self.read_rows())
+
+    def read_rows(self):
+        if self._use_arrow_file():
+            return frame_to_rows(self.read_frame())
+        rows = []
+        if not os.path.exists(self.json_path):
+            return rows
+        with open(self.json_path, "r", encoding="utf-8") as f:
+            f.readline()  # header
+            for line in f:
+                line = line.strip()
+                if line:
+                    rows.append(json.loads(line))
+        return rows
+
+    # ================= WRITE =================
+    def write_tmp(self, rows, gen):
+        """Write to a temp file; returns (tmp_path, final_path) for an atomic os.replace."""
+        if has_arrow():
+            tmp_path = self.arrow_path + ".tmp"
+            # Category dictionary-encoded di disk
+            frame = rows_to_frame(rows)[COLUMNS].astype({"Category": "category"})
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            metadata = dict(table.schema.metadata or {})
+            metadata[GEN_KEY] = str(gen).encode()
+            table = table.replace_schema_metadata(metadata)
+            feather.write_feather(table, tmp_path, compression="uncompressed")
+            with open(tmp_path, "rb") as f:
+                os.fsync(f.fileno())
+            return tmp_path, self.arrow_path
+
+        tmp_path = self.json_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"gen": gen}) + "\n")
+            for row in rows:
+                f.write(json.dumps(row, default=str) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        return tmp_path, self.json_path
+
+    def commit(self, tmp_path, final_path):
+        os.replace(tmp_path, final_path)
+        # snapshot NDJSON lama tidak dipakai lagi setelah migrasi ke Arrow
+        if final_path == self.arrow_path and os.path.exists(self.json_path):
+            os.remove(self.json_path)
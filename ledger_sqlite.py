@@ -0,0 +1,344 @@
+import copy
+import sqlite3
+import threading
+import uuid
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transactions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user TEXT NOT NULL,
+    tx_id TEXT,
+    Date TEXT,
+    Category TEXT,
+    Note TEXT,
+    Amount REAL
+);
+CREATE INDEX IF NOT EXISTS idx_tx_user_date ON transactions (user, Date);
+CREATE INDEX IF NOT EXISTS idx_tx_user_category ON transactions (user, Category);
+CREATE INDEX IF NOT EXISTS idx_tx_user_id ON transactions (user, id);
+CREATE TABLE IF NOT EXISTS tx_changes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    user TEXT NOT NULL,
+    tx_id TEXT NOT NULL UNIQUE,
+    deleted INTEGER NOT NULL DEFAULT 0,
+    Date TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_changes_user_seq ON tx_changes (user, seq);
+"""
+
+# INSERT OR REPLACE memberi seq baru: satu baris per transaksi = perubahan terakhirnya
+# Date ikut dicatat (juga untuk delete) supaya versi per periode bisa dihitung
+RECORD_CHANGE = "INSERT OR REPLACE INTO tx_changes (user, tx_id, deleted, Date) VALUES (?, ?, ?, ?)"
+
+ROW_COLUMNS = "tx_id AS Id, Date, Category, Note, Amount"
+
+# kunci group untuk aggregate(); Date disimpan sebagai teks ISO
+GROUP_EXPRESSIONS = {
+    "category": "COALESCE(Category, 'Lainnya')",
+    "month": "substr(Date, 1, 7)",
+    "day": "substr(Date, 1, 10)",
+}
+BUCKET_SUMS = (
+    "SUM(CASE WHEN Amount >= 0 THEN Amount ELSE 0 END) AS income, "
+    "SUM(CASE WHEN Amount < 0 THEN -Amount ELSE 0 END) AS expense, "
+    "COUNT(*) AS count"
+)
+
+# dibuat setelah migrasi kolom tx_id (database lama belum punya kolom ini)
+ID_INDEX = "CREATE UNIQUE INDEX IF NOT EXISTS idx_tx_id ON transactions (tx_id)"
+# dibuat setelah migrasi kolom tx_changes.Date
+CHANGE_DATE_INDEX = "CREATE INDEX IF NOT EXISTS idx_changes_user_date ON tx_changes (user, Date, seq)"
+
+
+class SQLiteLedger:
+    """
+    SQLite-backed ledger. All users share one database file; rows are keyed
+    by a user column and indexed on (user, Date) and (user, Category) so
+    date-range and category filters become index range reads.
+    Same interface as LedgerLog, plus query_rows() for pushed-down filters,
+    keyset-paginated iter_rows() and SQL-side aggregate().
+
+    Every insert/delete also bumps a per-transaction change sequence in
+    tx_changes (deletes stay as tombstones), so changes_since(seq) returns
+    only what changed for delta sync.
+    """
+
+    def __init__(self, db_path, user_key):
+        self.db_path = db_path
+        self.user_key = user_key
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self._migrate_ids()
+
+    def _migrate_ids(self):
+        with self._lock, self._conn:
+            cols = [r["name"] for r in self._conn.execute("PRAGMA table_info(transactions)")]
+            if "tx_id" not in cols:
+                self._conn.execute("ALTER TABLE transactions ADD COLUMN tx_id TEXT")
+            self._conn.execute(
+                "UPDATE transactions SET tx_id = lower(hex(randomblob(16))) WHERE tx_id IS NULL"
+            )
+            self._conn.execute(ID_INDEX)
+            change_cols = [r["name"] for r in self._conn.execute("PRAGMA table_info(tx_changes)")]
+            if "Date" not in change_cols:
+                self._conn.execute("ALTER TABLE tx_changes ADD COLUMN Date TEXT")
+                # tombstone lama tetap tanpa Date; hanya perubahan baru yang menggeser versi
+                self._conn.execute(
+                    "UPDATE tx_changes SET Date = "
+                    "(SELECT Date FROM transactions t WHERE t.tx_id = tx_changes.tx_id)"
+                )
+            # transaksi lama belum punya entri perubahan
+            self._conn.execute(
+                "INSERT OR IGNORE INTO tx_changes (user, tx_id, deleted, Date) "
+                "SELECT user, tx_id, 0, Date FROM transactions "
+                "WHERE tx_id NOT IN (SELECT tx_id FROM tx_changes) ORDER BY id"
+            )
+            self._conn.execute(CHANGE_DATE_INDEX)
+
+    @staticmethod
+    def _to_params(user_key, row):
+        if not row.get("Id"):
+            row["Id"] = uuid.uuid4().hex
+        date = row.get("Date")
+        return (
+            user_key,
+            row["Id"],
+            str(date) if date is not None else None,
+            row.get("Category"),
+            row.get("Note"),
+            row.get("Amount"),
+        )
+
+    def exists(self):
+        with self._lock:
+            cur = self._conn.execute(
+                "SELECT 1 FROM transactions WHERE user = ? LIMIT 1", (self.user_key,)
+            )
+            return cur.fetchone() is not None
+
+    def append(self, rows):
+        with self._lock, self._conn:
+            params = [self._to_params(self.user_key, row) for row in rows]
+            self._conn.executemany(
+                "INSERT INTO transactions (user, tx_id, Date, Category, Note, Amount) VALUES (?, ?, ?, ?, ?, ?)",
+                params,
+            )
+            self._conn.executemany(RECORD_CHANGE, [(self.user_key, p[1], 0, p[2]) for p in params])
+
+    def write_initial_snapshot(self, rows):
+        self.append(rows)
+
+    def read_rows(self):
+        return self.query_rows()
+
+    def with_user(self, user_key):
+        """View of the same database (shared connection and lock) for another user."""
+        view = copy.copy(self)
+        view.user_key = user_key
+        return view
+
+    def _filters(self, start=None, end=None, category=None):
+        sql = " WHERE user = ?"
+        params = [self.user_key]
+        if start is not None:
+            sql += " AND Date >= ?"
+            params.append(str(start))
+        if end is not None:
+            sql += " AND Date < ?"
+            params.append(str(end))
+        if category is not None:
+            sql += " AND Category = ?"
+            params.append(category)
+        return sql, params
+
+    def query_rows(self, start=None, end=None, category=None):
+        """Rows for this user with start <= Date < end and an optional category."""
+        where, params = self._filters(start, end, category)
+        # transactions.id eksplisit: "id" saja akan cocok dengan alias "Id" (tx_id)
+        sql = f"SELECT {ROW_COLUMNS} FROM transactions{where} ORDER BY transactions.id"
+        with self._lock:
+            return [dict(r) for r in self._conn.execute(sql, params)]
+
+    def iter_rows(self, after=0, limit=None, start=None, end=None, category=None, batch=1000):
+        """
+        Stream rows page by page (the lock is only held per page), yielding
+        (cursor, row). Memory stays at one batch regardless of history size.
+        """
+        remaining = limit
+        while remaining is None or remaining > 0:
+            size = batch if remaining is None else min(batch, remaining)
+            where, params = self._filters(start, end, category)
+            # alias: nama kolom sqlite3.Row tidak case-sensitive (id vs Id)
+            sql = (f"SELECT transactions.id AS row_id, {ROW_COLUMNS} FROM transactions{where} "
+                   "AND transactions.id > ? ORDER BY transactions.id LIMIT ?")
+            with self._lock:
+                page = self._conn.execute(sql, params + [int(after), size]).fetchall()
+            for r in page:
+                row = dict(r)
+                after = row.pop("row_id")
+                yield after, row
+            if len(page) < size:
+                return
+            if remaining is not None:
+                remaining -= len(page)
+
+    def aggregate(self, group_by="category", start=None, end=None, category=None):
+        """[{key, income, expense, count}] grouped by category, month or day, computed in SQL."""
+        key = GROUP_EXPRESSIONS[group_by]
+        where, params = self._filters(start, end, category)
+        sql = f"SELECT {key} AS key, {BUCKET_SUMS} FROM transactions{where} GROUP BY key ORDER BY key"
+        with self._lock:
+            return [dict(r) for r in self._conn.execute(sql, params)]
+
+    def daily_rollup(self, start=None, end=None):
+        """
+        [{day, category, income, expense, count}] per (day, category) for
+        start <= Date < end, computed in SQL; feeds LedgerAggregates.from_rollup.
+        """
+        where, params = self._filters(start, end)
+        sql = (f"SELECT {GROUP_EXPRESSIONS['day']} AS day, {GROUP_EXPRESSIONS['category']} AS category, "
+               f"{BUCKET_SUMS} FROM transactions{where} GROUP BY day, category")
+        with self._lock:
+            return [dict(r) for r in self._conn.execute(sql, params)]
+
+    def get(self, tx_id):
+        with self._lock:
+            cur = self._conn.execute(
+                f"SELECT {ROW_COLUMNS} FROM transactions WHERE tx_id = ? AND user = ?",
+                (tx_id, self.user_key),
+            )
+            row = cur.fetchone()
+            return dict(row) if row else None
+
+    def delete_id(self, tx_id):
+        """Delete one row through the unique tx_id index. Returns the row, or None."""
+        row = self.get(tx_id)
+        if row is None:
+            return None
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM transactions WHERE tx_id = ? AND user = ?", (tx_id, self.user_key)
+            )
+            self._conn.execute(RECORD_CHANGE, (self.user_key, tx_id, 1, row["Date"]))
+        return row
+
+    def delete_index(self, index):
+        with self._lock:
+            cur = self._conn.execute(
+                "SELECT tx_id FROM transactions WHERE user = ? ORDER BY id LIMIT 1 OFFSET ?",
+                (self.user_key, int(index)),
+            )
+            found = cur.fetchone()
+        return self.delete_id(found[0]) if found else None
+
+    # ================= DELTA SYNC =================
+    def current_seq(self):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MAX(seq) FROM tx_changes WHERE user = ?", (self.user_key,)
+            ).fetchone()
+            return row[0] or 0
+
+    def position(self):
+        """Durable write position (last tx_changes seq); unlike version_key() it survives a restart."""
+        return {"seq": self.current_seq()}
+
+    def position_matches(self, recorded):
+        return recorded == self.position()
+
+    def range_version(self, start, end):
+        """
+        Last change seq among transactions with start <= Date < end (inserts
+        and deletes); writes outside the range leave it unchanged.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MAX(seq) FROM tx_changes WHERE user = ? AND Date >= ? AND Date < ?",
+                (self.user_key, str(start), str(end)),
+            ).fetchone()
+            return row[0] or 0
+
+    def changes_since(self, since=0, limit=1000):
+        """
+        Changes with seq > since, oldest first: upserts carry the row, deletes
+        only {"Id", "deleted": True}. Returns (changes, last_seq).
+        """
+        with self._lock:
+            cur = self._conn.execute(
+                "SELECT c.seq, c.tx_id, c.deleted, t.Date, t.Category, t.Note, t.Amount "
+                "FROM tx_changes c LEFT JOIN transactions t ON t.tx_id = c.tx_id "
+                "WHERE c.user = ? AND c.seq > ? ORDER BY c.seq LIMIT ?",
+                (self.user_key, int(since), int(limit)),
+            )
+            rows = cur.fetchall()
+        changes = []
+        for r in rows:
+            if r["deleted"]:
+                changes.append({"seq": r["seq"], "Id": r["tx_id"], "deleted": True})
+            else:
+                changes.append({
+                    "seq": r["seq"], "Id": r["tx_id"], "deleted": False, "Date": r["Date"],
+                    "Category": r["Category"], "Note": r["Note"], "Amount": r["Amount"],
+                })
+        return changes, (rows[-1]["seq"] if rows else int(since))
+
+    def apply_changes(self, changes):
+        """
+        Merge changes pushed by a client. Deterministic resolution: a delete
+        always wins (tombstones are never resurrected by a later upsert), and
+        an upsert for an Id that already exists keeps the stored row, since
+        transactions are immutable once created. Returns (applied count,
+        rejected [{"Id", "error"}]) so the client knows what was not stored.
+        """
+        applied = 0
+        rejected = []
+        with self._lock, self._conn:
+            for change in changes:
+                tx_id = change.get("Id")
+                if not tx_id:
+                    rejected.append({"Id": tx_id, "error": "Id wajib diisi"})
+                    continue
+                known = self._conn.execute(
+                    "SELECT user, deleted FROM tx_changes WHERE tx_id = ?", (tx_id,)
+                ).fetchone()
+                if known is not None and (known["user"] != self.user_key or known["deleted"]):
+                    continue
+                if change.get("deleted"):
+                    stored = self._conn.execute(
+                        "SELECT Date FROM transactions WHERE tx_id = ? AND user = ?", (tx_id, self.user_key)
+                    ).fetchone()
+                    self._conn.execute(
+                        "DELETE FROM transactions WHERE tx_id = ? AND user = ?", (tx_id, self.user_key)
+                    )
+                    self._conn.execute(RECORD_CHANGE, (self.user_key, tx_id, 1, stored["Date"] if stored else None))
+                    applied += 1
+                elif known is None:
+                    params = self._to_params(self.user_key, dict(change))
+                    self._conn.execute(
+                        "INSERT INTO transactions (user, tx_id, Date, Category, Note, Amount) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        params,
+                    )
+                    self._conn.execute(RECORD_CHANGE, (self.user_key, tx_id, 0, params[2]))
+                    applied += 1
+        return applied, rejected
+
+    def version_key(self):
+        """data_version moves on commits from other connections, total_changes on ours."""
+        with self._lock:
+            data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            return (data_version, self._conn.total_changes)
+
+    def count(self):
+        with self._lock:
+            cur = self._conn.execute(
+                "SELECT COUNT(*) FROM transactions WHERE user = ?", (self.user_key,)
+            )
+            return cur.fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
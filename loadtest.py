@@ -0,0 +1,109 @@
+"""
+Load test for the /upgrade endpoint against a local Snap stub.
+
+    python -m core.snap_stub --port 8765 --delay 0.1 &
+    MIDTRANS_SNAP_URL=http://127.0.0.1:8765/snap/v1/transactions \\
+        python -m core.serve --workers 4 --port 5000 &
+    python -m core.loadtest --url http://127.0.0.1:5000 --concurrency 64 --duration 20
+
+Run it once per --workers value; with the stub's fixed delay, throughput
+should grow roughly linearly with the number of workers until the
+concurrency limit is reached.
+
+/upgrade reuses a user's pending order, so after the first request per
+user the server answers from the order registry without calling the
+gateway. The summary reports how many requests created a new order. To
+measure gateway throughput, start the server with FINANCE_REUSE_ORDERS=0
+so every request creates a fresh order.
+"""
+import argparse
+import threading
+import time
+
+import requests
+
+from core.payment_client import LatencyHistogram
+from core.user_store import UserStore
+
+
+def seed_users(db_path, count, prefix="loadtest-"):
+    store = UserStore(db_path, json_path=None)
+    for i in range(count):
+        store.update(f"{prefix}{i}", {"password": "x", "is_premium": False}, create=True)
+    store.close()
+    return [f"{prefix}{i}" for i in range(count)]
+
+
+def login_all(url, usernames, concurrency):
+    """Log every test user in once (outside the timed run); returns username -> token."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    session = requests.Session()
+
+    def _login(username):
+        resp = session.post(url + "/login", json={"username": username, "password": "x"}, timeout=30)
+        resp.raise_for_status()
+        return username, resp.json()["token"]
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return dict(pool.map(_login, usernames))
+
+
+def run(url, tokens, concurrency, duration):
+    histogram = LatencyHistogram()
+    counts = {"ok": 0, "error": 0}
+    order_ids = set()
+    lock = threading.Lock()
+    usernames = list(tokens)
+    deadline = time.monotonic() + duration
+
+    def worker(n):
+        session = requests.Session()
+        i = n
+        while time.monotonic() < deadline:
+            username = usernames[i % len(usernames)]
+            i += concurrency
+            start = time.perf_counter()
+            order_id = None
+            try:
+                resp = session.post(url + "/upgrade", headers={"Authorization": "Bearer " + tokens[username]},
+                                    timeout=30)
+                ok = resp.status_code == 200
+                if ok:
+                    order_id = resp.json().get("order_id")
+            except (requests.RequestException, ValueError):
+                ok = False
+            histogram.record((time.perf_counter() - start) * 1000)
+            with lock:
+                counts["ok" if ok else "error"] += 1
+                if order_id:
+                    order_ids.add(order_id)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(concurrency)]
+    started = time.monotonic()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.monotonic() - started
+
+    total = counts["ok"] + counts["error"]
+    print(f"[LOADTEST] {total} request dalam {elapsed:.1f}s -> {total / elapsed:.1f} req/s")
+    print(f"[LOADTEST] ok={counts['ok']} error={counts['error']} "
+          f"order baru={len(order_ids)} dipakai ulang={counts['ok'] - len(order_ids)}")
+    print(f"[LOADTEST] p50={histogram.percentile(50):.0f}ms p99={histogram.percentile(99):.0f}ms "
+          f"max={histogram.snapshot()['max_ms']:.0f}ms")
+    return total / elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test /upgrade")
+    parser.add_argument("--url", default="http://127.0.0.1:5000")
+    parser.add_argument("--users-db", default="users.db", help="DB yang sama dengan FINANCE_USERS_DB server")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10)
+    args = parser.parse_args()
+
+    names = seed_users(args.users_db, args.users)
+    run(args.url, login_all(args.url, names, args.concurrency), args.concurrency, args.duration)
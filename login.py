@@ -1,4 +1,5 @@
 from kivy.metrics import dp
+from kivy.clock import Clock
 from kivy.uix.scrollview import ScrollView
 from kivymd.uix.screen import MDScreen
 from kivymd.uix.boxlayout import MDBoxLayout
@@ -8,7 +9,7 @@ from kivymd.uix.button import MDRaisedButton, MDFlatButton
 from kivymd.uix.snackbar import Snackbar
 from kivymd.uix.toolbar import MDTopAppBar
 
-from core.auth import login
+from core.auth import login_async
 from core.lang_manager import LangManager
 
 
@@ -120,7 +121,13 @@ class LoginScreen(MDScreen):
             self._show_snackbar(self._tr_or("error_fill_fields", "Username and password required"))
             return
 
-        ok, msg_key = login(u, p)
+        # hashing password jalan di thread pool; hasil kembali lewat Clock
+        self.btn_login.disabled = True
+        login_async(u, p, on_done=self._on_login_done,
+                    dispatch=lambda fn: Clock.schedule_once(lambda dt: fn(), 0))
+
+    def _on_login_done(self, ok, msg_key):
+        self.btn_login.disabled = False
         self._show_snackbar(self._tr_or(msg_key, msg_key))
 
         if ok:
@@ -1,20 +1,39 @@
-from midtransclient import Snap
+import os
 import time
 import webbrowser
 
+from core.payment_client import SnapClient, AsyncPaymentClient
+
 IS_PRODUCTION = True
 SERVER_KEY = "Mid-server-erhBrXGnRqTEpwX54Gz5ahxj"
 
-snap = Snap(
+# Arahkan ke stub lokal (snap_stub.py) untuk testing, mis. http://127.0.0.1:8765/snap/v1/transactions
+SNAP_URL = os.environ.get("MIDTRANS_SNAP_URL")
+
+snap = SnapClient(
+    server_key=SERVER_KEY,
     is_production=IS_PRODUCTION,
-    server_key=SERVER_KEY
+    url=SNAP_URL
 )
 
-def pay_with_midtrans(plan):
+_async_client = None
+
+
+def get_async_client(dispatch=None):
+    """Shared async client (one worker pool + pooled session for the whole app)."""
+    global _async_client
+    if _async_client is None:
+        _async_client = AsyncPaymentClient(snap, max_workers=2, dispatch=dispatch)
+    elif dispatch is not None:
+        _async_client.dispatch = dispatch
+    return _async_client
+
+
+def build_params(plan):
     order_id = f"{plan}-{int(time.time())}"
     price = 7000 if plan == "weekly" else 15000
 
-    params = {
+    return {
         "transaction_details": {
             "order_id": order_id,
             "gross_amount": price
@@ -27,9 +46,42 @@ def pay_with_midtrans(plan):
         }]
     }
 
-    transaction = snap.create_transaction(params)
+
+def _open_payment_page(transaction):
     url = transaction["redirect_url"]
     print(f"[MIDTRANS] URL pembayaran: {url}")
 
     # Buka otomatis di browser
     webbrowser.open(url)
+    return url
+
+
+def pay_with_midtrans(plan):
+    """Blocking version; do not call from the UI thread."""
+    transaction = snap.create_transaction(build_params(plan))
+    return _open_payment_page(transaction)
+
+
+def pay_with_midtrans_async(plan, on_success=None, on_error=None, dispatch=None):
+    """
+    Create the Snap transaction on the payment worker and return a Future.
+    on_success(url) / on_error(exc) are delivered through `dispatch`
+    (on Kivy: Clock.schedule_once) so they run on the UI thread.
+    """
+    client = get_async_client(dispatch)
+
+    def _success(transaction):
+        url = _open_payment_page(transaction)
+        if on_success:
+            on_success(url)
+
+    def _error(e):
+        print(f"[ERROR] Gagal membuat transaksi Midtrans: {e}")
+        if on_error:
+            on_error(e)
+
+    return client.create_transaction(build_params(plan), on_success=_success, on_error=_error)
+
+
+def latency_stats():
+    return snap.latency.snapshot()
@@ -0,0 +1,195 @@
+import re
+import hashlib
+import secrets
+import sqlite3
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS orders (
+    order_id TEXT PRIMARY KEY,
+    username TEXT NOT NULL,
+    redirect_url TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending'
+);
+CREATE INDEX IF NOT EXISTS idx_orders_user ON orders (username, status, expires_at);
+-- paling banyak satu order yang sedang dibuat per user, di semua worker
+CREATE UNIQUE INDEX IF NOT EXISTS idx_orders_creating ON orders (username) WHERE status = 'creating';
+"""
+
+ORDER_PREFIX = "premium-"
+# batas panjang order_id dari Midtrans
+MAX_ORDER_ID_LEN = 50
+
+# order yang tinggal sebentar lagi expired tidak dipakai ulang
+REUSE_MARGIN = 60
+# order selesai/expired disimpan sekian lama untuk lookup callback
+RETENTION = 7 * 24 * 3600
+# cache per proses dicek ulang ke database setelah sekian detik
+# (order bisa ditutup oleh webhook di worker lain)
+CACHE_TTL = 5
+# reservasi 'creating' dari proses yang mati dianggap basi setelah sekian detik
+RESERVATION_TIMEOUT = 60
+
+
+def new_order_id(username):
+    """
+    Unique per attempt: premium-<name>-<hash>-<ms timestamp><random>, at most
+    MAX_ORDER_ID_LEN characters whatever the username. <name> is the
+    username cut to 12 characters Midtrans accepts, <hash> keeps two users
+    with the same prefix apart; the owner is looked up in the registry.
+    """
+    name = re.sub(r"[^A-Za-z0-9_.~]", "", username)[:12] or "user"
+    digest = hashlib.sha256(username.encode("utf-8")).hexdigest()[:6]
+    order_id = f"{ORDER_PREFIX}{name}-{digest}-{int(time.time() * 1000)}{secrets.token_hex(2)}"
+    return order_id[:MAX_ORDER_ID_LEN]
+
+
+class OrderRegistry:
+    """
+    Pending Snap orders per user, shared by all server workers through
+    SQLite. /upgrade reuses the redirect_url of a still-valid pending order
+    instead of creating another gateway transaction; expired orders are
+    ignored and pruned. reserve() claims the single 'creating' slot of a
+    user in one SQLite transaction (unique index), so a double tap that
+    lands on two worker processes still creates only one order. A small
+    in-process cache answers repeated lookups for CACHE_TTL seconds
+    without touching the database.
+    """
+
+    def __init__(self, db_path="orders.db"):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._cache = {}
+        self.stats = {"hits": 0, "misses": 0, "created": 0, "evicted": 0}
+        self._conn().executescript(SCHEMA)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # ================= LOOKUP =================
+    def get_active(self, username, now=None):
+        """Pending order with at least REUSE_MARGIN seconds left, as a dict, or None."""
+        now = now or time.time()
+        cached = self._cache.get(username)
+        if cached is not None and cached["expires_at"] - REUSE_MARGIN > now and now - cached["checked_at"] < CACHE_TTL:
+            self.stats["hits"] += 1
+            return self._public(cached)
+        order = self._select_active(self._conn(), username, now)
+        if order is None:
+            self._cache.pop(username, None)
+            self.stats["misses"] += 1
+            return None
+        self.stats["hits"] += 1
+        return self._public(order)
+
+    def _select_active(self, conn, username, now):
+        row = conn.execute(
+            "SELECT order_id, redirect_url, expires_at FROM orders "
+            "WHERE username = ? AND status = 'pending' AND expires_at > ? "
+            "ORDER BY expires_at DESC LIMIT 1",
+            (username, now + REUSE_MARGIN),
+        ).fetchone()
+        if row is None:
+            return None
+        order = {"order_id": row[0], "redirect_url": row[1], "expires_at": row[2], "checked_at": now}
+        self._cache[username] = order
+        return order
+
+    def wait_active(self, username, timeout, interval=0.2):
+        """Poll for the order another request is creating; None if it does not appear in time."""
+        deadline = time.monotonic() + timeout
+        while True:
+            order = self.get_active(username)
+            if order is not None or time.monotonic() >= deadline:
+                return order
+            time.sleep(interval)
+
+    @staticmethod
+    def _public(order):
+        return {key: order[key] for key in ("order_id", "redirect_url", "expires_at")}
+
+    def username_for(self, order_id):
+        row = self._conn().execute("SELECT username FROM orders WHERE order_id = ?", (order_id,)).fetchone()
+        return row[0] if row else None
+
+    # ================= WRITE =================
+    def reserve(self, username, order_id, now=None):
+        """
+        Atomically across processes: ("active", order) if the user has a
+        reusable pending order, ("busy", None) while another request is
+        creating one, else ("reserved", None) -- the caller creates
+        `order_id` at the gateway and ends with register() or release().
+        """
+        now = now or time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "DELETE FROM orders WHERE username = ? AND status = 'creating' AND created_at < ?",
+                (username, now - RESERVATION_TIMEOUT),
+            )
+            order = self._select_active(conn, username, now)
+            if order is not None:
+                result = ("active", self._public(order))
+            else:
+                try:
+                    conn.execute(
+                        "INSERT INTO orders (order_id, username, redirect_url, created_at, expires_at, status) "
+                        "VALUES (?, ?, '', ?, ?, 'creating')",
+                        (order_id, username, now, now + RESERVATION_TIMEOUT),
+                    )
+                    result = ("reserved", None)
+                except sqlite3.IntegrityError:
+                    result = ("busy", None)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return result
+
+    def release(self, order_id):
+        """Give up a reservation whose gateway call failed."""
+        self._conn().execute("DELETE FROM orders WHERE order_id = ? AND status = 'creating'", (order_id,))
+
+    def register(self, username, order_id, redirect_url, duration_minutes, now=None):
+        now = now or time.time()
+        expires_at = now + duration_minutes * 60
+        self._conn().execute(
+            "INSERT OR REPLACE INTO orders (order_id, username, redirect_url, created_at, expires_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (order_id, username, redirect_url, now, expires_at),
+        )
+        self._cache[username] = {
+            "order_id": order_id, "redirect_url": redirect_url, "expires_at": expires_at, "checked_at": now,
+        }
+        self.stats["created"] += 1
+
+    def close(self, order_id, status):
+        """Mark an order paid/expired/cancelled so it is no longer reused."""
+        username = self.username_for(order_id)
+        self._conn().execute("UPDATE orders SET status = ? WHERE order_id = ?", (status, order_id))
+        if username is not None:
+            cached = self._cache.get(username)
+            if cached is not None and cached["order_id"] == order_id:
+                self._cache.pop(username, None)
+
+    def evict_expired(self, now=None):
+        """Drop expired entries from the cache and old finished orders from the database."""
+        now = now or time.time()
+        for username, order in list(self._cache.items()):
+            if order["expires_at"] <= now:
+                self._cache.pop(username, None)
+        cur = self._conn().execute(
+            "DELETE FROM orders WHERE expires_at < ?", (now - RETENTION,)
+        )
+        self.stats["evicted"] += cur.rowcount
+        return cur.rowcount
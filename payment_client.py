@@ -0,0 +1,171 @@
+import base64
+import bisect
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+SNAP_PRODUCTION_URL = "https://app.midtrans.com/snap/v1/transactions"
+SNAP_SANDBOX_URL = "https://app.sandbox.midtrans.com/snap/v1/transactions"
+
+# Membuat transaksi Snap tidak idempoten: order_id yang sama ditolak kalau
+# percobaan pertama ternyata sudah diproses. Jadi hanya diulang kalau
+# request pasti belum diproses: koneksi gagal dibuka, atau 429 (rate limit).
+RETRY_STATUS = {429}
+
+
+class PaymentError(Exception):
+    """Snap request failed after all retries (or with a non-retryable status)."""
+
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+class LatencyHistogram:
+    """Thread-safe request latency histogram with fixed millisecond buckets."""
+
+    BUCKETS_MS = [25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = [0] * (len(self.BUCKETS_MS) + 1)
+        self._total_ms = 0.0
+        self._max_ms = 0.0
+
+    def record(self, ms):
+        with self._lock:
+            self._counts[bisect.bisect_left(self.BUCKETS_MS, ms)] += 1
+            self._total_ms += ms
+            self._max_ms = max(self._max_ms, ms)
+
+    def snapshot(self):
+        with self._lock:
+            count = sum(self._counts)
+            labels = [f"<={b}ms" for b in self.BUCKETS_MS] + [f">{self.BUCKETS_MS[-1]}ms"]
+            return {
+                "count": count,
+                "avg_ms": self._total_ms / count if count else 0.0,
+                "max_ms": self._max_ms,
+                "buckets": dict(zip(labels, self._counts)),
+            }
+
+    def percentile(self, q):
+        """Upper bound (ms) of the bucket holding the q-th percentile."""
+        with self._lock:
+            count = sum(self._counts)
+            if not count:
+                return 0.0
+            target = q / 100 * count
+            running = 0
+            for i, c in enumerate(self._counts):
+                running += c
+                if running >= target:
+                    return min(float(self.BUCKETS_MS[i]), self._max_ms) if i < len(self.BUCKETS_MS) else self._max_ms
+            return self._max_ms
+
+
+class SnapClient:
+    """
+    Minimal Midtrans Snap client over one pooled, persistent requests.Session
+    (keep-alive connections are reused between payments). Requests have a
+    connect/read timeout. Only failures where the gateway cannot have
+    processed the request (connection not established, 429) are retried,
+    with exponential backoff + jitter; a read timeout or 5xx is raised
+    as is, since the order may already exist. `url` can point at a local
+    stub server.
+    """
+
+    def __init__(self, server_key, is_production=False, url=None, timeout=(3.05, 15),
+                 max_retries=3, backoff=0.5, pool_size=10):
+        self.url = url or (SNAP_PRODUCTION_URL if is_production else SNAP_SANDBOX_URL)
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.latency = LatencyHistogram()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        auth = base64.b64encode(f"{server_key}:".encode()).decode()
+        self.session.headers.update({
+            "Authorization": "Basic " + auth,
+            "Accept": "application/json",
+            "Content-Type": "application/json",
+        })
+
+    def create_transaction(self, params):
+        """POST the Snap transaction; returns the JSON body ({'token', 'redirect_url'})."""
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            try:
+                resp = self.session.post(self.url, json=params, timeout=self.timeout)
+            except requests.RequestException as e:
+                error = PaymentError(f"Gagal menghubungi Midtrans: {e}")
+                if not _not_sent(e):
+                    raise error
+            else:
+                self.latency.record((time.perf_counter() - start) * 1000)
+                if resp.status_code < 300:
+                    return resp.json()
+                error = PaymentError(f"Midtrans error {resp.status_code}: {resp.text[:200]}", resp.status_code)
+                if resp.status_code not in RETRY_STATUS:
+                    raise error
+            attempt += 1
+            if attempt > self.max_retries:
+                raise error
+            time.sleep(self.backoff * (2 ** (attempt - 1)) * (0.5 + random.random()))
+
+    def close(self):
+        self.session.close()
+
+
+def _not_sent(error):
+    """True if the request never reached the gateway (safe to POST again)."""
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    if isinstance(error, requests.ConnectionError) and not isinstance(error, requests.Timeout):
+        reason = getattr(error.args[0], "reason", None) if error.args else None
+        return isinstance(reason, NewConnectionError)
+    return False
+
+
+class AsyncPaymentClient:
+    """
+    Runs SnapClient calls on a small dedicated thread pool so UI/button
+    handlers never block on the gateway. Callbacks are delivered through
+    `dispatch(fn)`; on Kivy pass a function that schedules fn with
+    Clock.schedule_once so callbacks run on the main thread.
+    """
+
+    def __init__(self, client, max_workers=2, dispatch=None):
+        self.client = client
+        self.dispatch = dispatch or (lambda fn: fn())
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="snap")
+
+    def create_transaction(self, params, on_success=None, on_error=None):
+        future = self._executor.submit(self.client.create_transaction, params)
+
+        def _done(f):
+            error = f.exception()
+            if error is not None:
+                if on_error:
+                    self.dispatch(lambda: on_error(error))
+            elif on_success:
+                result = f.result()
+                self.dispatch(lambda: on_success(result))
+
+        future.add_done_callback(_done)
+        return future
+
+    def latency(self):
+        return self.client.latency.snapshot()
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+        self.client.close()
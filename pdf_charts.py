@@ -0,0 +1,128 @@
+"""
+Report charts drawn as native PDF vector paths with fpdf2 primitives,
+instead of embedding matplotlib PNGs. Same layout as the raster charts
+(pie: categories from 12 o'clock counter-clockwise; bars: one per bucket)
+at a fraction of the size, and text stays selectable.
+"""
+import math
+
+# warna default matplotlib (tab10), supaya kedua mode terlihat sama
+PALETTE = [
+    (31, 119, 180), (255, 127, 14), (44, 160, 44), (214, 39, 40), (148, 103, 189),
+    (140, 86, 75), (227, 119, 194), (127, 127, 127), (188, 189, 34), (23, 190, 207),
+]
+BAR_COLOR = (135, 206, 235)  # skyblue
+MAX_X_LABELS = 16
+
+
+def _nice_step(span, target=5):
+    raw = span / target
+    magnitude = 10 ** math.floor(math.log10(raw))
+    for factor in (1, 2, 2.5, 5, 10):
+        if raw <= factor * magnitude:
+            return factor * magnitude
+    return 10 * magnitude
+
+
+def _fmt_tick(value):
+    if abs(value) >= 1e9:
+        return f"{value / 1e9:g}M"
+    if abs(value) >= 1e6:
+        return f"{value / 1e6:g}jt"
+    if abs(value) >= 1e3:
+        return f"{value / 1e3:g}rb"
+    return f"{value:g}"
+
+
+def _title(pdf, family, text, x, y, w):
+    pdf.set_font(family, size=11)
+    pdf.text(x + (w - pdf.get_string_width(text)) / 2, y + 5, text)
+
+
+def draw_pie(pdf, values, labels, x, y, w, h, title, family):
+    """Pie with percentage labels inside the wedges and category labels outside."""
+    values = [float(v) for v in values]
+    if any(v < 0 for v in values):
+        raise ValueError("Wedge sizes 'x' must be non negative values")
+    _title(pdf, family, title, x, y, w)
+    total = sum(values)
+    if total <= 0:
+        return
+
+    radius = min(w * 0.3, (h - 14) / 2)
+    cx, cy = x + w / 2, y + 10 + (h - 10) / 2
+    pdf.set_font(family, size=8)
+    cumulative = 0.0
+    for i, (value, label) in enumerate(zip(values, labels)):
+        if value == 0:
+            continue
+        start = -90 - 360 * cumulative / total
+        cumulative += value
+        end = -90 - 360 * cumulative / total
+        # sumbu y PDF mengarah ke bawah: berlawanan jarum jam = sudut mengecil
+        pdf.set_fill_color(*PALETTE[i % len(PALETTE)])
+        pdf.solid_arc(cx - radius, cy - radius, 2 * radius, start, end, clockwise=True, style="F")
+
+        mid = math.radians((start + end) / 2)
+        pct = f"{100 * value / total:.1f}%"
+        px, py = cx + 0.6 * radius * math.cos(mid), cy + 0.6 * radius * math.sin(mid)
+        pdf.text(px - pdf.get_string_width(pct) / 2, py + 1, pct)
+        label = str(label)
+        lx, ly = cx + 1.1 * radius * math.cos(mid), cy + 1.1 * radius * math.sin(mid)
+        if math.cos(mid) < 0:
+            lx -= pdf.get_string_width(label)
+        pdf.text(lx, ly + 1, label)
+
+
+def draw_bars(pdf, labels, values, x, y, w, h, title, xlabel, ylabel, family):
+    """Bar chart with a zero line, ~5 y ticks and at most MAX_X_LABELS rotated x labels."""
+    values = [float(v) for v in values]
+    _title(pdf, family, title, x, y, w)
+    left, top, bottom = x + 18, y + 10, y + h - 18
+    right = x + w - 4
+    low, high = min([0.0] + values), max([0.0] + values)
+    if high == low:
+        high = low + 1
+    step = _nice_step(high - low)
+    low, high = math.floor(low / step) * step, math.ceil(high / step) * step
+    scale = (bottom - top) / (high - low)
+    to_y = lambda v: bottom - (v - low) * scale
+
+    # sumbu dan tick y
+    pdf.set_draw_color(0, 0, 0)
+    pdf.set_line_width(0.2)
+    pdf.line(left, top, left, bottom)
+    pdf.line(left, bottom, right, bottom)
+    pdf.set_font(family, size=6)
+    tick = low
+    while tick <= high + step / 2:
+        ty = to_y(tick)
+        pdf.line(left - 1, ty, left, ty)
+        text = _fmt_tick(tick)
+        pdf.text(left - 2 - pdf.get_string_width(text), ty + 1, text)
+        tick += step
+    if low < 0:
+        pdf.line(left, to_y(0), right, to_y(0))
+
+    # batang
+    slot = (right - left) / max(len(values), 1)
+    pdf.set_fill_color(*BAR_COLOR)
+    for i, value in enumerate(values):
+        y0, y1 = sorted((to_y(0), to_y(value)))
+        if y1 > y0:
+            pdf.rect(left + slot * (i + 0.1), y0, slot * 0.8, y1 - y0, style="F")
+
+    # label x miring 45 derajat, ujungnya di bawah batang
+    every = max(1, math.ceil(len(labels) / MAX_X_LABELS))
+    for i, label in enumerate(labels):
+        if i % every:
+            continue
+        text = str(label)
+        px, py = left + slot * (i + 0.5), bottom + 2
+        with pdf.rotation(45, px, py):
+            pdf.text(px - pdf.get_string_width(text), py + 1, text)
+
+    pdf.set_font(family, size=8)
+    pdf.text(left + (right - left - pdf.get_string_width(xlabel)) / 2, y + h - 1, xlabel)
+    with pdf.rotation(90, x + 3, (top + bottom) / 2):
+        pdf.text(x + 3 - pdf.get_string_width(ylabel) / 2, (top + bottom) / 2, ylabel)
@@ -1,97 +1,341 @@
-import pandas as pd
-import matplotlib.pyplot as plt
-from fpdf import FPDF
-import tempfile
+import io
 import os
+import time
+import random
+import hashlib
+from fpdf import FPDF
 from datetime import datetime, timedelta
-from core.excel_exporter import read_transactions   # ✅ diperbaiki
+from core.excel_exporter import get_aggregates, user_transaction_file
 from core.auth import get_current_user
+from core.chart_cache import CACHE_ROOT
+from core.report_cache import report_key
+from core.report_engine import ReportEngine, NoTransactionsError, resolve_period, default_granularity
+from core.pdf_charts import draw_pie, draw_bars
+
+# naikkan setiap kali tata letak/isi laporan berubah: cache lama jadi usang
+TEMPLATE_VERSION = 3
+
+REPORT_TITLES = {
+    "month": "Laporan Keuangan Bulanan",
+    "week": "Laporan Keuangan Mingguan",
+    "quarter": "Laporan Keuangan Triwulanan",
+    "year": "Laporan Keuangan Tahunan",
+    "custom": "Laporan Keuangan",
+}
+SERIES_TITLES = {
+    "day": "Pengeluaran Harian",
+    "week": "Pengeluaran Mingguan",
+    "month": "Pengeluaran Bulanan",
+    "quarter": "Pengeluaran Triwulanan",
+    "year": "Pengeluaran Tahunan",
+}
+
+# ukuran grafik di halaman (mm), rasio sama dengan Figure matplotlib 6.4x4.8
+CHART_X, CHART_W, CHART_H = 30, 150, 112.5
+
+# font Unicode yang di-embed untuk mode vektor; fpdf2 hanya menyimpan glyph
+# yang dipakai (subset), jadi ukurannya kecil
+FONT_FAMILY = "ReportSans"
+FONT_CANDIDATES = ["assets/fonts/DejaVuSans.ttf"]
+# Latin (+ext), Yunani, Kiril, tanda baca, simbol mata uang & huruf
+FONT_UNICODE_RANGES = [(0x20, 0x24F), (0x370, 0x4FF), (0x2000, 0x206F), (0x20A0, 0x20CF), (0x2100, 0x214F)]
+FONT_CACHE_DIR = os.path.join(CACHE_ROOT, "font_cache")
+_trimmed_fonts = {}
+
+
+def find_unicode_font():
+    """Path of a Unicode TTF: assets/fonts, else the DejaVu Sans bundled with matplotlib."""
+    import matplotlib
+    candidates = FONT_CANDIDATES + [os.path.join(matplotlib.get_data_path(), "fonts", "ttf", "DejaVuSans.ttf")]
+    for path in candidates:
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def _trimmed_font(path):
+    """
+    Copy of `path` cut down to FONT_UNICODE_RANGES, built once into
+    FONT_CACHE_DIR. fpdf2 parses every font again for each document and the
+    full DejaVu Sans (~6k glyphs) costs more than drawing the whole report.
+    """
+    st = os.stat(path)
+    key = f"{os.path.abspath(path)}:{st.st_mtime_ns}:{st.st_size}:{FONT_UNICODE_RANGES}"
+    cached = _trimmed_fonts.get(key)
+    if cached and os.path.exists(cached):
+        return cached
+    name = os.path.splitext(os.path.basename(path))[0]
+    out = os.path.join(FONT_CACHE_DIR, f"{name}-{hashlib.sha256(key.encode()).hexdigest()[:12]}.ttf")
+    if not os.path.exists(out):
+        try:
+            from fontTools import subset  # dependensi fpdf2
+            options = subset.Options()
+            # tanpa text shaping fpdf2 tidak memakai GSUB/GPOS, dan hinting
+            # tidak berguna di PDF: keduanya dibuang supaya glyph yang di-embed kecil
+            options.layout_features = []
+            options.hinting = False
+            options.name_IDs = ["*"]
+            options.notdef_outline = True
+            options.drop_tables += ["FFTM"]
+            font = subset.load_font(path, options)
+            subsetter = subset.Subsetter(options)
+            subsetter.populate(unicodes=[c for lo, hi in FONT_UNICODE_RANGES for c in range(lo, hi + 1)])
+            subsetter.subset(font)
+            os.makedirs(FONT_CACHE_DIR, exist_ok=True)
+            tmp_path = f"{out}.{os.getpid()}.tmp"  # worker batch bisa membuat file yang sama
+            subset.save_font(font, tmp_path, options)
+            os.replace(tmp_path, out)
+        except Exception as e:
+            print(f"[ERROR] Gagal memangkas font {path}: {e}")
+            return path
+    _trimmed_fonts[key] = out
+    return out
+
+
+def _add_font(pdf, font_path):
+    """Register `font_path` (with -Bold/-Oblique siblings if present); returns the family name."""
+    base, ext = os.path.splitext(font_path)
+    for style, suffix in (("", ""), ("B", "-Bold"), ("I", "-Oblique")):
+        path = base + suffix + ext
+        pdf.add_font(FONT_FAMILY, style, _trimmed_font(path if os.path.exists(path) else font_path))
+    return FONT_FAMILY
+
+
+def _chart_y(pdf, height):
+    """Top of the next chart slot; starts a new page if it does not fit."""
+    if pdf.get_y() + height > pdf.page_break_trigger:
+        pdf.add_page()
+    y = pdf.get_y()
+    pdf.set_y(y + height)
+    return y
+
+
+def _figure_png(fig):
+    """Render a Figure to an in-memory PNG (no temp files, no pyplot state)."""
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    buf = io.BytesIO()
+    FigureCanvasAgg(fig)
+    fig.savefig(buf, format="png")
+    buf.seek(0)
+    return buf
+
 
 class PDFReport:
     def __init__(self):
         pass
 
-    def generate_report(self, output_path="monthly_report.pdf"):
-        user = get_current_user()
-        if not user:
-            raise Exception("Tidak ada user login.")
-
-        data = read_transactions()
-        if data.empty:
-            raise ValueError("Tidak ada transaksi sama sekali.")
-
-        data['Amount'] = pd.to_numeric(data['Amount'], errors='coerce').fillna(0)
-        data['Category'] = data['Category'].fillna('Lainnya')
-        data['Date'] = pd.to_datetime(data['Date'], errors='coerce').fillna(pd.Timestamp.now())
-
-        now = datetime.now()
-
-        monthly_data = data[(data['Date'].dt.year == now.year) & (data['Date'].dt.month == now.month)]
-        weekly_data = data[data['Date'] >= now - timedelta(days=7)]
-
-        if monthly_data.empty:
-            raise ValueError("Tidak ada transaksi bulan ini")
-
-        grouped = monthly_data.groupby('Category')['Amount'].sum()
-        daily_sum = monthly_data.groupby(monthly_data['Date'].dt.date)['Amount'].sum()
-
-        # Pie Chart
-        fig1, ax1 = plt.subplots()
-        ax1.pie(grouped, labels=grouped.index, autopct='%1.1f%%', startangle=90)
-        ax1.set_title("Pengeluaran Bulanan per Kategori")
-        pie_path = tempfile.NamedTemporaryFile(delete=False, suffix=".png").name
-        fig1.savefig(pie_path)
-        plt.close(fig1)
-
-        # Bar Chart
-        fig2, ax2 = plt.subplots()
-        ax2.bar(daily_sum.index, daily_sum.values, color='skyblue')
-        ax2.set_title("Pengeluaran Harian")
-        ax2.set_xlabel("Tanggal")
-        ax2.set_ylabel("Jumlah (Rp)")
-        ax2.tick_params(axis='x', rotation=45)
-        bar_path = tempfile.NamedTemporaryFile(delete=False, suffix=".png").name
-        fig2.savefig(bar_path)
-        plt.close(fig2)
+    def render(self, username=None, period=None, aggregates=None, cache=None, lang="id",
+               start=None, end=None, granularity=None, vector=False, font_path=None):
+        """
+        Build the report for `username` (default: the logged-in user) and
+        return the PDF as bytes. `period` is 'YYYY-MM' (default: the current
+        month), 'YYYY', 'YYYY-Qn' or 'YYYY-Www'; or pass a custom `start`/`end`
+        range. `granularity` (day/week/month/quarter/year) sets the bar chart
+        buckets; by default it follows the length of the range.
+        `aggregates` can be passed in (e.g. built from the server's SQLite
+        ledger); otherwise the user's local ledger is used. With a `cache`
+        (ReportCache), an unchanged period returns the stored PDF.
+        `vector=True` draws the charts as PDF paths and embeds a subset
+        Unicode TTF (`font_path`, default: find_unicode_font()) instead of
+        PNG images and the core Arial font.
+        """
+        if username is None:
+            user = get_current_user()
+            if not user:
+                raise Exception("Tidak ada user login.")
+            username = user["username"]
+            file_path = None
+        else:
+            file_path = user_transaction_file(username) if aggregates is None else None
+
+        kind, start, end, label = resolve_period(period, start, end)
+        granularity = granularity or default_granularity(start, end)
+        # "sekarang" untuk periode lampau = akhir periode itu
+        now = min(datetime.now(), datetime.combine(end - timedelta(days=1), datetime.max.time()))
+        tomorrow = now.date() + timedelta(days=1)
+
+        # semua angka diambil dari rollup harian/bulanan, bukan dari baris mentah
+        if aggregates is None:
+            aggregates = get_aggregates(file_path)
+        engine = ReportEngine(aggregates)
+        totals = engine.totals(start, end)
+        if totals["count"] == 0:
+            raise NoTransactionsError("Tidak ada transaksi pada periode ini")
+
+        categories = engine.by_category(start, end)
+        series = engine.series(start, end, granularity)
+        weekly = engine.totals(now.date() - timedelta(days=7), tomorrow)
+
+        key = None
+        if cache is not None:
+            # versi periode = isi rollup yang dipakai laporan ini saja, jadi
+            # tulisan ke bulan lain tidak membuat laporan ini usang
+            inputs = {
+                "totals": totals,
+                "categories": categories.to_dict("index"),
+                "series": {str(p): row for p, row in series.to_dict("index").items()},
+                "granularity": granularity,
+                "weekly": weekly,
+                "as_of": now.date() if start <= datetime.now().date() < end else None,
+                "vector": vector,
+                "font": font_path,
+            }
+            key = report_key(username, label, inputs, lang, TEMPLATE_VERSION)
+            data = cache.get(key)
+            if data is not None:
+                return data
+
+        grouped = categories["net"]
+        # pie hanya pengeluaran (nilai positif); net bisa negatif dan ditolak pie()
+        spending = categories["expense"][categories["expense"] > 0]
+        if granularity == "day":
+            bar_x = [p.start_time.date() for p in series.index]
+        else:
+            bar_x = [str(p) for p in series.index]
+
+        pie_title = "Pengeluaran Bulanan per Kategori" if kind == "month" else "Pengeluaran per Kategori"
+        bar_title = SERIES_TITLES[granularity]
+        bar_xlabel = "Tanggal" if granularity == "day" else "Periode"
+
+        if not vector:
+            # matplotlib hanya dimuat untuk grafik raster, bukan saat UI start
+            from matplotlib.figure import Figure
+
+            # Pie Chart (dilewati kalau periode ini tanpa pengeluaran)
+            pie_png = None
+            if not spending.empty:
+                fig1 = Figure()
+                ax1 = fig1.subplots()
+                ax1.pie(spending, labels=spending.index, autopct='%1.1f%%', startangle=90)
+                ax1.set_title(pie_title)
+                pie_png = _figure_png(fig1)
+
+            # Bar Chart
+            fig2 = Figure()
+            ax2 = fig2.subplots()
+            ax2.bar(bar_x, series["net"].values, color='skyblue')
+            ax2.set_title(bar_title)
+            ax2.set_xlabel(bar_xlabel)
+            ax2.set_ylabel("Jumlah (Rp)")
+            ax2.tick_params(axis='x', rotation=45)
+            bar_png = _figure_png(fig2)
 
         # PDF generation
         pdf = FPDF()
         pdf.add_page()
+        if vector:
+            font_path = font_path or find_unicode_font()
+        family = _add_font(pdf, font_path) if font_path else "Arial"
 
         logo_path = "assets/logo.png"
         if os.path.exists(logo_path):
             pdf.image(logo_path, x=10, y=8, w=30)
 
-        pdf.set_font("Arial", "B", 16)
-        pdf.cell(0, 10, "Laporan Keuangan Bulanan", ln=True, align='C')
+        pdf.set_font(family, "B", 16)
+        pdf.cell(0, 10, REPORT_TITLES[kind], ln=True, align='C')
         pdf.ln(10)
 
-        total_month = monthly_data['Amount'].sum()
-        total_week = weekly_data['Amount'].sum()
-
-        pdf.set_font("Arial", size=12)
-        pdf.cell(0, 10, f"User: {user['username']}", ln=True)
-        pdf.cell(0, 10, f"Periode: {now.strftime('%B %Y')}", ln=True)
-        pdf.cell(0, 10, f"Total Bulanan: Rp {total_month:,.2f}", ln=True)
-        pdf.cell(0, 10, f"Total Mingguan: Rp {total_week:,.2f}", ln=True)
+        pdf.set_font(family, size=12)
+        pdf.cell(0, 10, f"User: {username}", ln=True)
+        if kind == "month":
+            pdf.cell(0, 10, f"Periode: {start.strftime('%B %Y')}", ln=True)
+        else:
+            last_day = end - timedelta(days=1)
+            pdf.cell(0, 10, f"Periode: {start.strftime('%d %b %Y')} - {last_day.strftime('%d %b %Y')}", ln=True)
+        total_label = "Total Bulanan" if kind == "month" else "Total Periode"
+        pdf.cell(0, 10, f"{total_label}: Rp {totals['net']:,.2f}", ln=True)
+        pdf.cell(0, 10, f"Total Mingguan: Rp {weekly['net']:,.2f}", ln=True)
         pdf.ln(10)
 
-        pdf.image(pie_path, x=30, w=150)
-        pdf.ln(10)
-        pdf.image(bar_path, x=30, w=150)
-        pdf.ln(10)
+        if vector:
+            if not spending.empty:
+                draw_pie(pdf, spending.values, spending.index, CHART_X, _chart_y(pdf, CHART_H),
+                         CHART_W, CHART_H, pie_title, family)
+                pdf.ln(10)
+            bar_labels = [d.strftime("%Y-%m-%d") if granularity == "day" else d for d in bar_x]
+            draw_bars(pdf, bar_labels, series["net"].values, CHART_X, _chart_y(pdf, CHART_H),
+                      CHART_W, CHART_H, bar_title, bar_xlabel, "Jumlah (Rp)", family)
+            pdf.ln(10)
+        else:
+            if pie_png is not None:
+                pdf.image(pie_png, x=CHART_X, w=CHART_W)
+                pdf.ln(10)
+            pdf.image(bar_png, x=CHART_X, w=CHART_W)
+            pdf.ln(10)
 
-        pdf.set_font("Arial", "B", 14)
+        pdf.set_font(family, "B", 14)
         pdf.cell(0, 10, "Rincian Pengeluaran:", ln=True)
-        pdf.set_font("Arial", size=12)
+        pdf.set_font(family, size=12)
         for cat, amount in grouped.items():
             pdf.cell(0, 8, f"{cat}: Rp {amount:,.2f}", ln=True)
 
         pdf.ln(20)
-        pdf.set_font("Arial", "I", 10)
+        pdf.set_font(family, "I", 10)
         pdf.cell(0, 10, "Ditandatangani secara digital oleh FinanceTracker", ln=True, align='R')
-        pdf.cell(0, 10, now.strftime("%Y-%m-%d %H:%M:%S"), ln=True, align='R')
+        pdf.cell(0, 10, datetime.now().strftime("%Y-%m-%d %H:%M:%S"), ln=True, align='R')
+
+        # fpdf2: output() tanpa nama file mengembalikan isi PDF di memori
+        data = bytes(pdf.output())
+        if key is not None:
+            cache.put(key, data)
+        return data
+
+    def generate_report(self, output_path="monthly_report.pdf", username=None, period=None, aggregates=None,
+                        cache=None, lang="id", start=None, end=None, granularity=None,
+                        vector=False, font_path=None):
+        """
+        Write the report to `output_path`, which may be a file path or any
+        writable file-like object (BytesIO, HTTP response stream, ...).
+        Returns the PDF bytes.
+        """
+        data = self.render(username=username, period=period, aggregates=aggregates, cache=cache, lang=lang,
+                           start=start, end=end, granularity=granularity,
+                           vector=vector, font_path=font_path)
+        if hasattr(output_path, "write"):
+            output_path.write(data)
+        else:
+            with open(output_path, "wb") as f:
+                f.write(data)
+        return data
+
+
+def benchmark(months=(1, 12, 60), per_month=300, repeat=3):
+    """Print PDF size and render time, raster vs vector, for reports spanning `months` months."""
+    from datetime import date
+    from core.ledger_aggregates import LedgerAggregates
+
+    rng = random.Random(42)
+    categories = ["Makan", "Transportasi", "Belanja", "Tagihan", "Hiburan", "Kesehatan"]
+    start = date(2020, 1, 1)
+    span = max(months)
+    rows = [
+        {"Id": i, "Date": start + timedelta(days=rng.randrange(span * 365 // 12)),
+         "Category": rng.choice(categories), "Note": "", "Amount": float(rng.randint(1, 500) * 1000)}
+        for i in range(per_month * span)
+    ]
+    aggregates = LedgerAggregates.from_rows(rows)
+    report = PDFReport()
+    report.render("benchmark", period="2020-01", aggregates=aggregates, vector=True)  # pemanasan font/matplotlib
+
+    results = []
+    for count in months:
+        # tepat `count` bulan kalender (31 hari x count melewati bulan target)
+        end = date(start.year + (start.month - 1 + count) // 12, (start.month - 1 + count) % 12 + 1, 1)
+        line = {}
+        for mode, vector in (("raster", False), ("vector", True)):
+            best = float("inf")
+            for _ in range(repeat):
+                t0 = time.perf_counter()
+                data = report.render("benchmark", start=start, end=end, aggregates=aggregates, vector=vector)
+                best = min(best, time.perf_counter() - t0)
+            line[mode] = (len(data), best)
+        (r_size, r_time), (v_size, v_time) = line["raster"], line["vector"]
+        print(f"[BENCH] {count:3d} bulan  raster {r_size / 1024:7.1f} KB {r_time * 1000:7.1f} ms  "
+              f"vector {v_size / 1024:7.1f} KB {v_time * 1000:7.1f} ms  "
+              f"({r_size / v_size:.1f}x lebih kecil, {r_time / v_time:.1f}x lebih cepat)")
+        results.append((count, line))
+    return results
+
 
-        pdf.output(output_path)
-        os.remove(pie_path)
-        os.remove(bar_path)
+if __name__ == "__main__":
+    benchmark()
@@ -1,3 +1,4 @@
+from kivy.clock import Clock
 from kivy.metrics import dp
 from kivy.uix.scrollview import ScrollView
 from kivymd.uix.screen import MDScreen
@@ -8,7 +9,7 @@ from kivymd.uix.button import MDRaisedButton, MDFlatButton
 from kivymd.uix.snackbar import Snackbar
 from kivymd.uix.toolbar import MDTopAppBar
 
-from core.auth import register
+from core.auth import register_async
 from core.lang_manager import LangManager
 
 
@@ -119,7 +120,13 @@ class RegisterScreen(MDScreen):
         if not u or not p:
             self._show_snackbar(self._tr_or("error_fill_fields", "Username and password required"))
             return
-        ok, msg_key = register(u, p)
+        # hashing password jalan di thread pool; hasil kembali lewat Clock
+        self.btn_register.disabled = True
+        register_async(u, p, on_done=self._on_register_done,
+                       dispatch=lambda fn: Clock.schedule_once(lambda dt: fn(), 0))
+
+    def _on_register_done(self, ok, msg_key):
+        self.btn_register.disabled = False
         self._show_snackbar(self._tr_or(msg_key, msg_key))
         if ok:
             self.manager.current = "login"
@@ -0,0 +1,78 @@
+import os
+import re
+import json
+import hashlib
+
+from core.chart_cache import ChartCache, CACHE_ROOT
+
+DEFAULT_DISK_DIR = os.path.join(CACHE_ROOT, "report_cache")
+
+
+def _safe(text):
+    return re.sub(r"[^A-Za-z0-9_-]", "_", str(text))
+
+
+def report_key(username, period, inputs, lang, template_version):
+    """
+    "<user>_<period>_<digest>", where the digest covers everything the
+    report is rendered from: the period's aggregate slice (its version),
+    the language and the template version. A write to another month leaves
+    the digest, and so the cached PDF, untouched.
+    """
+    payload = json.dumps(
+        {"inputs": inputs, "lang": lang, "template": template_version},
+        sort_keys=True, default=str,
+    )
+    digest = hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+    return f"{_safe(username)}_{_safe(period)}_{digest}"
+
+
+class ReportCache(ChartCache):
+    """
+    Generated PDF reports, LRU-bounded in memory and on disk. Storing a new
+    version of a (user, period) report drops the older versions of that
+    same report only; other months stay cached.
+    """
+
+    suffix = ".pdf"
+
+    def put(self, key, data):
+        username, period, _ = key.rsplit("_", 2)
+        self.invalidate(username, period, keep=key)
+        super().put(key, data)
+
+    @staticmethod
+    def _matches(key, username, period):
+        parts = key.rsplit("_", 2)
+        return (len(parts) == 3 and parts[0] == _safe(username)
+                and (period is None or parts[1] == _safe(period)))
+
+    def invalidate(self, username, period=None, keep=None):
+        """Remove cached reports of `username` (one period, or all when None)."""
+        removed = 0
+        with self._lock:
+            for key in [k for k in self._items if k != keep and self._matches(k, username, period)]:
+                self._bytes -= len(self._items.pop(key))
+                removed += 1
+        if self.disk_dir and os.path.isdir(self.disk_dir):
+            for name in os.listdir(self.disk_dir):
+                key = name[:-len(self.suffix)]
+                if name.endswith(self.suffix) and key != keep and self._matches(key, username, period):
+                    try:
+                        os.remove(os.path.join(self.disk_dir, name))
+                        removed += 1
+                    except OSError:
+                        pass
+        return removed
+
+
+_default_cache = None
+
+
+def get_report_cache():
+    """Process-wide report cache used by HomeScreen and the server."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ReportCache(max_bytes=16 * 1024 * 1024, disk_dir=DEFAULT_DISK_DIR,
+                                     max_disk_bytes=128 * 1024 * 1024)
+    return _default_cache
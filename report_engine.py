@@ -0,0 +1,153 @@
+"""
+Report figures for any date range and granularity, read from the
+LedgerAggregates rollups instead of the raw rows.
+
+    engine = ReportEngine(get_aggregates(path))
+    kind, start, end, label = resolve_period("2024-Q2")
+    engine.series(start, end, "month")      # one row per month
+    engine.by_category(start, end)          # one row per category
+
+A range is split into whole months (read from the monthly rollup) and
+the leftover days at its edges (read from the daily rollup), so a
+five-year report touches ~60 monthly buckets plus at most ~60 daily
+ones: about the cost of a monthly report. Grouping is one pandas groupby
+over those buckets.
+"""
+import re
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+
+# granularity -> pandas period alias
+GRANULARITIES = {"day": "D", "week": "W", "month": "M", "quarter": "Q", "year": "Y"}
+
+COLUMNS = ["income", "expense", "count"]
+
+
+class NoTransactionsError(ValueError):
+    """The requested period has no transactions, so there is nothing to report."""
+
+
+def _to_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+def _next_month(day):
+    return (day.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+
+def resolve_period(period=None, start=None, end=None):
+    """
+    (kind, start, end, label) with start <= day < end. `period` is one of
+    'YYYY-MM', 'YYYY', 'YYYY-Qn' or 'YYYY-Www' (ISO week); default is the
+    current month. A custom range is given with `start`/`end` instead.
+    """
+    if start is not None or end is not None:
+        if start is None or end is None:
+            raise ValueError("start dan end harus diisi bersama")
+        start, end = _to_date(start), _to_date(end)
+        if end <= start:
+            raise ValueError("end harus setelah start")
+        return "custom", start, end, f"{start.isoformat()}--{end.isoformat()}"
+
+    period = (period or datetime.now().strftime("%Y-%m")).strip().upper()
+    if re.fullmatch(r"\d{4}-\d{2}", period):
+        start = datetime.strptime(period, "%Y-%m").date()
+        return "month", start, _next_month(start), period
+    if re.fullmatch(r"\d{4}", period):
+        year = int(period)
+        return "year", date(year, 1, 1), date(year + 1, 1, 1), period
+    match = re.fullmatch(r"(\d{4})-Q([1-4])", period)
+    if match:
+        year, quarter = int(match.group(1)), int(match.group(2))
+        start = date(year, 3 * quarter - 2, 1)
+        end = date(year + 1, 1, 1) if quarter == 4 else date(year, 3 * quarter + 1, 1)
+        return "quarter", start, end, period
+    match = re.fullmatch(r"(\d{4})-W(\d{2})", period)
+    if match:
+        start = date.fromisocalendar(int(match.group(1)), int(match.group(2)), 1)
+        return "week", start, start + timedelta(days=7), period
+    raise ValueError("Format periode tidak dikenal (YYYY-MM, YYYY, YYYY-Qn, YYYY-Www)")
+
+
+def default_granularity(start, end):
+    """Bars per day up to two months, per month up to two years, else per quarter."""
+    days = (end - start).days
+    if days <= 62:
+        return "day"
+    if days <= 731:
+        return "month"
+    return "quarter"
+
+
+def split_range(start, end):
+    """(months, days): whole 'YYYY-MM' months inside [start, end) and the leftover days."""
+    months, days = [], []
+    day = start
+    while day < end:
+        next_month = _next_month(day)
+        if day.day == 1 and next_month <= end:
+            months.append(day.strftime("%Y-%m"))
+            day = next_month
+            continue
+        stop = min(next_month, end)
+        while day < stop:
+            days.append(day.isoformat())
+            day += timedelta(days=1)
+    return months, days
+
+
+class ReportEngine:
+    def __init__(self, aggregates):
+        self.aggregates = aggregates
+
+    def _frame(self, table, keys):
+        records = self.aggregates.rollup_records(table, keys)
+        df = pd.DataFrame.from_records(records, columns=["key", "category"] + COLUMNS)
+        keys = df["key"] + "-01" if table.startswith("by_month") else df["key"]
+        df["day"] = pd.to_datetime(keys, format="%Y-%m-%d")
+        return df
+
+    def _buckets(self, start, end, daily=False, by_category=False):
+        """Rollup rows covering [start, end); month rows are dated the 1st."""
+        start, end = _to_date(start), _to_date(end)
+        suffix = "_category" if by_category else ""
+        if daily:
+            days = [(start + timedelta(days=i)).isoformat() for i in range((end - start).days)]
+            return self._frame("by_day" + suffix, days)
+        months, days = split_range(start, end)
+        frames = [self._frame("by_month" + suffix, months), self._frame("by_day" + suffix, days)]
+        frames = [f for f in frames if not f.empty] or frames[:1]
+        return frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+
+    @staticmethod
+    def _with_net(df):
+        df["net"] = df["income"] - df["expense"]
+        df["count"] = df["count"].astype(int)
+        return df
+
+    def totals(self, start, end):
+        """Bucket {"income", "expense", "count", "net"} for the whole range."""
+        sums = self._buckets(start, end)[COLUMNS].sum()
+        result = {col: float(sums[col]) for col in COLUMNS}
+        result["count"] = int(result["count"])
+        result["net"] = result["income"] - result["expense"]
+        return result
+
+    def by_category(self, start, end):
+        """DataFrame indexed by category (sorted): income, expense, count, net."""
+        df = self._buckets(start, end, by_category=True)
+        return self._with_net(df.groupby("category", sort=True)[COLUMNS].sum())
+
+    def series(self, start, end, granularity="day"):
+        """DataFrame indexed by pandas Period at `granularity`: income, expense, count, net."""
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"granularity harus salah satu dari {', '.join(GRANULARITIES)}")
+        # minggu/hari tidak sejajar dengan batas bulan: pakai rollup harian
+        df = self._buckets(start, end, daily=granularity in ("day", "week"))
+        periods = df["day"].dt.to_period(GRANULARITIES[granularity])
+        return self._with_net(df.groupby(periods, sort=True)[COLUMNS].sum())
@@ -0,0 +1,98 @@
+"""
+Production entry point for server.py.
+
+    python -m core.serve --workers 4 --threads 8 --port 5000
+
+Uses gunicorn (pre-fork worker processes, gthread workers) where available
+and falls back to a multi-threaded waitress server elsewhere (Windows).
+Each worker process gets its own pooled Snap client; user data and the
+webhook queue live in SQLite (WAL) shared by all workers. On SIGTERM/SIGINT
+workers stop accepting requests, finish in-flight ones and drain pending
+webhook writes before exiting.
+"""
+import argparse
+import os
+import signal
+import sys
+
+
+def _load_app():
+    from core.server import app
+    return app
+
+
+def _shutdown_worker():
+    from core import server
+    server.shutdown()
+
+
+def run_gunicorn(host, port, workers, threads, timeout):
+    from gunicorn.app.base import BaseApplication
+
+    class FinanceServer(BaseApplication):
+        def __init__(self, options):
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            # dimuat di tiap worker (tanpa preload) supaya thread UserStore/
+            # WebhookQueue dan koneksi SQLite tidak ikut ter-fork
+            return _load_app()
+
+    FinanceServer({
+        "bind": f"{host}:{port}",
+        "workers": workers,
+        "worker_class": "gthread",
+        "threads": threads,
+        "timeout": timeout,
+        "graceful_timeout": timeout,
+        "keepalive": 5,
+        "worker_exit": lambda arbiter, worker: _shutdown_worker(),
+    }).run()
+
+
+def run_waitress(host, port, threads):
+    from waitress import create_server
+
+    app = _load_app()
+    server = create_server(app, host=host, port=port, threads=threads)
+
+    def _stop(signum, frame):
+        raise SystemExit(0)
+
+    signal.signal(signal.SIGTERM, _stop)
+    print(f"[SERVER] waitress di http://{host}:{port} ({threads} thread)")
+    try:
+        server.run()
+    except (KeyboardInterrupt, SystemExit):
+        pass
+    finally:
+        server.close()
+        _shutdown_worker()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Finance Tracker server (produksi)")
+    parser.add_argument("--host", default=os.environ.get("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", "5000")))
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("WEB_CONCURRENCY", os.cpu_count() or 2)))
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--timeout", type=int, default=30)
+    parser.add_argument("--server", choices=["auto", "gunicorn", "waitress"], default="auto")
+    args = parser.parse_args(argv)
+
+    backend = args.server
+    if backend == "auto":
+        backend = "waitress" if sys.platform == "win32" else "gunicorn"
+    if backend == "gunicorn":
+        run_gunicorn(args.host, args.port, args.workers, args.threads, args.timeout)
+    else:
+        run_waitress(args.host, args.port, args.threads)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,47 +1,141 @@
 # server.py
-from flask import Flask, request, jsonify
-import midtransclient
+from flask import Flask, request, jsonify, g, Response, stream_with_context
+from datetime import datetime, timedelta
+from functools import wraps
 import json
 import os
+import sqlite3
+from core.user_store import UserStore
+from core.webhook_queue import WebhookQueue, verify_signature
+from core.payment_client import SnapClient, PaymentError
+from core.server_metrics import RequestMetrics
+from core.order_registry import OrderRegistry, new_order_id, ORDER_PREFIX
+from core.sessions import SessionStore, load_secret
+from core.ledger_sqlite import SQLiteLedger, GROUP_EXPRESSIONS
+from core.report_cache import ReportCache, report_key
+from core import credentials
 
 app = Flask(__name__)
 
-# Load or inisialisasi data user dari file
+metrics = RequestMetrics()
+metrics.install(app)
+
+# Data user disimpan di SQLite (WAL) yang dipakai bersama semua worker;
+# users.json lama diimpor sekali saat pertama jalan
 DATA_FILE = "users.json"
+DB_FILE = os.environ.get("FINANCE_USERS_DB", "users.db")
+
+WEBHOOK_DB_FILE = os.environ.get("FINANCE_WEBHOOK_DB", "webhooks.db")
+ORDERS_DB_FILE = os.environ.get("FINANCE_ORDERS_DB", "orders.db")
+SESSIONS_DB_FILE = os.environ.get("FINANCE_SESSIONS_DB", "sessions.db")
+SESSION_KEY_FILE = os.environ.get("FINANCE_SESSION_KEY_FILE", "session.key")
+LEDGER_DB_FILE = os.environ.get("FINANCE_LEDGER_DB", "ledger.db")
+
+# Batas ukuran halaman /transactions
+PAGE_LIMIT_DEFAULT = 1000
+PAGE_LIMIT_MAX = 10000
 
-def load_users():
-    if os.path.exists(DATA_FILE):
-        with open(DATA_FILE, "r") as f:
-            return json.load(f)
-    return {}
+# Lama order Snap berlaku (menit); order pending dipakai ulang selama ini
+ORDER_EXPIRY_MINUTES = 60
+# 0 = selalu buat order baru (mis. load test throughput gateway)
+REUSE_ORDERS = os.environ.get("FINANCE_REUSE_ORDERS", "1") != "0"
 
-def save_users(users):
-    with open(DATA_FILE, "w") as f:
-        json.dump(users, f, indent=2)
+users_db = UserStore(DB_FILE, DATA_FILE)
+orders = OrderRegistry(ORDERS_DB_FILE)
+# Token sesi ditandatangani HMAC; disimpan juga di SQLite supaya semua worker bisa validasi
+sessions = SessionStore(load_secret(SESSION_KEY_FILE), db_path=SESSIONS_DB_FILE)
+# Transaksi semua user di satu SQLite (skema sama dengan ledger desktop: Amount/Note/Category/Date)
+ledger_db = SQLiteLedger(LEDGER_DB_FILE, None)
+# PDF laporan per (user, bulan, versi isi bulan); hanya di memori per worker
+reports_cache = ReportCache(max_bytes=64 * 1024 * 1024)
 
-users_db = load_users()
+SERVER_KEY = "Mid-server-erhBrXGnRqTEpwX54Gz5ahxj"
 
-# Konfigurasi Midtrans (pakai sandbox)
-snap = midtransclient.Snap(
+# Konfigurasi Midtrans (pakai sandbox). Satu client per proses worker:
+# koneksi keep-alive ke Snap dipakai ulang oleh semua thread request.
+# MIDTRANS_SNAP_URL bisa diarahkan ke snap_stub.py untuk load test.
+snap = SnapClient(
+    server_key=SERVER_KEY,
     is_production=False,
-    server_key="Mid-server-erhBrXGnRqTEpwX54Gz5ahxj",
-    client_key="G060601779Mid-client-W14yjPUtOKeFGO0t"
+    url=os.environ.get("MIDTRANS_SNAP_URL"),
+    pool_size=int(os.environ.get("SNAP_POOL_SIZE", "16"))
 )
 
+def require_session(view):
+    """Endpoint butuh header 'Authorization: Bearer <token>'; user sesi ada di g.username."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        header = request.headers.get("Authorization", "")
+        token = header[len("Bearer "):] if header.startswith("Bearer ") else None
+        session = sessions.validate(token) if token else None
+        if session is None:
+            return jsonify({"error": "Sesi tidak valid, silakan login"}), 401
+        g.username = session["user"]
+        g.session_token = token
+        return view(*args, **kwargs)
+    return wrapper
+
+
+@app.route("/login", methods=["POST"])
+def login():
+    data = request.get_json(silent=True) or {}
+    username = data.get("username")
+    password = data.get("password")
+
+    if not username or not password:
+        return jsonify({"error": "Username dan password wajib diberikan"}), 400
+
+    user = users_db.get(username)
+    # KDF jalan di thread pool kredensial (terbatas & ber-cache), bukan di worker request
+    ok, rehash = (credentials.verify_password_async(password, user.get("password")).result()
+                  if user else (False, False))
+    if not ok:
+        return jsonify({"error": "Username atau password salah"}), 401
+    if rehash:
+        users_db.update(username, {"password": credentials.rehash(password)})
+
+    return jsonify({
+        "token": sessions.create(username),
+        "expires_in": sessions.ttl,
+        "is_premium": user.get("is_premium", False)
+    })
+
+
+@app.route("/logout", methods=["POST"])
+@require_session
+def logout():
+    sessions.revoke(g.session_token)
+    return jsonify({"message": "Logout berhasil"})
+
+
 @app.route("/upgrade", methods=["POST"])
+@require_session
 def upgrade():
-    data = request.json
-    username = data.get("username")
+    data = request.get_json(silent=True) or {}
+    username = g.username
 
-    if not username:
-        return jsonify({"error": "Username wajib diberikan"}), 400
+    # username di body (client lama) harus sama dengan pemilik sesi
+    if data.get("username") not in (None, username):
+        return jsonify({"error": "Username tidak sesuai dengan sesi"}), 403
 
-    if username not in users_db:
+    if not users_db.exists(username):
         return jsonify({"error": "User tidak ditemukan"}), 404
 
+    # Double tap / reload: pakai lagi order yang masih pending. Reservasi di
+    # database berlaku lintas worker, jadi hanya satu request yang membuat order.
+    order_id = new_order_id(username)
+    if REUSE_ORDERS:
+        state, active = orders.reserve(username, order_id)
+        if state == "busy":
+            active = orders.wait_active(username, timeout=sum(snap.timeout))
+            if active is None:
+                return jsonify({"error": "Pembayaran sedang dibuat, coba lagi"}), 409
+        if active is not None:
+            return jsonify({"snap_url": active["redirect_url"], "order_id": active["order_id"]})
+
     # Buat transaksi pembayaran Midtrans
     transaction_details = {
-        "order_id": f"premium-{username}",
+        "order_id": order_id,
         "gross_amount": 50000  # Contoh harga upgrade Rp 50.000
     }
     customer_details = {
@@ -52,38 +146,320 @@ def upgrade():
         "customer_details": customer_details,
         "enabled_payments": ["credit_card","gopay","bank_transfer"],
         "expiry": {
-            "start_time": "2025-07-04T10:00:00+07:00",
+            "start_time": datetime.now().astimezone().strftime("%Y-%m-%d %H:%M:%S %z"),
             "unit": "minute",
-            "duration": 60
+            "duration": ORDER_EXPIRY_MINUTES
         }
     }
 
     try:
         payment_url = snap.create_transaction(params)["redirect_url"]
+    except PaymentError as e:
+        orders.release(order_id)
+        return jsonify({"error": str(e)}), 502
     except Exception as e:
+        orders.release(order_id)
         return jsonify({"error": str(e)}), 500
 
-    return jsonify({"snap_url": payment_url})
+    orders.register(username, order_id, payment_url, ORDER_EXPIRY_MINUTES)
+
+    return jsonify({"snap_url": payment_url, "order_id": order_id})
+
+def is_paid(notification):
+    return notification.get("transaction_status") == "capture" and notification.get("fraud_status") == "accept"
+
+
+CLOSED_STATUSES = {"expire", "cancel", "deny"}
+
+
+def username_from_order(order_id):
+    """Username pemilik order; order lama (premium-username) tidak ada di registry."""
+    username = orders.username_for(order_id)
+    if username is None and order_id.startswith(ORDER_PREFIX):
+        username = order_id[len(ORDER_PREFIX):]
+    return username
+
+
+def apply_notifications(events):
+    """Worker webhook: satu batch notifikasi -> satu commit ke user store."""
+    upgraded = 0
+    for notification in events:
+        order_id = notification.get("order_id")
+        if not order_id:
+            continue
+        if notification.get("transaction_status") in CLOSED_STATUSES:
+            orders.close(order_id, notification["transaction_status"])
+            continue
+        if not is_paid(notification):
+            continue
+        orders.close(order_id, "paid")
+        username = username_from_order(order_id)
+        if username and users_db.exists(username):
+            users_db.set_premium(username)
+            upgraded += 1
+        else:
+            print(f"[WEBHOOK] User tidak ditemukan untuk order {order_id}")
+    if upgraded:
+        # gagal commit -> exception, jadi batch webhook tetap pending dan dicoba ulang
+        users_db.flush(raise_errors=True)
+    orders.evict_expired()
+
+
+webhooks = WebhookQueue(WEBHOOK_DB_FILE, apply_notifications)
+
 
 @app.route("/midtrans/callback", methods=["POST"])
 def callback():
-    notification = request.json
-
-    order_id = notification.get("order_id")
-    transaction_status = notification.get("transaction_status")
-    fraud_status = notification.get("fraud_status")
-
-    if order_id and transaction_status == "capture" and fraud_status == "accept":
-        # extract username dari order_id (format premium-username)
-        username = order_id.replace("premium-", "")
-        if username in users_db:
-            users_db[username]["is_premium"] = True
-            save_users(users_db)
-            return jsonify({"message": "User upgraded to premium"}), 200
-        else:
-            return jsonify({"error": "User tidak ditemukan"}), 404
+    notification = request.get_json(silent=True) or {}
+
+    if not notification.get("order_id") or not verify_signature(notification, SERVER_KEY):
+        return jsonify({"error": "Signature tidak valid"}), 403
+
+    # diproses di background; notifikasi ulang dari Midtrans langsung dibuang
+    if webhooks.enqueue(notification):
+        return jsonify({"message": "Notifikasi diterima"}), 200
+    return jsonify({"message": "Notifikasi sudah diproses"}), 200
+
+# ================= TRANSACTIONS API =================
+def _parse_transaction(data):
+    """Validasi satu transaksi dari client -> row ledger, atau raise ValueError."""
+    if not isinstance(data, dict):
+        raise ValueError("Transaksi harus berupa object")
+    try:
+        amount = float(data.get("Amount"))
+    except (TypeError, ValueError):
+        raise ValueError("Amount harus berupa angka")
+    if amount != amount:  # NaN
+        raise ValueError("Amount harus berupa angka")
+    date = data.get("Date") or datetime.now().strftime("%Y-%m-%d")
+    try:
+        date = datetime.fromisoformat(str(date)).strftime("%Y-%m-%d")
+    except ValueError:
+        raise ValueError("Date harus berformat YYYY-MM-DD")
+    return {
+        "Id": data.get("Id") or None,
+        "Amount": amount,
+        "Note": str(data.get("Note") or ""),
+        "Category": str(data.get("Category") or "Lainnya"),
+        "Date": date,
+    }
+
+
+def _page_args(args, cursor_name):
+    """(cursor, limit) from the query string; ValueError unless cursor >= 0 and limit >= 1."""
+    cursor = int(args.get(cursor_name) or 0)
+    limit = int(args.get("limit") or PAGE_LIMIT_DEFAULT)
+    # limit 0 mengembalikan cursor yang sama: client yang mengikutinya tidak pernah selesai
+    if cursor < 0 or limit < 1:
+        raise ValueError(f"{cursor_name} harus >= 0 dan limit >= 1")
+    return cursor, min(limit, PAGE_LIMIT_MAX)
+
+
+@app.route("/transactions", methods=["POST"])
+@require_session
+def create_transactions():
+    data = request.get_json(silent=True)
+    items = data.get("transactions") if isinstance(data, dict) and "transactions" in data else [data]
+    if not isinstance(items, list):
+        return jsonify({"error": "transactions harus berupa list"}), 400
+    try:
+        rows = [_parse_transaction(item) for item in items]
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        ledger_db.with_user(g.username).append(rows)
+    except sqlite3.IntegrityError:
+        return jsonify({"error": "Id transaksi sudah dipakai"}), 409
+    return jsonify({"transactions": rows}), 201
+
+
+@app.route("/transactions", methods=["GET"])
+@require_session
+def list_transactions():
+    """
+    Cursor pagination (keyset on the row id), streamed so the response is
+    never built in memory. ?format=ndjson streams one row per line and, if
+    the page was cut by `limit`, a final {"next_cursor": ...} line; the
+    default JSON body is {"transactions": [...], "next_cursor": ...}.
+    """
+    args = request.args
+    try:
+        after, limit = _page_args(args, "cursor")
+    except ValueError:
+        return jsonify({"error": "cursor/limit harus berupa angka (cursor >= 0, limit >= 1)"}), 400
+    ledger = ledger_db.with_user(g.username)
+    rows = ledger.iter_rows(after=after, limit=limit, start=args.get("start"),
+                            end=args.get("end"), category=args.get("category"))
+
+    if args.get("format") == "ndjson":
+        def generate():
+            sent, cursor = 0, after
+            for cursor, row in rows:
+                sent += 1
+                yield json.dumps(row) + "\n"
+            if sent == limit:
+                yield json.dumps({"next_cursor": str(cursor)}) + "\n"
+        return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+    def generate():
+        sent, cursor = 0, after
+        yield '{"transactions": ['
+        for cursor, row in rows:
+            yield ("," if sent else "") + json.dumps(row)
+            sent += 1
+        next_cursor = json.dumps(str(cursor)) if sent == limit else "null"
+        yield f'], "next_cursor": {next_cursor}}}'
+    return Response(stream_with_context(generate()), mimetype="application/json")
+
+
+@app.route("/transactions/<tx_id>", methods=["DELETE"])
+@require_session
+def delete_transaction(tx_id):
+    row = ledger_db.with_user(g.username).delete_id(tx_id)
+    if row is None:
+        return jsonify({"error": "Transaksi tidak ditemukan"}), 404
+    return jsonify({"deleted": row})
+
+
+@app.route("/transactions/aggregate", methods=["GET"])
+@require_session
+def aggregate_transactions():
+    group_by = request.args.get("group_by", "category")
+    if group_by not in GROUP_EXPRESSIONS:
+        return jsonify({"error": f"group_by harus salah satu dari {sorted(GROUP_EXPRESSIONS)}"}), 400
+    groups = ledger_db.with_user(g.username).aggregate(
+        group_by, start=request.args.get("start"), end=request.args.get("end"),
+        category=request.args.get("category"),
+    )
+    totals = {
+        "income": sum(gr["income"] or 0 for gr in groups),
+        "expense": sum(gr["expense"] or 0 for gr in groups),
+        "count": sum(gr["count"] for gr in groups),
+    }
+    return jsonify({"group_by": group_by, "groups": groups, "totals": totals})
+
+
+# ================= DELTA SYNC =================
+@app.route("/sync", methods=["GET"])
+@require_session
+def sync_pull():
+    """Perubahan sejak seq `since` (hanya yang berubah, termasuk tombstone delete)."""
+    try:
+        since, limit = _page_args(request.args, "since")
+    except ValueError:
+        return jsonify({"error": "since/limit harus berupa angka (since >= 0, limit >= 1)"}), 400
+    changes, last_seq = ledger_db.with_user(g.username).changes_since(since, limit)
+    return jsonify({"changes": changes, "next": last_seq, "more": len(changes) == limit})
+
+
+@app.route("/sync", methods=["POST"])
+@require_session
+def sync_push():
+    data = request.get_json(silent=True) or {}
+    changes = data.get("changes")
+    if not isinstance(changes, list):
+        return jsonify({"error": "changes harus berupa list"}), 400
+    # validasi per perubahan: satu baris rusak tidak menggagalkan seluruh batch
+    valid, rejected = [], []
+    for c in changes:
+        if not isinstance(c, dict):
+            rejected.append({"Id": None, "error": "Perubahan harus berupa object"})
+            continue
+        try:
+            valid.append({"Id": c.get("Id"), "deleted": True} if c.get("deleted")
+                         else dict(_parse_transaction(c), Id=c.get("Id")))
+        except ValueError as e:
+            rejected.append({"Id": c.get("Id"), "error": str(e)})
+    ledger = ledger_db.with_user(g.username)
+    applied, not_stored = ledger.apply_changes(valid)
+    rejected += not_stored
+    if rejected:
+        print(f"[SYNC] {len(rejected)} perubahan dari {g.username} ditolak")
+    return jsonify({"applied": applied, "rejected": rejected, "seq": ledger.current_seq()})
+
+
+# ================= REPORTS =================
+@app.route("/reports", methods=["GET"])
+@app.route("/reports/monthly", methods=["GET"])
+@require_session
+def period_report():
+    """
+    PDF laporan dari ledger server; dibuat di memori, tanpa file sementara.
+    ?period=YYYY-MM|YYYY|YYYY-Qn|YYYY-Www atau ?start=&end= (end eksklusif),
+    opsional &granularity=day|week|month|quarter|year dan &vector=1 (grafik vektor).
+    """
+    # import di sini: matplotlib/fpdf hanya dimuat kalau endpoint laporan dipakai
+    from core.pdf_report import PDFReport, TEMPLATE_VERSION
+    from core.ledger_aggregates import LedgerAggregates
+    from core.report_engine import NoTransactionsError, resolve_period, default_granularity, GRANULARITIES
+
+    period = request.args.get("period")
+    start, end = request.args.get("start"), request.args.get("end")
+    granularity = request.args.get("granularity")
+    vector = request.args.get("vector", "").lower() in ("1", "true", "yes")
+    try:
+        _, start_day, end_day, label = resolve_period(period, start, end)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if granularity and granularity not in GRANULARITIES:
+        return jsonify({"error": f"granularity harus salah satu dari {', '.join(GRANULARITIES)}"}), 400
+
+    # kunci dari perubahan terakhir di rentang laporan (+7 hari untuk total
+    # mingguan) + parameter laporan: cache hit tidak menyentuh tabel transaksi,
+    # dan tulisan ke bulan lain tidak membuat laporan ini usang
+    ledger = ledger_db.with_user(g.username)
+    data_start = start_day - timedelta(days=7)
+    granularity = granularity or default_granularity(start_day, end_day)
+    today = datetime.now().date()
+    key = report_key(g.username, label, {
+        "ledger": ledger.range_version(data_start.isoformat(), end_day.isoformat()),
+        "range": [start_day, end_day],
+        "granularity": granularity,
+        "as_of": today if start_day <= today < end_day else None,
+        "vector": vector,
+    }, "id", TEMPLATE_VERSION)
+    data = reports_cache.get(key)
+    if data is None:
+        try:
+            # rollup (hari, kategori) periode ini (+7 hari untuk total mingguan) dihitung di SQL
+            rollup = ledger.daily_rollup(start=data_start.isoformat(), end=end_day.isoformat())
+            data = PDFReport().render(username=g.username, period=period, start=start, end=end,
+                                      granularity=granularity, aggregates=LedgerAggregates.from_rollup(rollup),
+                                      vector=vector)
+        except NoTransactionsError as e:
+            return jsonify({"error": str(e)}), 404
+        except Exception as e:
+            print(f"[ERROR] Gagal membuat laporan {g.username} {label}: {type(e).__name__}: {e}")
+            return jsonify({"error": "Gagal membuat laporan"}), 500
+        reports_cache.put(key, data)
+
+    return Response(data, mimetype="application/pdf", headers={
+        "Content-Disposition": f'inline; filename="report_{g.username}_{label}.pdf"'
+    })
+
+
+@app.route("/metrics", methods=["GET"])
+def get_metrics():
+    data = metrics.snapshot()
+    data["snap"] = snap.latency.snapshot()
+    data["webhooks"] = dict(webhooks.stats, pending=webhooks.pending_count())
+    data["user_store"] = dict(users_db.stats)
+    data["orders"] = dict(orders.stats)
+    data["sessions"] = dict(sessions.stats, active=len(sessions))
+    return jsonify(data)
+
+
+def shutdown(timeout=10):
+    """Graceful stop: wait for running requests, drain the webhook queue, flush the user store."""
+    if not metrics.wait_idle(timeout):
+        print(f"[SERVER] {metrics.in_flight} request masih berjalan saat shutdown")
+    webhooks.close()
+    users_db.close()
+    ledger_db.close()
+    snap.close()
+    print("[SERVER] Shutdown selesai")
 
-    return jsonify({"message": "Transaksi belum selesai atau tidak valid"}), 200
 
 if __name__ == "__main__":
+    # Server development; untuk produksi pakai: python -m core.serve
     app.run(debug=True)
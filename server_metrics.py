@@ -0,0 +1,75 @@
+import os
+import threading
+import time
+
+from core.payment_client import LatencyHistogram
+
+
+class RequestMetrics:
+    """
+    Per-process request timing for the Flask server: one LatencyHistogram
+    per endpoint, status-code counters and the number of in-flight requests
+    (used by graceful shutdown to wait for running handlers).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+        self._status = {}
+        self.in_flight = 0
+        self.started_at = time.time()
+
+    def install(self, app):
+        from flask import g, request
+
+        @app.before_request
+        def _start_timer():
+            g._metrics_start = time.perf_counter()
+            with self._lock:
+                self.in_flight += 1
+
+        @app.teardown_request
+        def _stop_timer(exc=None):
+            start = g.pop("_metrics_start", None)
+            if start is None:
+                return
+            with self._lock:
+                self.in_flight -= 1
+            rule = request.url_rule.rule if request.url_rule else "<unmatched>"
+            self._histogram(rule).record((time.perf_counter() - start) * 1000)
+
+        @app.after_request
+        def _count_status(response):
+            with self._lock:
+                self._status[response.status_code] = self._status.get(response.status_code, 0) + 1
+            return response
+
+    def _histogram(self, rule):
+        with self._lock:
+            histogram = self._endpoints.get(rule)
+            if histogram is None:
+                histogram = self._endpoints[rule] = LatencyHistogram()
+            return histogram
+
+    def snapshot(self):
+        with self._lock:
+            endpoints = dict(self._endpoints)
+            status = dict(self._status)
+            in_flight = self.in_flight
+        return {
+            "pid": os.getpid(),
+            "uptime_s": round(time.time() - self.started_at, 1),
+            "in_flight": in_flight,
+            "status": {str(code): n for code, n in sorted(status.items())},
+            "endpoints": {
+                rule: dict(h.snapshot(), p50_ms=h.percentile(50), p99_ms=h.percentile(99))
+                for rule, h in endpoints.items()
+            },
+        }
+
+    def wait_idle(self, timeout=10):
+        """Wait until no request is being handled (or timeout); returns True if idle."""
+        deadline = time.monotonic() + timeout
+        while self.in_flight > 0 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        return self.in_flight <= 0
@@ -0,0 +1,196 @@
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    sid TEXT PRIMARY KEY,
+    username TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    revoked INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_user ON sessions (username);
+CREATE INDEX IF NOT EXISTS idx_sessions_expiry ON sessions (expires_at);
+"""
+
+DEFAULT_TTL = 7 * 24 * 3600
+EVICT_INTERVAL = 60
+# sesi di memori dicek ulang ke SQLite setelah sekian detik (logout di worker lain)
+RECHECK_INTERVAL = 30
+
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def load_secret(path="session.key"):
+    """Signing key shared by all worker processes: env FINANCE_SESSION_SECRET or a key file."""
+    env = os.environ.get("FINANCE_SESSION_SECRET")
+    if env:
+        return env.encode("utf-8")
+    try:
+        # O_EXCL: kalau beberapa worker start bersamaan hanya satu yang membuat file
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        for _ in range(50):
+            with open(path, "rb") as f:
+                key = f.read().strip()
+            if key:
+                return key
+            time.sleep(0.01)
+        raise RuntimeError(f"{path} kosong")
+    key = secrets.token_hex(32).encode("ascii")
+    with os.fdopen(fd, "wb") as f:
+        f.write(key)
+        f.flush()
+        os.fsync(f.fileno())
+    return key
+
+
+class SessionStore:
+    """
+    Signed session tokens: "<payload b64>.<hmac-sha256 b64>", where the
+    payload carries the session id, username and expiry. validate() checks
+    the signature and expiry, then looks the session id up in an in-memory
+    table (O(1), no user data touched), so revoked sessions are rejected.
+
+    With `db_path` sessions are also written to SQLite, which lets every
+    worker process validate tokens issued by another one (a miss in memory
+    falls back to one indexed lookup, then is cached; cached entries are
+    re-checked every RECHECK_INTERVAL seconds so a logout in another worker
+    is honoured). Expired entries are evicted from memory and the database
+    every EVICT_INTERVAL seconds.
+    """
+
+    def __init__(self, secret, ttl=DEFAULT_TTL, db_path=None):
+        self.secret = secret if isinstance(secret, bytes) else secret.encode("utf-8")
+        self.ttl = ttl
+        self.db_path = db_path
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._next_evict = time.time() + EVICT_INTERVAL
+        self.stats = {"created": 0, "validated": 0, "rejected": 0, "db_lookups": 0, "evicted": 0}
+        if db_path:
+            self._conn().executescript(SCHEMA)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _sign(self, payload):
+        return _b64encode(hmac.new(self.secret, payload.encode("ascii"), hashlib.sha256).digest())
+
+    # ================= CREATE =================
+    def create(self, username):
+        now = time.time()
+        session = {"sid": secrets.token_urlsafe(16), "user": username, "exp": int(now + self.ttl)}
+        payload = _b64encode(json.dumps(session, separators=(",", ":")).encode("utf-8"))
+        token = f"{payload}.{self._sign(payload)}"
+        with self._lock:
+            self._sessions[session["sid"]] = dict(session, checked=now)
+        if self.db_path:
+            self._conn().execute(
+                "INSERT INTO sessions (sid, username, expires_at) VALUES (?, ?, ?)",
+                (session["sid"], username, session["exp"]),
+            )
+        self.stats["created"] += 1
+        self._maybe_evict(now)
+        return token
+
+    # ================= VALIDATE =================
+    def _decode(self, token):
+        try:
+            payload, signature = token.split(".", 1)
+            payload.encode("ascii")
+        except (AttributeError, ValueError):
+            return None
+        if not hmac.compare_digest(signature.encode("utf-8"), self._sign(payload).encode("ascii")):
+            return None
+        try:
+            return json.loads(_b64decode(payload))
+        except ValueError:
+            return None
+
+    def validate(self, token):
+        """Session dict ({'sid', 'user', 'exp'}) for a valid token, else None."""
+        now = time.time()
+        self._maybe_evict(now)
+        claims = self._decode(token)
+        if claims is None or claims.get("exp", 0) <= now:
+            self.stats["rejected"] += 1
+            return None
+        session = self._sessions.get(claims["sid"])
+        if self.db_path and (session is None or now - session["checked"] > RECHECK_INTERVAL):
+            session = self._load(claims["sid"], now)
+        if session is None or session["user"] != claims["user"]:
+            self.stats["rejected"] += 1
+            return None
+        self.stats["validated"] += 1
+        return {"sid": session["sid"], "user": session["user"], "exp": session["exp"]}
+
+    def _load(self, sid, now):
+        self.stats["db_lookups"] += 1
+        row = self._conn().execute(
+            "SELECT username, expires_at FROM sessions WHERE sid = ? AND revoked = 0", (sid,)
+        ).fetchone()
+        with self._lock:
+            if row is None:
+                self._sessions.pop(sid, None)
+                return None
+            session = self._sessions[sid] = {"sid": sid, "user": row[0], "exp": int(row[1]), "checked": now}
+        return session
+
+    # ================= REVOKE =================
+    def revoke(self, token):
+        claims = self._decode(token)
+        if claims is None:
+            return False
+        with self._lock:
+            self._sessions.pop(claims["sid"], None)
+        if self.db_path:
+            self._conn().execute("UPDATE sessions SET revoked = 1 WHERE sid = ?", (claims["sid"],))
+        return True
+
+    def revoke_user(self, username):
+        with self._lock:
+            for sid in [sid for sid, s in self._sessions.items() if s["user"] == username]:
+                del self._sessions[sid]
+        if self.db_path:
+            self._conn().execute("UPDATE sessions SET revoked = 1 WHERE username = ?", (username,))
+
+    # ================= EVICTION =================
+    def _maybe_evict(self, now):
+        if now >= self._next_evict:
+            self._next_evict = now + EVICT_INTERVAL
+            self.evict_expired(now)
+
+    def evict_expired(self, now=None):
+        now = now or time.time()
+        with self._lock:
+            expired = [sid for sid, s in self._sessions.items() if s["exp"] <= now]
+            for sid in expired:
+                del self._sessions[sid]
+        evicted = len(expired)
+        if self.db_path:
+            evicted += self._conn().execute("DELETE FROM sessions WHERE expires_at <= ?", (now,)).rowcount
+        self.stats["evicted"] += evicted
+        return evicted
+
+    def __len__(self):
+        return len(self._sessions)
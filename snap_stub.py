@@ -0,0 +1,80 @@
+"""
+Local stand-in for the Midtrans Snap API, for testing the payment client
+without network access:
+
+    python -m core.snap_stub --port 8765 --delay 0.2 --fail-rate 0.1
+    MIDTRANS_SNAP_URL=http://127.0.0.1:8765/snap/v1/transactions python main.py
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class SnapStubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, seperti gateway asli
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length)
+        server = self.server
+        if server.delay:
+            time.sleep(server.delay)
+        if random.random() < server.fail_rate:
+            self._send(503, {"error_messages": ["stub: service unavailable"]})
+            return
+        try:
+            params = json.loads(body or b"{}")
+            order_id = params["transaction_details"]["order_id"]
+        except (ValueError, KeyError, TypeError):
+            self._send(400, {"error_messages": ["stub: invalid request"]})
+            return
+        token = uuid.uuid4().hex
+        server.orders[order_id] = params
+        self._send(201, {
+            "token": token,
+            "redirect_url": f"http://{server.server_address[0]}:{server.server_address[1]}/snap/v2/vtweb/{token}",
+        })
+
+    def _send(self, status, payload):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub(host="127.0.0.1", port=0, delay=0.0, fail_rate=0.0):
+    """Start the stub in a background thread; returns (server, url)."""
+    server = ThreadingHTTPServer((host, port), SnapStubHandler)
+    server.daemon_threads = True
+    server.delay = delay
+    server.fail_rate = fail_rate
+    server.orders = {}
+    threading.Thread(target=server.serve_forever, name="snap-stub", daemon=True).start()
+    host, port = server.server_address[:2]
+    return server, f"http://{host}:{port}/snap/v1/transactions"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Midtrans Snap stub server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--delay", type=float, default=0.0, help="detik per request")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="fraksi respons 503")
+    args = parser.parse_args()
+
+    server, url = start_stub(args.host, args.port, args.delay, args.fail_rate)
+    print(f"[SNAP STUB] Listening on {url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,144 @@
+"""
+Delta sync between the local ledger and the server (/sync).
+
+    client = DeltaSyncClient("https://server", token)
+    client.sync()
+
+A sync pushes the local outbox first, then pulls server changes with
+seq > the last seen seq and applies them row by row. Pushing first makes
+resolution deterministic: the server applies "delete wins" to everything,
+and the pull then brings the local ledger to the same result. Traffic and
+time scale with the number of changes since the last sync, not with the
+size of the history (except for the first sync, which uploads the ledger).
+"""
+import time
+
+import requests
+
+from core.excel_exporter import (
+    get_user_transaction_file, get_outbox, _get_ledger,
+    save_to_excel, delete_transaction_by_id,
+)
+
+PUSH_BATCH = 1000
+PULL_LIMIT = 1000
+
+
+class SyncError(Exception):
+    pass
+
+
+def _clean_change(change):
+    """
+    Change as the server validates it, or None if it can never be stored
+    (no Id, or an upsert whose Amount is empty/not a number, e.g. a legacy
+    or XLSX-migrated row). Dates go out as strings.
+    """
+    if not change.get("Id"):
+        return None
+    if change.get("deleted"):
+        return {"Id": change["Id"], "deleted": True}
+    try:
+        amount = float(change.get("Amount"))
+    except (TypeError, ValueError):
+        return None
+    if amount != amount:  # NaN
+        return None
+    cleaned = dict(change, Amount=amount)
+    if cleaned.get("Date") is not None:
+        cleaned["Date"] = str(cleaned["Date"])
+    return cleaned
+
+
+class DeltaSyncClient:
+    def __init__(self, server_url, token, file_path=None, session=None, timeout=(3.05, 30)):
+        self.server_url = server_url.rstrip("/")
+        self.file_path = file_path or get_user_transaction_file()
+        self.session = session or requests.Session()
+        self.session.headers["Authorization"] = "Bearer " + token
+        self.timeout = timeout
+        self.outbox = get_outbox(self.file_path)
+
+    def _request(self, method, path, **kwargs):
+        try:
+            resp = self.session.request(method, self.server_url + path, timeout=self.timeout, **kwargs)
+        except requests.RequestException as e:
+            raise SyncError(f"Gagal menghubungi server sync: {e}")
+        if resp.status_code >= 300:
+            raise SyncError(f"Server sync error {resp.status_code}: {resp.text[:200]}")
+        return resp, len(resp.content)
+
+    # ================= PUSH =================
+    def _initial_changes(self):
+        """First sync: the whole local ledger becomes the outbox."""
+        rows = _get_ledger(self.file_path).read_rows()
+        return [dict(row, deleted=False) for row in rows]
+
+    def push(self, stats):
+        state = self.outbox.read_state() if self.outbox.enabled() else None
+        if state is None or not state.get("initial_pushed"):
+            # mulai catat perubahan lokal dari sekarang; kalau upload awal
+            # terputus, diulang penuh (server mengabaikan Id yang sudah ada)
+            state = dict(state or {"since": 0}, initial_pushed=False)
+            self.outbox.write_state(state)
+            changes, size = self._initial_changes(), 0
+        else:
+            changes, size = self.outbox.pending()
+        cleaned = [_clean_change(change) for change in changes]
+        sendable = [change for change in cleaned if change is not None]
+        if len(sendable) < len(changes):
+            # baris rusak tetap lokal; jangan sampai menahan sync berikutnya
+            stats["skipped"] += len(changes) - len(sendable)
+            print(f"[SYNC] {len(changes) - len(sendable)} baris lokal tidak valid, tidak dikirim")
+        for i in range(0, len(sendable), PUSH_BATCH):
+            batch = sendable[i:i + PUSH_BATCH]
+            resp, nbytes = self._request("POST", "/sync", json={"changes": batch})
+            rejected = resp.json().get("rejected") or []
+            if rejected:
+                stats["rejected"] += len(rejected)
+                print(f"[SYNC] {len(rejected)} perubahan ditolak server: {rejected[0].get('error')}")
+            stats["pushed"] += len(batch) - len(rejected)
+            stats["bytes"] += nbytes
+        if size:
+            self.outbox.ack(size)
+        if not state.get("initial_pushed"):
+            self.outbox.write_state(dict(self.outbox.read_state(), initial_pushed=True))
+
+    # ================= PULL =================
+    def pull(self, stats):
+        ledger = _get_ledger(self.file_path)
+        state = self.outbox.read_state()
+        since = state.get("since", 0)
+        while True:
+            resp, nbytes = self._request("GET", "/sync", params={"since": since, "limit": PULL_LIMIT})
+            stats["bytes"] += nbytes
+            body = resp.json()
+            inserts = []
+            for change in body["changes"]:
+                tx_id = change["Id"]
+                if change.get("deleted"):
+                    if ledger.get(tx_id) is not None:
+                        delete_transaction_by_id(tx_id, self.file_path, record=False)
+                        stats["deleted"] += 1
+                elif ledger.get(tx_id) is None:
+                    inserts.append({key: change.get(key) for key in ("Id", "Date", "Category", "Note", "Amount")})
+            if inserts:
+                save_to_excel(inserts, self.file_path, record=False)
+                stats["inserted"] += len(inserts)
+            stats["pulled"] += len(body["changes"])
+            since = body["next"]
+            # simpan posisi per halaman: sync yang terputus lanjut dari sini
+            self.outbox.write_state(dict(state, since=since))
+            if not body.get("more"):
+                return since
+
+    def sync(self):
+        """Push then pull; returns stats (changes, bytes, seconds)."""
+        stats = {"pushed": 0, "pulled": 0, "inserted": 0, "deleted": 0, "skipped": 0, "rejected": 0, "bytes": 0}
+        start = time.perf_counter()
+        self.push(stats)
+        stats["seq"] = self.pull(stats)
+        stats["seconds"] = round(time.perf_counter() - start, 3)
+        print(f"[SYNC] push {stats['pushed']}, pull {stats['pulled']} perubahan "
+              f"({stats['bytes']} byte, {stats['seconds']}s)")
+        return stats
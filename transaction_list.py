@@ -0,0 +1,112 @@
+import numpy as np
+import pandas as pd
+
+from kivy.metrics import dp
+from kivy.properties import StringProperty, ObjectProperty
+from kivy.uix.recycleview import RecycleView
+from kivy.uix.recycleview.views import RecycleDataViewBehavior
+from kivy.uix.recycleboxlayout import RecycleBoxLayout
+
+from kivymd.uix.list import OneLineAvatarIconListItem, IconRightWidget
+
+PAGE_SIZE = 200
+
+
+class TransactionRow(RecycleDataViewBehavior, OneLineAvatarIconListItem):
+    """Recycled row view; only as many instances exist as fit on screen."""
+
+    tx_id = StringProperty("")
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.rv = None
+        self.delete_icon = IconRightWidget(icon="trash-can-outline", on_release=self._on_delete)
+        self.add_widget(self.delete_icon)
+
+    def refresh_view_attrs(self, rv, index, data):
+        self.rv = rv
+        result = super().refresh_view_attrs(rv, index, data)
+        has_id = bool(data.get("tx_id"))
+        self.delete_icon.opacity = 1 if has_id else 0
+        self.delete_icon.disabled = not has_id
+        return result
+
+    def _on_delete(self, *args):
+        if self.rv is not None and self.tx_id and self.rv.delete_callback:
+            self.rv.delete_callback(self.tx_id, self)
+
+
+class TransactionRecycleView(RecycleView):
+    """
+    Virtualized transaction history. Rows are plain dicts in `data`
+    (text + tx_id), newest first; older pages are appended when the user
+    scrolls to the bottom.
+    """
+
+    # bukan "on_delete": Widget.__init__ memperlakukan kwarg on_* sebagai
+    # event binding, sehingga property-nya tetap None
+    delete_callback = ObjectProperty(None, allownone=True)
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.viewclass = TransactionRow
+        layout = RecycleBoxLayout(
+            orientation="vertical",
+            default_size=(None, dp(48)),
+            default_size_hint=(1, None),
+            size_hint_y=None,
+        )
+        layout.bind(minimum_height=layout.setter("height"))
+        self.add_widget(layout)
+        self.scroll_type = ["bars", "content"]
+        self.bar_width = 10
+        self._frame = None
+        self._format = None
+        self._loaded = 0
+        self.bind(scroll_y=self._maybe_load_more)
+
+    def set_transactions(self, df, empty_text, **fmt):
+        """
+        Show `df` newest-first. `fmt` holds label_income, label_expense and
+        currency for format_rows(). Only the first page is formatted now.
+        """
+        if df is None or df.empty:
+            self._frame = None
+            self._loaded = 0
+            self.data = [{"text": empty_text, "tx_id": ""}]
+            return
+        self._frame = df.iloc[::-1]
+        self._format = fmt
+        self._loaded = 0
+        self.data = []
+        self.load_more()
+        self.scroll_y = 1
+
+    def load_more(self):
+        if self._frame is None or self._loaded >= len(self._frame):
+            return
+        page = self._frame.iloc[self._loaded:self._loaded + PAGE_SIZE]
+        self._loaded += len(page)
+        self.data.extend(format_rows(page, **self._format))
+
+    def _maybe_load_more(self, instance, value):
+        # scroll_y == 0 berarti sudah di paling bawah
+        if value <= 0.02:
+            self.load_more()
+
+
+def format_rows(df, label_income, label_expense, currency):
+    """Vectorized view-models for a page of transactions (no iterrows)."""
+    amount = pd.to_numeric(df['Amount'], errors='coerce').fillna(0)
+    if 'Date' in df.columns:
+        dates = pd.to_datetime(df['Date'], errors='coerce').dt.strftime('%Y-%m-%d').fillna("?")
+    else:
+        dates = pd.Series("?", index=df.index)
+    tipe = pd.Series(np.where(amount >= 0, label_income, label_expense), index=df.index)
+    category = df['Category'].astype(object).fillna("").astype(str) if 'Category' in df.columns else ""
+    note = df['Note'].astype(object).fillna("").astype(str) if 'Note' in df.columns else ""
+    nominal = amount.abs().map("{:,.2f}".format)
+
+    text = dates + " | " + tipe + " | " + category + " | " + f"{currency} " + nominal + " | " + note
+    ids = df['Id'].fillna("").astype(str) if 'Id' in df.columns else pd.Series("", index=df.index)
+    return [{"text": t, "tx_id": i} for t, i in zip(text.tolist(), ids.tolist())]
@@ -0,0 +1,210 @@
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Journal digabung ke users.json setelah sekian record
+COMPACT_THRESHOLD = 500
+
+
+@contextmanager
+def _file_lock(path):
+    """Exclusive lock between processes on `path` (created if missing)."""
+    with open(path, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class UserDirectory:
+    """
+    In-memory index of users.json keyed by username.
+
+    Reads are dict lookups; the file is re-parsed only when its mtime/size
+    changes. Writes append one JSON line to <users.json>.journal (fsync'd)
+    instead of dumping the whole file; journal lines written by another
+    process are picked up incrementally from the last read offset. The
+    journal is folded back into users.json (temp file + rename) once it
+    grows past COMPACT_THRESHOLD records. Appends and compaction hold an
+    OS lock on <users.json>.lock, so no process appends between another's
+    rename of users.json and its removal of the journal.
+    """
+
+    def __init__(self, json_path):
+        self.json_path = json_path
+        self.journal_path = json_path + ".journal"
+        self.lock_path = json_path + ".lock"
+        self._lock = threading.RLock()
+        self._users = {}
+        self._json_sig = None
+        self._journal_offset = 0
+        self._journal_records = 0
+        self._stats = {"lookups": 0, "total_ns": 0, "max_ns": 0, "reloads": 0, "journal_reads": 0}
+
+    # ================= LOAD =================
+    @staticmethod
+    def _signature(path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _ensure_fresh(self):
+        json_sig = self._signature(self.json_path)
+        if json_sig != self._json_sig:
+            self._reload(json_sig)
+            return
+        journal_sig = self._signature(self.journal_path)
+        if journal_sig is None:
+            if self._journal_offset:
+                # journal sudah di-compact proses lain; users.json ikut berubah
+                self._reload(self._signature(self.json_path))
+        elif journal_sig[1] != self._journal_offset:
+            self._read_journal()
+
+    def _reload(self, json_sig):
+        users = {}
+        if os.path.exists(self.json_path):
+            try:
+                with open(self.json_path, "r", encoding="utf-8") as f:
+                    users = json.load(f)
+            except ValueError:
+                print(f"[ERROR] {self.json_path} rusak, dimulai dari kosong")
+                users = {}
+        self._users = users
+        self._json_sig = json_sig
+        self._journal_offset = 0
+        self._journal_records = 0
+        self._stats["reloads"] += 1
+        self._read_journal()
+
+    def _read_journal(self):
+        if not os.path.exists(self.journal_path):
+            return
+        with open(self.journal_path, "rb") as f:
+            if self._journal_offset > os.fstat(f.fileno()).st_size:
+                self._journal_offset = 0
+            f.seek(self._journal_offset)
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    break  # baris terakhir belum selesai ditulis
+                self._journal_offset += len(raw)
+                try:
+                    record = json.loads(raw)
+                except ValueError:
+                    continue
+                self._apply(record)
+                self._journal_records += 1
+        self._stats["journal_reads"] += 1
+
+    def _apply(self, record):
+        username = record["user"]
+        if record.get("delete"):
+            self._users.pop(username, None)
+        else:
+            self._users.setdefault(username, {}).update(record.get("fields", {}))
+
+    # ================= LOOKUP =================
+    def get(self, username):
+        start = time.perf_counter_ns()
+        with self._lock:
+            self._ensure_fresh()
+            user = self._users.get(username)
+            result = dict(user) if user is not None else None
+        elapsed = time.perf_counter_ns() - start
+        self._stats["lookups"] += 1
+        self._stats["total_ns"] += elapsed
+        self._stats["max_ns"] = max(self._stats["max_ns"], elapsed)
+        return result
+
+    def exists(self, username):
+        return self.get(username) is not None
+
+    def all(self):
+        with self._lock:
+            self._ensure_fresh()
+            return {name: dict(data) for name, data in self._users.items()}
+
+    def stats(self):
+        lookups = self._stats["lookups"]
+        return {
+            "lookups": lookups,
+            "avg_us": (self._stats["total_ns"] / lookups / 1000) if lookups else 0.0,
+            "max_us": self._stats["max_ns"] / 1000,
+            "reloads": self._stats["reloads"],
+            "journal_reads": self._stats["journal_reads"],
+            "users": len(self._users),
+        }
+
+    # ================= WRITE =================
+    def update(self, username, fields):
+        """Append one journal record; O(1) regardless of the number of users."""
+        with self._lock, _file_lock(self.lock_path):
+            self._ensure_fresh()
+            self._append({"user": username, "fields": fields})
+
+    def create(self, username, fields):
+        """Add a new user; False if the username is taken (checked under the file lock)."""
+        with self._lock, _file_lock(self.lock_path):
+            self._ensure_fresh()
+            if username in self._users:
+                return False
+            self._append({"user": username, "fields": fields})
+            return True
+
+    def replace_all(self, users):
+        with self._lock, _file_lock(self.lock_path):
+            self._ensure_fresh()
+            self._users = {name: dict(data) for name, data in users.items()}
+            self._write_compacted()
+
+    def compact(self):
+        """Fold the journal into users.json atomically and truncate it."""
+        with self._lock, _file_lock(self.lock_path):
+            self._ensure_fresh()
+            self._write_compacted()
+
+    def _append(self, record):
+        # pemanggil memegang self._lock dan file lock
+        line = (json.dumps(record) + "\n").encode("utf-8")
+        with open(self.journal_path, "ab") as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+        self._apply(record)
+        self._journal_offset += len(line)
+        self._journal_records += 1
+        if self._journal_records >= COMPACT_THRESHOLD:
+            self._write_compacted()
+
+    def _write_compacted(self):
+        # pemanggil memegang self._lock dan file lock
+        tmp_path = self.json_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._users, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.json_path)
+        if os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+        self._json_sig = self._signature(self.json_path)
+        self._journal_offset = 0
+        self._journal_records = 0
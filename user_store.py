@@ -0,0 +1,215 @@
+import os
+import json
+import sqlite3
+import threading
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    username TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+"""
+
+
+class _Pending:
+    """Field updates for one user waiting for the next group commit."""
+
+    def __init__(self):
+        self.fields = {}
+        self.create = False
+        self.done = threading.Event()
+        self.waiters = [self.done]
+
+    def mark_done(self):
+        for event in self.waiters:
+            event.set()
+
+
+class UserStore:
+    """
+    User records for the server, shared by every worker process through one
+    SQLite database in WAL mode (crash-safe commits, readers never block).
+
+    Writes are group-committed: update() merges the change into a per-user
+    pending entry (guarded by a per-key lock) and a background flusher writes
+    all pending users in a single transaction. update(..., sync=True) waits
+    until its batch is durable. On first start an existing users.json is
+    imported once.
+    """
+
+    def __init__(self, db_path="users.db", json_path="users.json",
+                 flush_interval=0.02, batch_size=500):
+        self.db_path = db_path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._local = threading.local()
+        self._key_locks = {}
+        self._key_locks_guard = threading.Lock()
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = False
+        self.stats = {"updates": 0, "commits": 0, "committed_users": 0}
+
+        conn = self._conn()
+        conn.executescript(SCHEMA)
+        if json_path and os.path.exists(json_path):
+            self._import_json(json_path)
+
+        self._flusher = threading.Thread(target=self._flush_loop, name="user-store-flush", daemon=True)
+        self._flusher.start()
+
+    # ================= CONNECTION =================
+    def _conn(self):
+        # satu koneksi per thread; sqlite3 tidak boleh dipakai lintas thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _key_lock(self, username):
+        with self._key_locks_guard:
+            lock = self._key_locks.get(username)
+            if lock is None:
+                lock = self._key_locks[username] = threading.Lock()
+            return lock
+
+    def _import_json(self, json_path):
+        conn = self._conn()
+        if conn.execute("SELECT 1 FROM users LIMIT 1").fetchone():
+            return
+        try:
+            with open(json_path, "r", encoding="utf-8") as f:
+                users = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"[ERROR] Gagal membaca {json_path}: {e}")
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT OR IGNORE INTO users (username, data) VALUES (?, ?)",
+                [(name, json.dumps(data)) for name, data in users.items()],
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        print(f"[USER STORE] {len(users)} user diimpor dari {json_path}")
+
+    # ================= READ =================
+    def get(self, username):
+        row = self._conn().execute(
+            "SELECT data FROM users WHERE username = ?", (username,)
+        ).fetchone()
+        record = json.loads(row[0]) if row else None
+        # perubahan yang belum di-commit tetap terlihat oleh proses ini
+        with self._pending_lock:
+            pending = self._pending.get(username)
+            if pending is not None and (record is not None or pending.create):
+                record = dict(record or {}, **pending.fields)
+        return record
+
+    def exists(self, username):
+        return self.get(username) is not None
+
+    def all_users(self):
+        rows = self._conn().execute("SELECT username, data FROM users").fetchall()
+        return {name: json.loads(data) for name, data in rows}
+
+    # ================= WRITE =================
+    def update(self, username, fields, create=False, sync=False, timeout=10):
+        """Merge `fields` into the user's record (creating it if `create`)."""
+        with self._key_lock(username):
+            with self._pending_lock:
+                pending = self._pending.get(username)
+                if pending is None:
+                    pending = self._pending[username] = _Pending()
+                pending.fields.update(fields)
+                pending.create = pending.create or create
+                self.stats["updates"] += 1
+                full = len(self._pending) >= self.batch_size
+        if full:
+            self._wakeup.set()
+        if sync:
+            return pending.done.wait(timeout)
+        return True
+
+    def set_premium(self, username, value=True, sync=False):
+        return self.update(username, {"is_premium": value}, sync=sync)
+
+    def flush(self, raise_errors=False):
+        """
+        Commit everything pending right now (also called by the flusher).
+        Flushes run one at a time, so when this returns, updates made before
+        the call are durable -- or, with `raise_errors`, the failure is raised.
+        """
+        with self._flush_lock:
+            return self._flush(raise_errors)
+
+    def _flush(self, raise_errors):
+        with self._pending_lock:
+            batch = self._pending
+            self._pending = {}
+        if not batch:
+            return 0
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for username, pending in batch.items():
+                row = conn.execute("SELECT data FROM users WHERE username = ?", (username,)).fetchone()
+                if row is None and not pending.create:
+                    continue
+                record = json.loads(row[0]) if row else {}
+                record.update(pending.fields)
+                conn.execute(
+                    "INSERT INTO users (username, data) VALUES (?, ?) "
+                    "ON CONFLICT(username) DO UPDATE SET data = excluded.data",
+                    (username, json.dumps(record)),
+                )
+            conn.execute("COMMIT")
+        except Exception as e:
+            conn.execute("ROLLBACK")
+            print(f"[ERROR] Gagal commit user store: {e}")
+            # kembalikan ke antrian supaya dicoba lagi di batch berikutnya
+            with self._pending_lock:
+                for username, pending in batch.items():
+                    newer = self._pending.get(username)
+                    if newer is not None:
+                        pending.fields.update(newer.fields)
+                        pending.create = pending.create or newer.create
+                        pending.waiters.extend(newer.waiters)
+                    self._pending[username] = pending
+            if raise_errors:
+                raise
+            return 0
+        self.stats["commits"] += 1
+        self.stats["committed_users"] += len(batch)
+        for pending in batch.values():
+            pending.mark_done()
+        return len(batch)
+
+    def _flush_loop(self):
+        while not self._stopped:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def close(self):
+        self._stopped = True
+        self._wakeup.set()
+        self._flusher.join(timeout=5)
+        self.flush()
+
+    # ================= EXPORT =================
+    def export_json(self, json_path):
+        """Atomic snapshot of all users to JSON (temp file + fsync + rename)."""
+        tmp_path = json_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.all_users(), f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, json_path)
@@ -0,0 +1,221 @@
+import hashlib
+import hmac
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS webhook_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    order_id TEXT NOT NULL,
+    status TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    received_at REAL NOT NULL,
+    processed INTEGER NOT NULL DEFAULT 0,
+    claimed_at REAL,
+    UNIQUE (order_id, status)
+);
+CREATE INDEX IF NOT EXISTS idx_webhook_pending ON webhook_events (processed, id);
+"""
+
+# processed: 0 = pending, 2 = diklaim worker (sedang diproses), 1 = selesai
+PENDING, DONE, CLAIMED = 0, 1, 2
+# klaim dari worker yang mati dilepas lagi setelah sekian detik
+CLAIM_TIMEOUT = 60
+
+
+def verify_signature(notification, server_key):
+    """Midtrans signature_key = sha512(order_id + status_code + gross_amount + server_key)."""
+    signature = notification.get("signature_key")
+    if not signature:
+        return False
+    raw = (
+        str(notification.get("order_id", ""))
+        + str(notification.get("status_code", ""))
+        + str(notification.get("gross_amount", ""))
+        + server_key
+    )
+    expected = hashlib.sha512(raw.encode("utf-8")).hexdigest()
+    return hmac.compare_digest(expected, str(signature))
+
+
+class SeenSet:
+    """Bounded set of recent (order_id, status) keys; oldest entries are evicted first."""
+
+    def __init__(self, max_size=10000):
+        self.max_size = max_size
+        self._keys = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, key):
+        """Returns False if the key was already seen."""
+        with self._lock:
+            if key in self._keys:
+                self._keys.move_to_end(key)
+                return False
+            self._keys[key] = None
+            if len(self._keys) > self.max_size:
+                self._keys.popitem(last=False)
+            return True
+
+    def discard(self, key):
+        with self._lock:
+            self._keys.pop(key, None)
+
+    def __len__(self):
+        return len(self._keys)
+
+
+class WebhookQueue:
+    """
+    Durable queue for payment notifications.
+
+    enqueue() drops duplicates via the in-memory SeenSet, then inserts the
+    event into a local SQLite table (WAL; a UNIQUE(order_id, status) key
+    catches duplicates the bounded set has already forgotten, also across
+    worker processes). A background worker claims up to `batch_size`
+    pending events in one write transaction, so the workers of several
+    server processes never apply the same event; it hands them to
+    `apply_batch(events)` and marks them processed. A claim left by a
+    crashed worker is released after CLAIM_TIMEOUT. Events survive a
+    restart until applied.
+    """
+
+    def __init__(self, db_path, apply_batch, batch_size=200, flush_interval=0.05, seen_size=10000):
+        self.db_path = db_path
+        self.apply_batch = apply_batch
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.seen = SeenSet(seen_size)
+        self._local = threading.local()
+        self._wakeup = threading.Event()
+        self._stopped = False
+        self.stats = {"received": 0, "duplicates": 0, "queued": 0, "batches": 0, "applied": 0, "errors": 0}
+
+        self._conn().executescript(SCHEMA)
+        self._migrate()
+        self._prime_seen()
+        self._worker = threading.Thread(target=self._run, name="webhook-worker", daemon=True)
+        self._worker.start()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _migrate(self):
+        cols = [r[1] for r in self._conn().execute("PRAGMA table_info(webhook_events)")]
+        if "claimed_at" not in cols:
+            self._conn().execute("ALTER TABLE webhook_events ADD COLUMN claimed_at REAL")
+
+    def _prime_seen(self):
+        rows = self._conn().execute(
+            "SELECT order_id, status FROM webhook_events ORDER BY id DESC LIMIT ?", (self.seen.max_size,)
+        ).fetchall()
+        for order_id, status in reversed(rows):
+            self.seen.add((order_id, status))
+
+    # ================= INGEST =================
+    def enqueue(self, notification):
+        """Returns True if queued, False if it was a duplicate."""
+        self.stats["received"] += 1
+        key = (str(notification.get("order_id")), str(notification.get("transaction_status")))
+        if not self.seen.add(key):
+            self.stats["duplicates"] += 1
+            return False
+        try:
+            cur = self._conn().execute(
+                "INSERT OR IGNORE INTO webhook_events (order_id, status, payload, received_at) VALUES (?, ?, ?, ?)",
+                (key[0], key[1], json.dumps(notification), time.time()),
+            )
+        except Exception:
+            # belum tersimpan: notifikasi ulang dari Midtrans harus tetap diterima
+            self.seen.discard(key)
+            raise
+        if cur.rowcount == 0:
+            self.stats["duplicates"] += 1
+            return False
+        self.stats["queued"] += 1
+        if self.pending_count() >= self.batch_size:
+            self._wakeup.set()
+        return True
+
+    def pending_count(self):
+        return self._conn().execute(
+            "SELECT COUNT(*) FROM webhook_events WHERE processed IN (?, ?)", (PENDING, CLAIMED)
+        ).fetchone()[0]
+
+    # ================= WORKER =================
+    def _claim(self):
+        """Mark up to batch_size pending (or abandoned) events as ours; one write transaction."""
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute(
+                "SELECT id, payload FROM webhook_events "
+                "WHERE processed = ? OR (processed = ? AND claimed_at < ?) ORDER BY id LIMIT ?",
+                (PENDING, CLAIMED, now - CLAIM_TIMEOUT, self.batch_size),
+            ).fetchall()
+            conn.executemany(
+                "UPDATE webhook_events SET processed = ?, claimed_at = ? WHERE id = ?",
+                [(CLAIMED, now, row_id) for row_id, _ in rows],
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return rows
+
+    def _mark(self, rows, processed):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        conn.executemany("UPDATE webhook_events SET processed = ? WHERE id = ?",
+                         [(processed, row_id) for row_id, _ in rows])
+        conn.execute("COMMIT")
+
+    def process_pending(self):
+        """Apply one batch of pending events; returns how many were processed."""
+        rows = self._claim()
+        if not rows:
+            return 0
+        events = [json.loads(payload) for _, payload in rows]
+        try:
+            self.apply_batch(events)
+        except Exception as e:
+            # batch kembali pending, dicoba lagi di putaran berikutnya
+            self.stats["errors"] += 1
+            print(f"[ERROR] Gagal memproses webhook: {e}")
+            self._mark(rows, PENDING)
+            return 0
+        self._mark(rows, DONE)
+        self.stats["batches"] += 1
+        self.stats["applied"] += len(rows)
+        return len(rows)
+
+    def _run(self):
+        while not self._stopped:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            while not self._stopped and self.process_pending() == self.batch_size:
+                pass
+
+    def prune(self, older_than=7 * 24 * 3600):
+        """Delete processed events older than `older_than` seconds."""
+        cur = self._conn().execute(
+            "DELETE FROM webhook_events WHERE processed = ? AND received_at < ?", (DONE, time.time() - older_than)
+        )
+        return cur.rowcount
+
+    def close(self):
+        self._stopped = True
+        self._wakeup.set()
+        self._worker.join(timeout=5)
+        while self.process_pending():
+            pass